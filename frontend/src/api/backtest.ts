@@ -7,6 +7,7 @@ export interface BacktestRequest {
   initial_balance?: number
   symbol?: string
   timeframe?: string
+  simulate_tick_level?: boolean
 }
 
 export interface BacktestResult {
@@ -21,7 +21,12 @@ class WebSocketClient {
     this.ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data)
-        this.handleMessage(data)
+        // 服务端会把短时间内的多条消息合并为一个数组帧
+        if (Array.isArray(data)) {
+          data.forEach(message => this.handleMessage(message))
+        } else {
+          this.handleMessage(data)
+        }
       } catch (error) {
         console.error('解析WebSocket消息失败:', error)
       }
@@ -3,7 +3,7 @@ export interface Strategy {
   name: string
   description?: string
   strategy_type: 'config' | 'code'
-  status: 'stopped' | 'running' | 'paused' | 'error'
+  status: 'stopped' | 'running' | 'stopping' | 'paused' | 'error'
   config_yaml?: string
   code_path?: string
   code_content?: string
@@ -0,0 +1,20 @@
+"""策略YAML配置解析（各API共用的加载器与按文本缓存的解析）"""
+
+from functools import lru_cache
+
+import yaml
+
+# 优先使用 libyaml 的C实现加载器，未编译libyaml时回退到纯Python实现
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+@lru_cache(maxsize=256)
+def parse_config_cached(config_yaml: str) -> dict:
+    """
+    按YAML文本缓存解析结果，配置为空时直接返回空字典（不调用YAML解析器）
+    
+    返回的字典是共享的，调用方只能读取，需要修改时先复制
+    """
+    if not config_yaml:
+        return {}
+    return yaml.load(config_yaml, Loader=YAML_LOADER) or {}
@@ -0,0 +1,34 @@
+"""K线数组计算内核（安装了 numba 时JIT编译，否则按NumPy向量化执行）"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖
+    def njit(*args, **kwargs):
+        """numba 不可用时的空装饰器"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def dedup_sort(arr: np.ndarray) -> np.ndarray:
+    """
+    按时间戳（第0列）排序并去重，重复时间戳保留最先出现的一条
+    
+    Args:
+        arr: 形状为 (N, 6) 的 float64 K线数组
+        
+    Returns:
+        排序去重后的K线数组
+    """
+    if arr.shape[0] == 0:
+        return arr
+    # 稳定排序，保证相同时间戳中先出现的排在前面
+    order = np.argsort(arr[:, 0], kind='mergesort')
+    a = arr[order]
+    keep = np.empty(a.shape[0], dtype=np.bool_)
+    keep[0] = True
+    keep[1:] = a[1:, 0] != a[:-1, 0]
+    return a[keep]
@@ -2,28 +2,68 @@
 
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime, timedelta
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session, load_only
+from typing import Dict, Iterator, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime, timedelta, timezone
 
 logger = logging.getLogger(__name__)
 
-import os
+import sys
+import time
+import orjson
 from ..database import get_db
 from ..models.account import AccountSnapshot
 from ..models.trade import Trade
 from ..models.position import Position, PositionSide
 from ..models.strategy import Strategy, StrategyType, StrategyStatus
 from ..strategy_manager import get_strategy_manager
-from ..exchange_manager import get_exchange
-from dotenv import load_dotenv
-from sqlalchemy import func
+from ..config import get_settings
+from ..tasks import SNAPSHOT_INTERVAL
+from ..exchange_manager import get_exchange, get_cached_balance, invalidate_balance_cache
+from sqlalchemy import event, func, case, insert, select, bindparam
 
-load_dotenv()
+if sys.version_info >= (3, 11):
+    from asyncio import timeout as async_timeout
+else:
+    from async_timeout import timeout as async_timeout
 
 router = APIRouter(prefix="/api/account", tags=["account"])
 
+# 持仓接口只需要响应中的列，不加载 updated_at / closed_at
+_POSITION_RESPONSE_COLUMNS = load_only(
+    Position.id,
+    Position.strategy_id,
+    Position.symbol,
+    Position.side,
+    Position.entry_price,
+    Position.current_price,
+    Position.contracts,
+    Position.notional_value,
+    Position.unrealized_pnl,
+    Position.unrealized_pnl_percent,
+    Position.leverage,
+    Position.opened_at,
+)
+
+# 交易所返回的持仓方向字符串 -> PositionSide
+_SIDE_MAP = {
+    'long': PositionSide.LONG,
+    'LONG': PositionSide.LONG,
+    'short': PositionSide.SHORT,
+    'SHORT': PositionSide.SHORT,
+}
+
+# 常用查询语句在模块加载时构建一次，复用SQLAlchemy的编译缓存
+_OPEN_POSITIONS_STMT = select(Position).options(_POSITION_RESPONSE_COLUMNS).where(
+    Position.is_closed.is_(False)
+)
+_OPEN_POSITIONS_BY_STRATEGY_STMT = select(Position).options(_POSITION_RESPONSE_COLUMNS).where(
+    Position.strategy_id == bindparam("strategy_id"),
+    Position.is_closed.is_(False),
+)
+
 
 class BalanceResponse(BaseModel):
     """余额响应"""
@@ -47,8 +87,7 @@ class PositionResponse(BaseModel):
     leverage: int
     opened_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TradeResponse(BaseModel):
@@ -64,17 +103,15 @@ class TradeResponse(BaseModel):
     pnl_percent: Optional[float]
     executed_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 @router.get("/balance", response_model=BalanceResponse)
-async def get_balance():
+def get_balance():
     """获取账户余额"""
     try:
         # 使用单例管理器获取exchange实例
-        exchange = get_exchange()
-        balance = exchange.get_balance()
+        balance = get_cached_balance()
         if balance is None:
             # 余额获取失败，返回默认值但不应该触发风险检查
             logger.warning(f"获取账户余额失败，返回默认值")
@@ -85,201 +122,222 @@ async def get_balance():
         return {'total': 0.0, 'free': 0.0, 'used': 0.0}
 
 
-@router.get("/positions", response_model=List[PositionResponse])
-async def get_positions(db: Session = Depends(get_db)):
+def _position_to_dict(pos: Position) -> dict:
+    """持仓记录转换为可序列化的字典（字段与PositionResponse一致）"""
+    return {
+        'id': pos.id,
+        'strategy_id': pos.strategy_id,
+        'symbol': pos.symbol,
+        'side': pos.side,  # orjson直接输出枚举值
+        'entry_price': pos.entry_price,
+        'current_price': pos.current_price,
+        'contracts': pos.contracts,
+        'notional_value': pos.notional_value,
+        'unrealized_pnl': pos.unrealized_pnl,
+        'unrealized_pnl_percent': pos.unrealized_pnl_percent,
+        'leverage': pos.leverage,
+        'opened_at': pos.opened_at,
+    }
+
+
+# response_model仅用于OpenAPI文档，实际直接返回ORJSONResponse，跳过逐行校验
+@router.get("/positions", response_model=List[PositionResponse], response_class=ORJSONResponse)
+def get_positions(db: Session = Depends(get_db)):
     """获取所有持仓"""
-    try:
-        # 先查询所有持仓（包括已平仓的）用于调试
-        all_positions = db.query(Position).all()
-        logger.info(f"数据库中总共有 {len(all_positions)} 个持仓（包括已平仓）")
-        
-        # 查询未平仓的持仓
-        positions = db.query(Position).filter(Position.is_closed == False).all()
-        logger.info(f"查询到 {len(positions)} 个未平仓的持仓")
-        
-        # 如果数据库中没有持仓记录，尝试从交易所同步
-        if len(all_positions) == 0:
-            logger.info("数据库中没有任何持仓记录，尝试从交易所同步持仓")
-            try:
-                exchange = get_exchange()
-                exchange_positions = exchange.get_all_open_positions()
+    # 只探测是否存在持仓记录，避免把所有（含已平仓）持仓加载到内存
+    any_positions = db.query(Position.id).first() is not None
+    # 统计总数需要额外一次COUNT查询，只在调试日志开启时执行
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"数据库中总共有 {db.query(Position).count()} 个持仓（包括已平仓）")
+    
+    # 查询未平仓的持仓
+    positions = db.scalars(_OPEN_POSITIONS_STMT).all()
+    logger.info(f"查询到 {len(positions)} 个未平仓的持仓")
+    
+    # 如果数据库中没有持仓记录，尝试从交易所同步
+    if not any_positions:
+        logger.info("数据库中没有任何持仓记录，尝试从交易所同步持仓")
+        try:
+            exchange = get_exchange()
+            exchange_positions = exchange.get_all_open_positions()
+            
+            if exchange_positions:
+                logger.info(f"从交易所获取到 {len(exchange_positions)} 个持仓，开始同步到数据库")
                 
-                if exchange_positions:
-                    logger.info(f"从交易所获取到 {len(exchange_positions)} 个持仓，开始同步到数据库")
-                    
-                    # 获取或创建默认策略（用于存储交易所持仓）
-                    default_strategy = db.query(Strategy).filter(Strategy.name == "交易所持仓").first()
-                    if not default_strategy:
-                        default_strategy = Strategy(
-                            name="交易所持仓",
-                            description="从交易所同步的实际持仓",
-                            strategy_type=StrategyType.CONFIG,
-                            status=StrategyStatus.STOPPED
+                # 获取或创建默认策略（用于存储交易所持仓）
+                default_strategy = db.query(Strategy).filter(Strategy.name == "交易所持仓").first()
+                if not default_strategy:
+                    default_strategy = Strategy(
+                        name="交易所持仓",
+                        description="从交易所同步的实际持仓",
+                        strategy_type=StrategyType.CONFIG,
+                        status=StrategyStatus.STOPPED
+                    )
+                    db.add(default_strategy)
+                    db.commit()
+                    db.refresh(default_strategy)
+                    logger.info(f"创建默认策略用于存储交易所持仓: {default_strategy.id}")
+                
+                # 整理每个持仓为一行数据
+                now = datetime.utcnow()
+                rows = []
+                for symbol, exchange_pos in exchange_positions.items():
+                    try:
+                        contracts = abs(exchange_pos.get('contracts', 0))
+                        if contracts == 0:
+                            continue
+                        
+                        # 确定持仓方向，无法识别时根据合约数量正负判断
+                        side = _SIDE_MAP.get(exchange_pos.get('side', 'long')) or (
+                            PositionSide.LONG if exchange_pos.get('contracts', 0) > 0 else PositionSide.SHORT
                         )
-                        db.add(default_strategy)
-                        db.commit()
-                        db.refresh(default_strategy)
-                        logger.info(f"创建默认策略用于存储交易所持仓: {default_strategy.id}")
-                    
-                    # 同步每个持仓到数据库
-                    for symbol, exchange_pos in exchange_positions.items():
-                        try:
-                            contracts = abs(exchange_pos.get('contracts', 0))
-                            if contracts == 0:
-                                continue
-                            
-                            # 确定持仓方向
-                            side_str = exchange_pos.get('side', 'long')
-                            if side_str in ['long', 'LONG']:
-                                side = PositionSide.LONG
-                            elif side_str in ['short', 'SHORT']:
-                                side = PositionSide.SHORT
-                            else:
-                                # 根据合约数量正负判断
-                                original_contracts = exchange_pos.get('contracts', 0)
-                                side = PositionSide.LONG if original_contracts > 0 else PositionSide.SHORT
-                            
-                            # 获取价格信息
-                            entry_price = exchange_pos.get('entryPrice') or exchange_pos.get('averagePrice') or 0.0
-                            current_price = exchange_pos.get('markPrice') or exchange_pos.get('lastPrice') or entry_price
-                            
-                            # 计算名义价值
-                            notional_value = abs(exchange_pos.get('notional', 0))
-                            if notional_value == 0 and current_price > 0:
-                                notional_value = contracts * current_price
-                            
-                            # 获取盈亏信息
-                            unrealized_pnl = exchange_pos.get('unrealizedPnl')
-                            unrealized_pnl_percent = exchange_pos.get('percentage')
-                            
-                            # 获取杠杆
-                            leverage = exchange_pos.get('leverage', 1)
-                            
-                            # 检查是否已存在该持仓
-                            existing = db.query(Position).filter(
-                                Position.strategy_id == default_strategy.id,
-                                Position.symbol == symbol,
-                                Position.side == side,
-                                Position.is_closed == False
-                            ).first()
-                            
-                            if existing:
-                                # 更新现有持仓
-                                existing.entry_price = entry_price if entry_price > 0 else existing.entry_price
-                                existing.current_price = current_price
-                                existing.contracts = contracts
-                                existing.notional_value = notional_value if notional_value > 0 else existing.notional_value
-                                existing.unrealized_pnl = unrealized_pnl
-                                existing.unrealized_pnl_percent = unrealized_pnl_percent
-                                existing.leverage = leverage
-                                existing.updated_at = datetime.utcnow()
-                                logger.debug(f"更新持仓: {symbol} {side.value}")
-                            else:
-                                # 创建新持仓
-                                position = Position(
-                                    strategy_id=default_strategy.id,
-                                    symbol=symbol,
-                                    side=side,
-                                    entry_price=entry_price if entry_price > 0 else current_price,
-                                    current_price=current_price,
-                                    contracts=contracts,
-                                    notional_value=notional_value if notional_value > 0 else contracts * current_price,
-                                    unrealized_pnl=unrealized_pnl,
-                                    unrealized_pnl_percent=unrealized_pnl_percent,
-                                    leverage=leverage,
-                                    is_closed=False
-                                )
-                                db.add(position)
-                                logger.info(f"创建新持仓: {symbol} {side.value} {contracts} 合约")
                         
-                        except Exception as e:
-                            logger.warning(f"同步持仓 {symbol} 失败: {e}", exc_info=True)
-                            continue
-                    
-                    db.commit()
-                    logger.info("持仓同步完成，重新查询数据库")
+                        # 获取价格信息
+                        entry_price = exchange_pos.get('entryPrice') or exchange_pos.get('averagePrice') or 0.0
+                        current_price = exchange_pos.get('markPrice') or exchange_pos.get('lastPrice') or entry_price
+                        
+                        # 计算名义价值
+                        notional_value = abs(exchange_pos.get('notional', 0))
+                        if notional_value == 0 and current_price > 0:
+                            notional_value = contracts * current_price
+                        
+                        rows.append({
+                            'strategy_id': default_strategy.id,
+                            'symbol': symbol,
+                            'side': side,
+                            'entry_price': entry_price if entry_price > 0 else current_price,
+                            'current_price': current_price,
+                            'contracts': contracts,
+                            'notional_value': notional_value if notional_value > 0 else contracts * current_price,
+                            'unrealized_pnl': exchange_pos.get('unrealizedPnl'),
+                            'unrealized_pnl_percent': exchange_pos.get('percentage'),
+                            'leverage': exchange_pos.get('leverage', 1),
+                            'is_closed': False,
+                            'opened_at': now,
+                            'updated_at': now,
+                        })
                     
-                    # 重新查询数据库
-                    positions = db.query(Position).filter(Position.is_closed == False).all()
-                    logger.info(f"同步后查询到 {len(positions)} 个未平仓的持仓")
-                else:
-                    logger.info("交易所中也没有持仓")
-            
-            except Exception as e:
-                logger.error(f"从交易所同步持仓失败: {e}", exc_info=True)
-        
-        # 如果查询结果为空，检查是否有已平仓的持仓
-        if len(positions) == 0 and len(all_positions) > 0:
-            closed_count = db.query(Position).filter(Position.is_closed == True).count()
-            logger.info(f"所有持仓都已平仓（已平仓数量: {closed_count}）")
-        
-        # 转换为响应格式，确保枚举类型正确序列化
-        result = []
-        for pos in positions:
-            try:
-                # 确保side字段正确转换
-                side_value = pos.side.value if hasattr(pos.side, 'value') else str(pos.side)
-                logger.debug(f"处理持仓 {pos.id}: symbol={pos.symbol}, side={side_value}, is_closed={pos.is_closed}")
+                    except Exception as e:
+                        logger.warning(f"同步持仓 {symbol} 失败: {e}", exc_info=True)
+                        continue
                 
-                result.append(PositionResponse(
-                    id=pos.id,
-                    strategy_id=pos.strategy_id,
-                    symbol=pos.symbol,
-                    side=side_value,
-                    entry_price=pos.entry_price,
-                    current_price=pos.current_price,
-                    contracts=pos.contracts,
-                    notional_value=pos.notional_value,
-                    unrealized_pnl=pos.unrealized_pnl,
-                    unrealized_pnl_percent=pos.unrealized_pnl_percent,
-                    leverage=pos.leverage,
-                    opened_at=pos.opened_at,
-                ))
-            except Exception as e:
-                logger.error(f"序列化持仓 {pos.id} 失败: {e}", exc_info=True)
-                continue
+                # 只有表中没有任何持仓记录时才会同步，不存在冲突，一次批量插入全部持仓
+                if rows:
+                    db.execute(insert(Position), rows)
+                    logger.info(f"同步 {len(rows)} 个持仓到数据库")
+                
+                db.commit()
+                logger.info("持仓同步完成，重新查询数据库")
+                
+                # 重新查询数据库
+                positions = db.scalars(_OPEN_POSITIONS_STMT).all()
+                logger.info(f"同步后查询到 {len(positions)} 个未平仓的持仓")
+            else:
+                logger.info("交易所中也没有持仓")
         
-        logger.info(f"返回 {len(result)} 个持仓数据")
-        return result
-    except Exception as e:
-        logger.error(f"获取持仓列表失败: {e}", exc_info=True)
-        return []
+        except Exception as e:
+            logger.error(f"从交易所同步持仓失败: {e}", exc_info=True)
+    
+    # 如果查询结果为空，检查是否有已平仓的持仓
+    if len(positions) == 0 and any_positions and logger.isEnabledFor(logging.DEBUG):
+        closed_count = db.query(Position).filter(Position.is_closed == True).count()
+        logger.debug(f"所有持仓都已平仓（已平仓数量: {closed_count}）")
+    
+    # 直接投影为字典，跳过逐行的Pydantic校验
+    result = [_position_to_dict(pos) for pos in positions]
+    
+    logger.info(f"返回 {len(result)} 个持仓数据")
+    return ORJSONResponse(result)
+
+
+# 必须在 /positions/{strategy_id} 之前注册，否则会被路径参数路由匹配
+@router.get("/positions/debug")
+def debug_positions(db: Session = Depends(get_db)):
+    """调试端点：查看数据库中的持仓数据"""
+    all_positions = db.query(Position).all()
+    closed_positions = db.query(Position).filter(Position.is_closed == True).all()
+    open_positions = db.query(Position).filter(Position.is_closed == False).all()
+    
+    return {
+        "total": len(all_positions),
+        "closed": len(closed_positions),
+        "open": len(open_positions),
+        "all_positions": [
+            {
+                "id": p.id,
+                "strategy_id": p.strategy_id,
+                "symbol": p.symbol,
+                "side": str(p.side),
+                "is_closed": p.is_closed,
+                "entry_price": p.entry_price,
+                "contracts": p.contracts,
+                "opened_at": p.opened_at,
+            }
+            for p in all_positions
+        ]
+    }
 
 
-@router.get("/positions/{strategy_id}", response_model=List[PositionResponse])
-async def get_strategy_positions(strategy_id: int, db: Session = Depends(get_db)):
+@router.get("/positions/{strategy_id}", response_model=List[PositionResponse], response_class=ORJSONResponse)
+def get_strategy_positions(strategy_id: int, db: Session = Depends(get_db)):
     """获取指定策略的持仓"""
+    positions = db.scalars(
+        _OPEN_POSITIONS_BY_STRATEGY_STMT, {"strategy_id": strategy_id}
+    ).all()
+    logger.debug(f"查询到策略 {strategy_id} 的 {len(positions)} 个持仓")
+    return ORJSONResponse([_position_to_dict(pos) for pos in positions])
+
+
+def _trade_to_dict(t: Trade) -> dict:
+    """交易记录转换为可序列化的字典"""
+    return {
+        'id': t.id,
+        'strategy_id': t.strategy_id,
+        'strategy_run_id': t.strategy_run_id,
+        'trade_type': t.trade_type,
+        'side': t.side,
+        'symbol': t.symbol,
+        'price': t.price,
+        'amount': t.amount,
+        'contracts': t.contracts,
+        'order_id': t.order_id,
+        'exchange_order_id': t.exchange_order_id,
+        'pnl': t.pnl,
+        'pnl_percent': t.pnl_percent,
+        'executed_at': t.executed_at,
+    }
+
+
+def _snapshot_to_dict(s: AccountSnapshot) -> dict:
+    """账户快照转换为可序列化的字典"""
+    return {
+        'timestamp': s.snapshot_at,
+        'balance': s.total_balance,
+        'pnl': s.total_pnl,
+        'pnl_percent': s.total_pnl_percent,
+    }
+
+
+def _iter_json_array(rows, to_dict) -> Iterator[bytes]:
+    """逐行序列化查询结果为JSON数组（流式输出，内存占用恒定）"""
+    yield b'['
+    first = True
     try:
-        positions = db.query(Position).filter(
-            Position.strategy_id == strategy_id,
-            Position.is_closed == False
-        ).all()
-        logger.debug(f"查询到策略 {strategy_id} 的 {len(positions)} 个持仓")
-        # 转换为响应格式，确保枚举类型正确序列化
-        result = []
-        for pos in positions:
-            result.append(PositionResponse(
-                id=pos.id,
-                strategy_id=pos.strategy_id,
-                symbol=pos.symbol,
-                side=pos.side.value if hasattr(pos.side, 'value') else str(pos.side),
-                entry_price=pos.entry_price,
-                current_price=pos.current_price,
-                contracts=pos.contracts,
-                notional_value=pos.notional_value,
-                unrealized_pnl=pos.unrealized_pnl,
-                unrealized_pnl_percent=pos.unrealized_pnl_percent,
-                leverage=pos.leverage,
-                opened_at=pos.opened_at,
-            ))
-        return result
+        for row in rows:
+            if not first:
+                yield b','
+            first = False
+            yield orjson.dumps(to_dict(row))
     except Exception as e:
-        logger.error(f"获取策略持仓失败: {e}", exc_info=True)
-        return []
+        # 响应头已发送，无法再返回错误状态码：记录日志后继续抛出以中断响应，
+        # 不闭合数组，避免客户端把截断的结果当作完整数据
+        logger.error(f"流式输出查询结果失败: {e}", exc_info=True)
+        raise
+    yield b']'
 
 
 @router.get("/history")
-async def get_trade_history(
+def get_trade_history(
     strategy_id: Optional[int] = None,
     strategy_run_id: Optional[int] = None,
     skip: int = 0,
@@ -287,62 +345,124 @@ async def get_trade_history(
     db: Session = Depends(get_db)
 ):
     """获取交易历史（带总数）"""
-    try:
-        query = db.query(Trade)
-        
-        if strategy_id:
-            query = query.filter(Trade.strategy_id == strategy_id)
-        
-        # 如果指定了 strategy_run_id，只返回该运行记录的交易
-        if strategy_run_id:
-            query = query.filter(Trade.strategy_run_id == strategy_run_id)
-        
-        # 获取总数
-        total = query.count()
-        
-        # 获取分页数据（按交易时间从大到小排序）
-        trades = query.order_by(Trade.executed_at.desc()).offset(skip).limit(limit).all()
-        logger.debug(f"查询到 {len(trades)} 条交易记录，总共 {total} 条 (strategy_id={strategy_id}, strategy_run_id={strategy_run_id}, skip={skip}, limit={limit})")
-        
-        # 返回数据和总数
-        return {
-            'items': trades,
-            'total': total,
-            'skip': skip,
-            'limit': limit
-        }
-    except Exception as e:
-        logger.error(f"获取交易历史失败: {e}", exc_info=True)
-        return {'items': [], 'total': 0, 'skip': skip, 'limit': limit}
+    query = db.query(Trade)
+    
+    if strategy_id:
+        query = query.filter(Trade.strategy_id == strategy_id)
+    
+    # 如果指定了 strategy_run_id，只返回该运行记录的交易
+    if strategy_run_id:
+        query = query.filter(Trade.strategy_run_id == strategy_run_id)
+    
+    # 获取总数
+    total = query.count()
+    logger.debug(f"交易记录总共 {total} 条 (strategy_id={strategy_id}, strategy_run_id={strategy_run_id}, skip={skip}, limit={limit})")
+    
+    # 获取分页数据（按交易时间从大到小排序），逐批读取并流式输出
+    trades = query.order_by(Trade.executed_at.desc()).offset(skip).limit(limit).yield_per(500)
+    
+    def generate():
+        yield b'{"items":'
+        yield from _iter_json_array(trades, _trade_to_dict)
+        # 追加分页信息（去掉开头的 "{"，拼接到 items 之后）
+        yield b',' + orjson.dumps({'total': total, 'skip': skip, 'limit': limit})[1:]
+    
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+def _utcnow() -> datetime:
+    """当前UTC时间（naive，与数据库中 datetime.utcnow 写入的时间格式一致）"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+_SNAPSHOTS_SINCE_STMT = select(AccountSnapshot).where(
+    AccountSnapshot.snapshot_at >= bindparam("since")
+).order_by(AccountSnapshot.snapshot_at.asc())
+
+
+# 快照缓存：后台任务每次保存快照后预先序列化常用时间窗口，请求时直接返回
+_SNAPSHOT_CACHE_WINDOWS = (24, 24 * 7, 24 * 30)
+_SNAPSHOT_CACHE_MAX_AGE = 2.0 * SNAPSHOT_INTERVAL  # 两个快照周期内有效，后台任务停止后回退到实时查询
+_snapshot_cache: Dict[int, Tuple[float, bytes]] = {}
+
+
+def refresh_snapshot_cache(db: Session):
+    """重新计算常用时间窗口的快照数组（由后台任务在保存快照后调用）"""
+    now = _utcnow()
+    longest = max(_SNAPSHOT_CACHE_WINDOWS)
+    # 只扫描一次最长窗口，较短窗口从中截取
+    rows = [
+        _snapshot_to_dict(s)
+        for s in db.scalars(_SNAPSHOTS_SINCE_STMT, {"since": now - timedelta(hours=longest)})
+    ]
+    
+    ts = time.monotonic()
+    for hours in _SNAPSHOT_CACHE_WINDOWS:
+        since = now - timedelta(hours=hours)
+        window = [row for row in rows if row['timestamp'] >= since]
+        _snapshot_cache[hours] = (ts, orjson.dumps(window))
 
 
 @router.get("/snapshots")
-async def get_account_snapshots(
+def get_account_snapshots(
     hours: int = 24,
     db: Session = Depends(get_db)
 ):
     """获取账户余额快照（用于收益曲线）"""
-    try:
-        since = datetime.utcnow() - timedelta(hours=hours)
-        
-        snapshots = db.query(AccountSnapshot).filter(
-            AccountSnapshot.snapshot_at >= since
-        ).order_by(AccountSnapshot.snapshot_at.asc()).all()
-        
-        logger.debug(f"查询到 {len(snapshots)} 个账户快照 (hours={hours})")
-        
-        return [
-            {
-                'timestamp': s.snapshot_at.isoformat(),
-                'balance': s.total_balance,
-                'pnl': s.total_pnl,
-                'pnl_percent': s.total_pnl_percent,
-            }
-            for s in snapshots
-        ]
-    except Exception as e:
-        logger.error(f"获取账户快照失败: {e}", exc_info=True)
-        return []
+    cached = _snapshot_cache.get(hours)
+    if cached is not None and time.monotonic() - cached[0] < _SNAPSHOT_CACHE_MAX_AGE:
+        return Response(content=cached[1], media_type="application/json")
+    
+    snapshots = db.scalars(
+        _SNAPSHOTS_SINCE_STMT.execution_options(yield_per=1000),
+        {"since": _utcnow() - timedelta(hours=hours)},
+    )
+    
+    return StreamingResponse(
+        _iter_json_array(snapshots, _snapshot_to_dict),
+        media_type="application/json"
+    )
+
+
+def _query_trade_statistics(db: Session):
+    """查询交易统计和未平仓数量（同步，在线程池中执行）"""
+    # 一次聚合查询得到全部交易统计，避免多次扫描交易表
+    total_trades, win_trades, loss_trades, total_pnl = db.query(
+        func.count(Trade.id),
+        func.coalesce(func.sum(case((Trade.pnl > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Trade.pnl < 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(Trade.pnl), 0.0),
+    ).one()
+    open_positions = db.query(Position).filter(Position.is_closed == False).count()
+    return total_trades, win_trades, loss_trades, total_pnl, open_positions
+
+
+# 统计结果短时缓存：仪表盘频繁轮询时共用一次聚合查询
+_STATS_CACHE_TTL = 5.0
+_stats_cache = {'ts': 0.0, 'val': None}
+
+
+def _invalidate_stats():
+    """清空统计缓存（下单或平仓成功后调用）"""
+    _stats_cache['val'] = None
+
+
+@event.listens_for(Trade, 'after_insert')
+def _invalidate_stats_on_trade_insert(mapper, connection, target):
+    """写入交易记录后清空统计缓存（包括策略交易回调写入的记录）"""
+    _invalidate_stats()
+
+
+def _get_trade_statistics(db: Session):
+    """获取交易统计（TTL内直接返回缓存结果）"""
+    cached = _stats_cache['val']
+    if cached is not None and time.monotonic() - _stats_cache['ts'] < _STATS_CACHE_TTL:
+        return cached
+    
+    stats = _query_trade_statistics(db)
+    _stats_cache['ts'] = time.monotonic()
+    _stats_cache['val'] = stats
+    return stats
 
 
 @router.get("/statistics")
@@ -350,12 +470,7 @@ async def get_account_statistics(db: Session = Depends(get_db)):
     """获取账户统计信息"""
     import asyncio
     
-    # 先获取快速数据（数据库查询）
-    total_trades = db.query(Trade).count()
-    win_trades = db.query(Trade).filter(Trade.pnl > 0).count()
-    loss_trades = db.query(Trade).filter(Trade.pnl < 0).count()
-    total_pnl = db.query(func.sum(Trade.pnl)).scalar() or 0.0
-    open_positions = db.query(Position).filter(Position.is_closed == False).count()
+    loop = asyncio.get_running_loop()
     
     # 默认余额值
     balance = {'total': 0.0, 'free': 0.0, 'used': 0.0}
@@ -367,39 +482,36 @@ async def get_account_statistics(db: Session = Depends(get_db)):
             if manager.exchanges:
                 exchange = list(manager.exchanges.values())[0]
                 # 在后台线程中执行同步调用
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(None, exchange.get_balance)
+                result = await loop.run_in_executor(None, get_cached_balance, exchange)
                 return result if result else balance
             else:
-                # 如果没有策略运行，创建默认交易所实例
-                use_testnet = os.getenv('BINANCE_TESTNET', 'False').lower() == 'true'
-                if use_testnet:
-                    api_key = os.getenv('BINANCE_TESTNET_API_KEY') or os.getenv('BINANCE_API_KEY', '')
-                    api_secret = os.getenv('BINANCE_TESTNET_SECRET_KEY') or os.getenv('BINANCE_SECRET_KEY', '')
-                else:
-                    api_key = os.getenv('BINANCE_API_KEY', '')
-                    api_secret = os.getenv('BINANCE_SECRET_KEY', '')
-                
-                if api_key and api_secret:
-                    loop = asyncio.get_event_loop()
-                    # 使用单例管理器获取exchange实例
-                    from ..exchange_manager import get_exchange
-                    exchange = await loop.run_in_executor(None, get_exchange)
-                    result = await loop.run_in_executor(None, exchange.get_balance)
+                # 如果没有策略运行，使用默认交易所实例
+                if get_settings().has_credentials:
+                    # 使用单例管理器获取exchange实例（带短时缓存）
+                    result = await loop.run_in_executor(None, get_cached_balance)
                     return result if result else balance
         except Exception as e:
             logger.warning(f"获取余额失败: {e}")
         return balance
     
     # 使用超时获取余额，如果超时则使用默认值
-    try:
-        balance = await asyncio.wait_for(fetch_balance(), timeout=2.0)
-    except asyncio.TimeoutError:
-        logger.warning("获取余额超时，使用默认值")
-        balance = {'total': 0.0, 'free': 0.0, 'used': 0.0}
-    except Exception as e:
-        logger.warning(f"获取账户余额时发生错误: {e}，将使用默认值0")
-        balance = {'total': 0.0, 'free': 0.0, 'used': 0.0}
+    async def fetch_balance_with_timeout():
+        try:
+            # 上下文管理器式超时，不像 wait_for 那样额外包装一个Task
+            async with async_timeout(2.0):
+                return await fetch_balance()
+        except asyncio.TimeoutError:
+            logger.warning("获取余额超时，使用默认值")
+        except Exception as e:
+            logger.warning(f"获取账户余额时发生错误: {e}，将使用默认值0")
+        return {'total': 0.0, 'free': 0.0, 'used': 0.0}
+    
+    # 数据库统计（线程池）与交易所余额请求并发执行，耗时取两者中较长者
+    stats, balance = await asyncio.gather(
+        loop.run_in_executor(None, _get_trade_statistics, db),
+        fetch_balance_with_timeout(),
+    )
+    total_trades, win_trades, loss_trades, total_pnl, open_positions = stats
     
     return {
         'total_balance': balance['total'] if balance else 0.0,
@@ -437,7 +549,7 @@ class ClosePositionRequest(BaseModel):
 
 
 @router.post("/market-order")
-async def create_market_order(request: MarketOrderRequest):
+def create_market_order(request: MarketOrderRequest):
     """创建市价订单"""
     try:
         # 使用单例管理器获取exchange实例
@@ -453,6 +565,9 @@ async def create_market_order(request: MarketOrderRequest):
         if not order:
             raise HTTPException(status_code=400, detail="创建市价订单失败")
         
+        invalidate_balance_cache()
+        _invalidate_stats()
+        
         return {
             'success': True,
             'order_id': order.get('id'),
@@ -471,7 +586,7 @@ async def create_market_order(request: MarketOrderRequest):
 
 
 @router.post("/limit-order")
-async def create_limit_order(request: LimitOrderRequest):
+def create_limit_order(request: LimitOrderRequest):
     """创建限价订单"""
     try:
         # 使用单例管理器获取exchange实例
@@ -488,6 +603,9 @@ async def create_limit_order(request: LimitOrderRequest):
         if not order:
             raise HTTPException(status_code=400, detail="创建限价订单失败")
         
+        invalidate_balance_cache()
+        _invalidate_stats()
+        
         return {
             'success': True,
             'order_id': order.get('id'),
@@ -506,7 +624,7 @@ async def create_limit_order(request: LimitOrderRequest):
 
 
 @router.post("/close-position")
-async def close_position(request: ClosePositionRequest):
+def close_position(request: ClosePositionRequest):
     """平仓"""
     try:
         # 使用单例管理器获取exchange实例
@@ -526,6 +644,9 @@ async def close_position(request: ClosePositionRequest):
         if not success:
             raise HTTPException(status_code=400, detail="平仓失败")
         
+        invalidate_balance_cache()
+        _invalidate_stats()
+        
         return {
             'success': True,
             'message': '平仓成功'
@@ -535,34 +656,3 @@ async def close_position(request: ClosePositionRequest):
     except Exception as e:
         logger.error(f"平仓失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"平仓失败: {str(e)}")
-
-
-@router.get("/positions/debug")
-async def debug_positions(db: Session = Depends(get_db)):
-    """调试端点：查看数据库中的持仓数据"""
-    try:
-        all_positions = db.query(Position).all()
-        closed_positions = db.query(Position).filter(Position.is_closed == True).all()
-        open_positions = db.query(Position).filter(Position.is_closed == False).all()
-        
-        return {
-            "total": len(all_positions),
-            "closed": len(closed_positions),
-            "open": len(open_positions),
-            "all_positions": [
-                {
-                    "id": p.id,
-                    "strategy_id": p.strategy_id,
-                    "symbol": p.symbol,
-                    "side": str(p.side),
-                    "is_closed": p.is_closed,
-                    "entry_price": p.entry_price,
-                    "contracts": p.contracts,
-                    "opened_at": p.opened_at.isoformat() if p.opened_at else None,
-                }
-                for p in all_positions
-            ]
-        }
-    except Exception as e:
-        logger.error(f"调试持仓数据失败: {e}", exc_info=True)
-        return {"error": str(e)}
\ No newline at end of file
@@ -1,37 +1,90 @@
 """回测API模块"""
 
+import asyncio
+import copy
 import logging
-import yaml
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
-from ..database import get_db
+from ..config import get_settings
+from ..database import get_db, SessionLocal
+from .. import backtest_cache, ohlcv_cache
 from ..models.strategy import Strategy
-from ..models.backtest import BacktestResult, BacktestStatus
-from ..backtester import Backtester
+from ..models.backtest import BacktestResult, BacktestStatus, BacktestPriceData
+from ..backtester import Backtester, PRICE_DATA_MAX_POINTS
 from ..exchange_manager import get_exchange
 from ..strategies.martingale import MartingaleStrategy
 from ..strategies.random_forest import RandomForestStrategy
 from ..strategies.llm_strategy import LLMStrategy
 from ..api.websocket import broadcast_backtest_progress
-from sqlalchemy.orm.attributes import flag_modified
+from ._ohlcv_kernels import dedup_sort
+from ._config_yaml import parse_config_cached
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/backtest", tags=["回测"])
+# 回测计算在独立进程中运行，多个回测可并行利用多核（不受GIL限制）
+_backtest_pool: Optional[ProcessPoolExecutor] = None
+# 子进程用spawn方式启动，不继承主进程的线程、事件循环和数据库连接（fork在多线程进程中不安全）
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+_backtest_pool_lock = threading.Lock()
+# 子进程的回测进度通过此队列回传主进程，再由主进程广播到WebSocket
+_progress_queue = None
+# 子进程中由 _init_backtest_worker 设置
+_worker_progress_queue = None
+
+# 进程池不可用时的回退：在当前进程的专用线程池中运行，避免占满默认线程池
+_BACKTEST_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="backtest")
+
+# 各时间周期的K线间隔（毫秒）
+_TIMEFRAME_MS = {
+    '1m': 60_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '4h': 14_400_000,
+    '1d': 86_400_000,
+}
+
+# 并发获取历史K线的最大请求数（兼顾交易所限频）
+_OHLCV_FETCH_CONCURRENCY = 8
+
+# 回测进度推送的最小间隔（秒），即每个回测最多每秒推送10次
+_PROGRESS_MIN_INTERVAL = 0.1
+
+router = APIRouter(prefix="/api/backtest", tags=["回测"], default_response_class=ORJSONResponse)
 
 
 class BacktestRequest(BaseModel):
     """回测请求"""
     strategy_id: int
-    start_date: str  # ISO格式日期字符串
-    end_date: str  # ISO格式日期字符串
+    start_date: datetime  # ISO格式日期字符串，由Pydantic解析（支持末尾Z）
+    end_date: datetime  # ISO格式日期字符串，由Pydantic解析（支持末尾Z）
     initial_balance: float = 10000.0
     symbol: Optional[str] = None  # 如果为空，从策略配置中获取
     timeframe: str = '1m'  # 时间周期
+    simulate_tick_level: bool = False  # 是否将K线展开为秒级数据模拟（数据量约为原来的60倍）
+    
+    @model_validator(mode='after')
+    def check_date_range(self) -> 'BacktestRequest':
+        """校验开始日期早于结束日期"""
+        if (self.start_date.tzinfo is None) != (self.end_date.tzinfo is None):
+            raise ValueError("开始日期和结束日期必须同时带或同时不带时区")
+        if self.start_date >= self.end_date:
+            raise ValueError("开始日期必须早于结束日期")
+        return self
 
 
 class BacktestResponse(BaseModel):
@@ -67,285 +120,529 @@ class BacktestDetailResponse(BacktestResponse):
     price_data: Optional[List[Dict]] = None  # 价格趋势数据
 
 
-def _run_backtest(backtest_id: int, strategy_id: int, start_date: datetime, 
-                  end_date: datetime, initial_balance: float, symbol: str,
-                  timeframe: str, strategy_config: Dict[str, Any], db: Session):
-    """在后台运行回测"""
+# 回测列表接口需要的列
+_RESULT_LIST_COLUMNS = (
+    BacktestResult.id,
+    BacktestResult.strategy_id,
+    BacktestResult.status,
+    BacktestResult.initial_balance,
+    BacktestResult.final_balance,
+    BacktestResult.total_return,
+    BacktestResult.total_trades,
+    BacktestResult.win_rate,
+    BacktestResult.max_drawdown,
+    BacktestResult.created_at,
+    BacktestResult.completed_at,
+)
+
+
+# 回测结果中与 BacktestResult 同名的标量字段
+_RESULT_FIELDS = (
+    'final_balance',
+    'total_return',
+    'total_return_amount',
+    'total_trades',
+    'win_trades',
+    'loss_trades',
+    'win_rate',
+    'max_drawdown',
+    'max_drawdown_amount',
+    'sharpe_ratio',
+    'profit_factor',
+    'avg_win',
+    'avg_loss',
+    'avg_trade_return',
+)
+
+
+# 顶层策略标识字段（按优先级排序）
+_TOP_LEVEL_DISPATCH = (
+    ('llm', LLMStrategy),
+    ('ml', RandomForestStrategy),
+    ('random_forest', RandomForestStrategy),
+    ('martingale', MartingaleStrategy),
+)
+
+# trading 字段下的策略标识（按优先级排序）
+_TRADING_LEVEL_DISPATCH = (
+    ('llm', LLMStrategy),
+    ('ml', RandomForestStrategy),
+)
+
+
+def _resolve_strategy_class(strategy_config: Dict[str, Any]) -> type:
+    """根据配置识别策略类型，未找到策略标识时默认使用马丁格尔策略"""
+    strategy_class = next((cls for key, cls in _TOP_LEVEL_DISPATCH if key in strategy_config), None)
+    if strategy_class is not None:
+        return strategy_class
+    
+    if 'trading' in strategy_config:
+        trading_config = strategy_config.get('trading') or {}
+        return next((cls for key, cls in _TRADING_LEVEL_DISPATCH if key in trading_config), MartingaleStrategy)
+    
+    logger.warning("未找到策略标识字段，默认使用马丁格尔策略")
+    return MartingaleStrategy
+
+
+def _clone_ccxt_client(source):
+    """为K线获取线程创建独立的ccxt实例（同步ccxt实例不是线程安全的），复用源实例的连接配置和市场信息"""
+    client = type(source)({
+        'apiKey': source.apiKey,
+        'secret': source.secret,
+        'enableRateLimit': source.enableRateLimit,
+        'timeout': source.timeout,
+        'proxies': source.proxies,
+        'options': copy.deepcopy(source.options),
+        'urls': copy.deepcopy(source.urls),  # 测试网（Demo Trading）使用不同的接口地址
+    })
+    if source.markets:
+        client.set_markets(source.markets, source.currencies)
+    return client
+
+
+def _find_first_available_timestamp(exchange, symbol: str, since: int) -> Optional[int]:
+    """
+    探测交易对在 since 之后最早可用的K线时间
+    
+    交易所对上市前的 since 会返回从上市时刻开始的数据，因此一次 limit=1 的日线请求即可定位，
+    无需二分查找。探测失败或无数据时返回None（按原区间获取）。
+    """
     try:
-        # 更新状态为运行中
-        backtest = db.query(BacktestResult).filter(BacktestResult.id == backtest_id).first()
-        if not backtest:
-            logger.error(f"回测记录 {backtest_id} 不存在")
-            return
-        
-        backtest.status = BacktestStatus.RUNNING
-        db.commit()
-        
-        # 获取交易所实例（用于获取历史数据）
-        exchange = get_exchange()
-        
-        # 计算需要获取的K线数量
-        timeframes = {
-            '1m': timedelta(minutes=1),
-            '5m': timedelta(minutes=5),
-            '15m': timedelta(minutes=15),
-            '30m': timedelta(minutes=30),
-            '1h': timedelta(hours=1),
-            '4h': timedelta(hours=4),
-            '1d': timedelta(days=1),
-        }
-        timeframe_delta = timeframes.get(timeframe, timedelta(minutes=1))
-        total_duration = end_date - start_date
-        limit = int(total_duration / timeframe_delta) + 100  # 多获取一些数据
-        
-        logger.info(f"开始获取历史数据: {symbol}, {timeframe}, 从 {start_date} 到 {end_date}")
-        
-        # 计算时间戳
-        start_timestamp = int(start_date.timestamp() * 1000)
-        end_timestamp = int(end_date.timestamp() * 1000)
-        
-        # 获取历史K线数据（使用since参数）
-        # 优先尝试获取1分钟数据，然后展开为秒级数据以获得更高精度
-        ohlcv_data = []
-        current_since = start_timestamp
-        max_candles_per_request = 1000  # CCXT通常限制每次最多1000条
-        
-        # 如果时间周期大于1分钟，先获取1分钟数据，然后展开为秒级
-        # 这样可以获得更精确的回测结果
-        fetch_timeframe = timeframe
-        if timeframe not in ['1m']:
-            # 对于大于1分钟的时间周期，先获取1分钟数据
-            fetch_timeframe = '1m'
-            logger.info(f"时间周期 {timeframe} 大于1分钟，将获取1分钟数据并展开为秒级数据")
-        
-        while current_since < end_timestamp:
-            try:
-                # 使用fetch_ohlcv获取历史数据
-                batch = exchange.exchange.fetch_ohlcv(
-                    symbol, 
-                    fetch_timeframe,  # 使用fetch_timeframe（可能是1m）
-                    since=current_since,
-                    limit=max_candles_per_request
-                )
-                
-                if not batch:
-                    break
-                
-                # 过滤到结束时间
-                batch_filtered = [
-                    candle for candle in batch
-                    if start_timestamp <= candle[0] <= end_timestamp
-                ]
-                
-                ohlcv_data.extend(batch_filtered)
-                
-                # 如果返回的数据少于请求的数量，说明已经获取完所有数据
-                if len(batch) < max_candles_per_request:
-                    break
-                
-                # 更新since为最后一条数据的时间戳
-                current_since = batch[-1][0] + 1
-                
-                # 如果最后一条数据已经超过结束时间，停止
-                if batch[-1][0] >= end_timestamp:
+        probe = exchange.exchange.fetch_ohlcv(symbol, '1d', since=since, limit=1)
+    except Exception as e:
+        logger.warning(f"探测最早可用K线失败: {e}")
+        return None
+    return int(probe[0][0]) if probe else None
+
+
+def _fetch_ohlcv_data(symbol: str, timeframe: str, start_date: datetime,
+                      end_date: datetime) -> Tuple[np.ndarray, str, bool]:
+    """分页获取回测所需的历史K线（I/O密集），返回去重排序后的K线数组（N×6 float64）、实际获取的时间周期，
+    以及数据是否完整（有窗口获取失败时为False）"""
+    # 获取交易所实例（用于获取历史数据）
+    exchange = get_exchange()
+    
+    logger.info("开始获取历史数据: %s, %s, 从 %s 到 %s", symbol, timeframe, start_date, end_date)
+    
+    # 计算时间戳
+    start_timestamp = int(start_date.timestamp() * 1000)
+    end_timestamp = int(end_date.timestamp() * 1000)
+    
+    # 获取历史K线数据（使用since参数）
+    # 优先获取1分钟数据以获得更高精度（只有开启秒级模拟时才会展开为秒级数据）
+    max_candles_per_request = 1000  # CCXT通常限制每次最多1000条
+    
+    # 如果时间周期大于1分钟，改为获取1分钟数据，这样可以获得更精确的回测结果
+    fetch_timeframe = timeframe
+    if timeframe not in ['1m']:
+        # 对于大于1分钟的时间周期，先获取1分钟数据
+        fetch_timeframe = '1m'
+        logger.info("时间周期 %s 大于1分钟，将获取1分钟数据", timeframe)
+    
+    # 计算需要获取的K线数量（按实际获取的时间周期）
+    fetch_timeframe_ms = _TIMEFRAME_MS.get(fetch_timeframe, _TIMEFRAME_MS['1m'])
+    limit = (end_timestamp - start_timestamp) // fetch_timeframe_ms + 100  # 多获取一些数据
+    
+    # 按UTC日读取磁盘缓存，只有未缓存的日期才向交易所请求
+    days = ohlcv_cache.day_starts(start_timestamp, end_timestamp)
+    day_candles: Dict[int, np.ndarray] = {}
+    for day in days:
+        cached = ohlcv_cache.load_day(symbol, fetch_timeframe, day)
+        if cached is not None:
+            day_candles[day] = cached
+    missing_days = [day for day in days if day not in day_candles]
+    if len(missing_days) < len(days):
+        logger.info("K线缓存命中 %d/%d 天", len(days) - len(missing_days), len(days))
+    
+    # 交易对可能在回测开始之后才上市：先用一根日线探测最早可用时间，跳过上市前的日期
+    if len(missing_days) > 1:
+        first_timestamp = _find_first_available_timestamp(exchange, symbol, missing_days[0])
+        if first_timestamp is not None:
+            missing_days = [day for day in missing_days if day + ohlcv_cache.DAY_MS > first_timestamp]
+    
+    # 连续的缺失日期合并为一段，再按每次请求可覆盖的时间跨度切分窗口并发获取
+    # （不按天切分，避免每天都多出一个不满的请求；窗口边界的重叠由去重处理）
+    window_ms = fetch_timeframe_ms * max_candles_per_request
+    spans: List[List[int]] = []
+    for day in missing_days:
+        if spans and spans[-1][1] == day:
+            spans[-1][1] = day + ohlcv_cache.DAY_MS
+        else:
+            spans.append([day, day + ohlcv_cache.DAY_MS])
+    windows = [(since, min(since + window_ms, span_end))
+               for span_start, span_end in spans for since in range(span_start, span_end, window_ms)]
+    now_timestamp = int(datetime.now(timezone.utc).timestamp() * 1000)
+    
+    # 每个获取线程使用各自的ccxt实例
+    thread_local = threading.local()
+    
+    def fetch_window(window: Tuple[int, int]) -> Tuple[List[List], bool]:
+        """获取单个窗口的K线，返回K线及是否取到了窗口末尾（请求失败或数据提前中断时为False）"""
+        since, until = window
+        client = getattr(thread_local, 'client', None)
+        if client is None:
+            client = thread_local.client = _clone_ccxt_client(exchange.exchange)
+        batches: List[List] = []
+        cursor = since
+        # 最后一根K线的开盘时间到达窗口末尾前一个周期即为完整（尚未结束的窗口只需取到当前时间）
+        target = min(until, now_timestamp) - fetch_timeframe_ms
+        try:
+            while cursor <= target:
+                # 使用fetch_ohlcv获取历史数据（使用fetch_timeframe，可能是1m）
+                batch = client.fetch_ohlcv(symbol, fetch_timeframe, since=cursor, limit=max_candles_per_request)
+                if not batch or batch[-1][0] < cursor:
                     break
-                    
-            except Exception as e:
-                logger.warning(f"获取历史数据批次失败: {e}")
-                break
-        
-        # 去重并排序
-        if ohlcv_data:
-            # 按时间戳去重
-            seen = set()
-            unique_data = []
-            for candle in ohlcv_data:
-                if candle[0] not in seen:
-                    seen.add(candle[0])
-                    unique_data.append(candle)
-            ohlcv_data = sorted(unique_data, key=lambda x: x[0])
-        
-        if not ohlcv_data:
-            raise ValueError("指定时间范围内没有数据")
-        
-        logger.info(f"获取到 {len(ohlcv_data)} 条 {fetch_timeframe} K线数据")
+                batches.extend(batch)
+                # 返回的数据没有覆盖到窗口末尾时，从最后一根K线之后继续请求
+                cursor = int(batch[-1][0]) + fetch_timeframe_ms
+        except Exception as e:
+            logger.warning(f"获取历史数据批次失败: {e}")
+            return batches, False
+        if cursor <= target:
+            logger.warning("K线窗口 %d 的数据未到达窗口末尾 %d", since, until)
+            return batches, False
+        return batches, True
+    
+    failed_windows: List[Tuple[int, int]] = []
+    if windows:
+        arrays: List[np.ndarray] = []
+        with ThreadPoolExecutor(max_workers=min(_OHLCV_FETCH_CONCURRENCY, len(windows))) as pool:
+            for window, (batch, window_complete) in zip(windows, pool.map(fetch_window, windows)):
+                if not window_complete:
+                    failed_windows.append(window)
+                if batch:
+                    arrays.append(np.asarray(batch, dtype=np.float64))
         
-        # 将所有K线数据展开为秒级数据，确保回测精确到秒级别
+        fetched = dedup_sort(np.concatenate(arrays)) if arrays else np.empty((0, 6), dtype=np.float64)
+        for day in missing_days:
+            day_end = day + ohlcv_cache.DAY_MS
+            # 已按时间排序，二分查找当日边界（切片为视图，不逐根比较）
+            lo, hi = np.searchsorted(fetched[:, 0], (day, day_end), side='left')
+            if lo == hi:
+                continue
+            candles = fetched[lo:hi]
+            day_candles[day] = candles
+            # 只缓存已经结束且完整获取的交易日（与失败窗口有重叠的日期不缓存）
+            complete = not any(since < day_end and until > day for since, until in failed_windows)
+            if complete and day_end <= now_timestamp:
+                ohlcv_cache.save_day(symbol, fetch_timeframe, day, candles)
+    
+    # 预分配连续的 float64 缓冲区，按日拷贝并过滤到回测区间
+    buf = np.empty((limit + max_candles_per_request, 6), dtype=np.float64)
+    pos = 0
+    for day in days:
+        b = day_candles.get(day)
+        if b is None:
+            continue
+        b = b[np.searchsorted(b[:, 0], start_timestamp, side='left'):
+              np.searchsorted(b[:, 0], end_timestamp, side='right')]
+        if pos + len(b) > buf.shape[0]:
+            buf = np.resize(buf, (max(buf.shape[0] * 2, pos + len(b)), 6))
+        buf[pos:pos + len(b)] = b
+        pos += len(b)
+    
+    # 去重并排序（保持为紧凑数组，传给回测进程时按单块缓冲区序列化）
+    candles = dedup_sort(buf[:pos])
+    
+    if not len(candles):
+        raise ValueError("指定时间范围内没有数据")
+    
+    if failed_windows:
+        logger.warning("有 %d 个K线窗口获取失败，历史数据不完整", len(failed_windows))
+    logger.info("获取到 %d 条 %s K线数据", len(candles), fetch_timeframe)
+    return candles, fetch_timeframe, not failed_windows
+
+
+def _iter_candle_rows(candles: np.ndarray):
+    """逐行生成 Backtester 使用的K线列表（时间戳保持为整数毫秒）"""
+    for row in candles:
+        values = row.tolist()
+        values[0] = int(values[0])
+        yield values
+
+
+def _execute_backtest(backtest_id: int, strategy_config: Dict[str, Any], candles: np.ndarray,
+                      fetch_timeframe: str, initial_balance: float,
+                      simulate_tick_level: bool = False) -> Dict[str, Any]:
+    """运行回测引擎（CPU密集），开启秒级模拟时先展开秒级数据"""
+    if simulate_tick_level:
+        # 将所有K线数据展开为秒级数据，确保回测精确到秒级别（逐行展开，不额外生成整份原始K线列表）
         from ..backtester import expand_ohlcv_to_seconds
-        original_count = len(ohlcv_data)
-        ohlcv_data = expand_ohlcv_to_seconds(ohlcv_data, fetch_timeframe)
-        logger.info(f"已展开为秒级数据: {original_count} 条 {fetch_timeframe} K线 -> {len(ohlcv_data)} 条秒级数据点")
-        
-        # 根据配置自动识别策略类型
-        strategy_class = None
-        
-        # 优先检查顶层的策略标识字段
-        if 'llm' in strategy_config:
-            logger.info("检测到顶层llm配置，使用LLM多因子策略")
-            strategy_class = LLMStrategy
-        elif 'ml' in strategy_config or 'random_forest' in strategy_config:
-            logger.info("检测到顶层ml/random_forest配置，使用随机森林策略")
-            strategy_class = RandomForestStrategy
-        elif 'martingale' in strategy_config:
-            logger.info("检测到顶层martingale配置，使用马丁格尔策略")
-            strategy_class = MartingaleStrategy
-        elif 'trading' in strategy_config:
-            # 检查trading字段下的配置
-            trading_config = strategy_config.get('trading', {})
-            if 'llm' in trading_config:
-                logger.info("检测到trading.llm配置，使用LLM多因子策略")
-                strategy_class = LLMStrategy
-            elif 'ml' in trading_config:
-                logger.info("检测到trading.ml配置，使用随机森林策略")
-                strategy_class = RandomForestStrategy
-            else:
-                logger.info("检测到trading配置但无策略标识，默认使用马丁格尔策略")
-                strategy_class = MartingaleStrategy
+        ohlcv_data = expand_ohlcv_to_seconds(_iter_candle_rows(candles), fetch_timeframe)
+        logger.info("秒级模拟: %d 条 %s K线 -> %d 条秒级数据点", len(candles), fetch_timeframe, len(ohlcv_data))
+    else:
+        ohlcv_data = list(_iter_candle_rows(candles))
+        logger.info("K线模拟: 直接使用 %d 条 %s K线回测", len(ohlcv_data), fetch_timeframe)
+    
+    # 根据配置自动识别策略类型
+    strategy_class = _resolve_strategy_class(strategy_config)
+    logger.info("使用策略类: %s", strategy_class.__name__)
+    
+    # 创建进度回调函数
+    last_sent = [0.0]
+    
+    def progress_callback(current: int, total: int, percentage: float, current_balance: float):
+        """回测进度回调（限制推送频率，在子进程中运行时转发给主进程）"""
+        now = time.monotonic()
+        if now - last_sent[0] < _PROGRESS_MIN_INTERVAL and current != total:
+            return
+        last_sent[0] = now
+        if _worker_progress_queue is not None:
+            _worker_progress_queue.put((backtest_id, current, total, percentage, current_balance))
         else:
-            logger.warning("未找到策略标识字段，默认使用马丁格尔策略")
-            strategy_class = MartingaleStrategy
-        
-        if strategy_class is None:
-            raise ValueError("无法识别策略类型，请检查配置文件中是否包含 llm、ml 或 martingale 字段")
-        
-        # 创建进度回调函数
-        def progress_callback(current: int, total: int, percentage: float, current_balance: float):
-            """回测进度回调"""
             broadcast_backtest_progress(backtest_id, current, total, percentage, current_balance)
-        
-        # 创建回测引擎
-        backtester = Backtester(
-            strategy_class=strategy_class,
-            strategy_config=strategy_config,
-            ohlcv_data=ohlcv_data,
-            initial_balance=initial_balance,
-            progress_callback=progress_callback
+    
+    # 创建回测引擎
+    backtester = Backtester(
+        strategy_class=strategy_class,
+        strategy_config=strategy_config,
+        ohlcv_data=ohlcv_data,
+        initial_balance=initial_balance,
+        progress_callback=progress_callback
+    )
+    
+    # 运行回测
+    return backtester.run()
+
+
+def _init_backtest_worker(progress_queue):
+    """回测子进程初始化"""
+    global _worker_progress_queue
+    _worker_progress_queue = progress_queue
+
+
+def _relay_backtest_progress(progress_queue):
+    """将子进程回传的回测进度广播到WebSocket（主进程后台线程）"""
+    while True:
+        try:
+            broadcast_backtest_progress(*progress_queue.get())
+        except Exception as e:
+            logger.warning(f"转发回测进度失败: {e}")
+
+
+def _get_backtest_pool() -> Optional[ProcessPoolExecutor]:
+    """获取回测进程池（首次调用时创建），创建失败返回None"""
+    global _backtest_pool, _progress_queue
+    with _backtest_pool_lock:
+        if _backtest_pool is None:
+            try:
+                if _progress_queue is None:
+                    _progress_queue = _MP_CONTEXT.Queue()
+                    threading.Thread(
+                        target=_relay_backtest_progress,
+                        args=(_progress_queue,),
+                        name="backtest-progress",
+                        daemon=True
+                    ).start()
+                workers = get_settings().backtest_workers or os.cpu_count() or 1
+                _backtest_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=_MP_CONTEXT,
+                    initializer=_init_backtest_worker,
+                    initargs=(_progress_queue,)
+                )
+                logger.info("回测进程池已创建，进程数: %d", workers)
+            except Exception as e:
+                logger.warning(f"创建回测进程池失败，回测将在当前进程中运行: {e}")
+                return None
+        return _backtest_pool
+
+
+def _discard_backtest_pool():
+    """丢弃已损坏的回测进程池，下次使用时重新创建"""
+    global _backtest_pool
+    with _backtest_pool_lock:
+        if _backtest_pool is not None:
+            _backtest_pool.shutdown(wait=False)
+            _backtest_pool = None
+
+
+def shutdown_backtest_pool():
+    """关闭回测进程池（应用关闭时调用），取消尚未开始的回测并等待子进程退出"""
+    global _backtest_pool
+    with _backtest_pool_lock:
+        pool, _backtest_pool = _backtest_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+        logger.info("回测进程池已关闭")
+
+
+def _mark_backtest_running(backtest_id: int, db: Session) -> bool:
+    """更新回测状态为运行中，记录不存在时返回False"""
+    updated = db.query(BacktestResult).filter(BacktestResult.id == backtest_id).update(
+        {BacktestResult.status: BacktestStatus.RUNNING}, synchronize_session=False
+    )
+    if not updated:
+        logger.error(f"回测记录 {backtest_id} 不存在")
+        return False
+    
+    db.commit()
+    return True
+
+
+def _save_backtest_results(backtest_id: int, results: Dict[str, Any], db: Session):
+    """保存回测结果（结果字段单条UPDATE，价格数据批量写入独立表）"""
+    update_values = {getattr(BacktestResult, name): results[name] for name in _RESULT_FIELDS}
+    update_values[BacktestResult.equity_curve] = results['equity_curve']
+    update_values[BacktestResult.trades_data] = results['trades']
+    
+    # 价格数据写入独立表（数据点过多时进行采样，避免数据库过大）
+    price_data = results.get('price_data')
+    if price_data:
+        if len(price_data) > PRICE_DATA_MAX_POINTS:
+            sample_rate = max(1, len(price_data) // PRICE_DATA_MAX_POINTS)
+            price_data = price_data[::sample_rate]
+            logger.info("价格数据点过多，按每 %d 个点取1个采样为 %d 条", sample_rate, len(price_data))
+        db.bulk_insert_mappings(BacktestPriceData, [
+            {
+                'backtest_id': backtest_id,
+                'timestamp': point['timestamp'],
+                'open': point['open'],
+                'high': point['high'],
+                'low': point['low'],
+                'close': point['close'],
+                'volume': point.get('volume', 0),
+            }
+            for point in price_data
+        ])
+        logger.info("价格数据已保存，共 %d 条记录", len(price_data))
+    else:
+        logger.warning(f"回测结果中没有price_data字段或price_data为空。results keys: {list(results.keys())}")
+    
+    update_values[BacktestResult.status] = BacktestStatus.COMPLETED
+    # 由数据库在UPDATE中填写完成时间（UTC）
+    update_values[BacktestResult.completed_at] = func.now()
+    
+    db.query(BacktestResult).filter(BacktestResult.id == backtest_id).update(
+        update_values, synchronize_session=False
+    )
+    db.commit()
+    logger.info("回测 %s 完成，结果已保存", backtest_id)
+
+
+def _mark_backtest_failed(backtest_id: int, error: Exception, db: Session):
+    """更新回测状态为失败"""
+    try:
+        # 丢弃保存结果时可能未完成的事务（如已写入一半的价格数据）
+        db.rollback()
+        db.query(BacktestResult).filter(BacktestResult.id == backtest_id).update(
+            {BacktestResult.status: BacktestStatus.FAILED, BacktestResult.error_message: str(error)},
+            synchronize_session=False
         )
+        db.commit()
+    except Exception as commit_error:
+        logger.error(f"更新回测状态失败: {commit_error}")
+
+
+def _is_result_cacheable(end_date: datetime, strategy_config: Dict[str, Any]) -> bool:
+    """回测区间已结束且策略结果确定（LLM策略结果不确定）时才缓存回测结果"""
+    # 未带时区的时间按UTC处理，避免按服务器本地时区换算
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=timezone.utc)
+    return end_date.timestamp() < time.time() and _resolve_strategy_class(strategy_config) is not LLMStrategy
+
+
+async def _compute_backtest_results(backtest_id: int, start_date: datetime, end_date: datetime,
+                                    initial_balance: float, symbol: str, timeframe: str,
+                                    strategy_config: Dict[str, Any],
+                                    simulate_tick_level: bool = False) -> Tuple[Dict[str, Any], bool]:
+    """获取历史数据并执行回测，返回回测结果及历史数据是否完整"""
+    loop = asyncio.get_running_loop()
+    candles, fetch_timeframe, complete = await loop.run_in_executor(
+        None, _fetch_ohlcv_data, symbol, timeframe, start_date, end_date
+    )
+    
+    args = (backtest_id, strategy_config, candles, fetch_timeframe, initial_balance, simulate_tick_level)
+    pool = _get_backtest_pool()
+    if pool is None:
+        results = await loop.run_in_executor(_BACKTEST_EXECUTOR, _execute_backtest, *args)
+        return results, complete
+    try:
+        results = await loop.run_in_executor(pool, _execute_backtest, *args)
+    except BrokenProcessPool:
+        # 子进程异常退出（可能正是本次回测导致的），不在主进程中重试，回测标记为失败
+        _discard_backtest_pool()
+        raise
+    return results, complete
+
+
+async def _run_backtest(backtest_id: int, strategy_id: int, start_date: datetime, 
+                        end_date: datetime, initial_balance: float, symbol: str,
+                        timeframe: str, strategy_config: Dict[str, Any],
+                        simulate_tick_level: bool = False):
+    """在后台运行回测：I/O阶段走默认线程池，回测计算提交到进程池"""
+    loop = asyncio.get_running_loop()
+    # 请求的数据库会话在后台任务执行前就已关闭，这里使用独立的会话
+    db = SessionLocal()
+    try:
+        if not await loop.run_in_executor(None, _mark_backtest_running, backtest_id, db):
+            return
         
-        # 运行回测
-        results = backtester.run()
-        
-        # 更新回测结果
-        backtest.final_balance = results['final_balance']
-        backtest.total_return = results['total_return']
-        backtest.total_return_amount = results['total_return_amount']
-        backtest.total_trades = results['total_trades']
-        backtest.win_trades = results['win_trades']
-        backtest.loss_trades = results['loss_trades']
-        backtest.win_rate = results['win_rate']
-        backtest.max_drawdown = results['max_drawdown']
-        backtest.max_drawdown_amount = results['max_drawdown_amount']
-        backtest.sharpe_ratio = results['sharpe_ratio']
-        backtest.profit_factor = results['profit_factor']
-        backtest.avg_win = results['avg_win']
-        backtest.avg_loss = results['avg_loss']
-        backtest.avg_trade_return = results['avg_trade_return']
-        backtest.equity_curve = results['equity_curve']
-        backtest.trades_data = results['trades']
+        # 相同参数在已结束的历史区间上回测结果相同，命中缓存时跳过获取数据和回测计算
+        cache_key = None
+        results = None
+        if _is_result_cacheable(end_date, strategy_config):
+            cache_key = backtest_cache.make_key({
+                'strategy_config': strategy_config,
+                'start_date': start_date,
+                'end_date': end_date,
+                'initial_balance': initial_balance,
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'simulate_tick_level': simulate_tick_level,
+            })
+            results = await loop.run_in_executor(None, backtest_cache.load, cache_key)
         
-        # 保存价格数据（如果存在）
-        if 'price_data' in results and results['price_data']:
-            price_data = results['price_data']
-            logger.info(f"准备保存价格数据: {len(price_data)} 条记录")
-            
-            # 将价格数据存储到parameters中
-            # 确保parameters是一个可修改的字典
-            if backtest.parameters is None:
-                backtest.parameters = {}
-            elif not isinstance(backtest.parameters, dict):
-                # 如果parameters不是字典，尝试转换
-                logger.warning(f"parameters类型不是dict: {type(backtest.parameters)}，尝试转换")
-                try:
-                    import json
-                    if isinstance(backtest.parameters, str):
-                        backtest.parameters = json.loads(backtest.parameters)
-                    else:
-                        # 创建一个新字典
-                        original_params = backtest.parameters
-                        backtest.parameters = {}
-                        # 尝试保留原有配置
-                        if hasattr(original_params, '__dict__'):
-                            backtest.parameters.update(original_params.__dict__)
-                except Exception as e:
-                    logger.error(f"转换parameters失败: {e}，创建新字典")
-                    backtest.parameters = {}
-            
-            # 保存价格数据（限制数据量，避免数据库过大）
-            # 如果数据点太多，进行采样（每10个点取1个）
-            if len(price_data) > 10000:
-                logger.info(f"价格数据点过多({len(price_data)})，进行采样（每10个点取1个）")
-                sample_rate = max(1, len(price_data) // 10000)
-                price_data = price_data[::sample_rate]
-                logger.info(f"采样后数据点: {len(price_data)}")
-            
-            # 保存价格数据
-            backtest.parameters['price_data'] = price_data
-            # 标记JSON字段已修改，确保SQLAlchemy正确保存
-            flag_modified(backtest, 'parameters')
-            logger.info(f"价格数据已保存到parameters，共 {len(price_data)} 条记录")
-            
-            # 验证保存
-            if backtest.parameters.get('price_data'):
-                logger.info(f"验证：parameters中price_data数量: {len(backtest.parameters['price_data'])}")
-            else:
-                logger.error("警告：保存后无法从parameters中读取price_data")
+        if results is not None:
+            logger.info("回测 %s 命中结果缓存", backtest_id)
+            broadcast_backtest_progress(backtest_id, 1, 1, 100.0, results['final_balance'])
         else:
-            logger.warning(f"回测结果中没有price_data字段或price_data为空。results keys: {list(results.keys())}")
+            results, complete = await _compute_backtest_results(
+                backtest_id, start_date, end_date, initial_balance, symbol, timeframe, strategy_config,
+                simulate_tick_level
+            )
+            # 历史数据有缺口时结果不可复用，不写入缓存
+            if cache_key and not complete:
+                logger.warning("回测 %s 的历史数据不完整，结果不写入缓存", backtest_id)
+            elif cache_key:
+                await loop.run_in_executor(None, backtest_cache.save, cache_key, results)
         
-        backtest.status = BacktestStatus.COMPLETED
-        backtest.completed_at = datetime.utcnow()
-        
-        db.commit()
-        logger.info(f"回测 {backtest_id} 完成，价格数据已保存")
+        await loop.run_in_executor(None, _save_backtest_results, backtest_id, results, db)
         
     except Exception as e:
         logger.error(f"回测执行失败: {e}", exc_info=True)
-        try:
-            backtest = db.query(BacktestResult).filter(BacktestResult.id == backtest_id).first()
-            if backtest:
-                backtest.status = BacktestStatus.FAILED
-                backtest.error_message = str(e)
-                db.commit()
-        except Exception as commit_error:
-            logger.error(f"更新回测状态失败: {commit_error}")
+        await loop.run_in_executor(None, _mark_backtest_failed, backtest_id, e, db)
+    finally:
+        db.close()
 
 
 @router.post("/run", response_model=BacktestResponse)
-async def run_backtest(
+def run_backtest(
     request: BacktestRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """运行回测"""
     # 获取策略
-    strategy = db.query(Strategy).filter(Strategy.id == request.strategy_id).first()
+    strategy = db.get(Strategy, request.strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
-    # 解析日期
-    try:
-        start_date = datetime.fromisoformat(request.start_date.replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(request.end_date.replace('Z', '+00:00'))
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"日期格式错误: {e}")
-    
-    if start_date >= end_date:
-        raise HTTPException(status_code=400, detail="开始日期必须早于结束日期")
+    start_date = request.start_date
+    end_date = request.end_date
     
-    # 获取交易对
-    symbol = request.symbol
-    if not symbol:
+    # 获取策略配置（优先使用写入时已解析的配置，旧记录回退到解析YAML）
+    if strategy.config_json is not None:
+        strategy_config = strategy.config_json
+    else:
         try:
-            config = yaml.safe_load(strategy.config_yaml or '{}')
-            symbol = config.get('trading', {}).get('symbol', 'BTC/USDT:USDT')
-        except:
-            symbol = 'BTC/USDT:USDT'
+            # 缓存的解析结果是共享的，复制后再交给回测任务
+            strategy_config = copy.deepcopy(parse_config_cached(strategy.config_yaml or ''))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"策略配置解析失败: {e}")
     
-    # 获取策略配置
-    try:
-        strategy_config = yaml.safe_load(strategy.config_yaml or '{}')
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"策略配置解析失败: {e}")
+    # 获取交易对
+    symbol = request.symbol or (strategy_config.get('trading') or {}).get('symbol', 'BTC/USDT:USDT')
     
     # 创建回测记录
     backtest = BacktestResult(
@@ -374,10 +671,10 @@ async def run_backtest(
         symbol,
         request.timeframe,
         strategy_config,
-        db
+        request.simulate_tick_level
     )
     
-    return BacktestResponse(
+    return BacktestResponse.model_construct(
         id=backtest.id,
         strategy_id=backtest.strategy_id,
         status=backtest.status.value,
@@ -393,14 +690,15 @@ async def run_backtest(
 
 
 @router.get("/results", response_model=List[BacktestResponse])
-async def get_backtest_results(
+def get_backtest_results(
     strategy_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
     """获取回测结果列表"""
-    query = db.query(BacktestResult)
+    # 只查询列表需要的列，避免加载 equity_curve / trades_data 等大JSON字段
+    query = db.query(*_RESULT_LIST_COLUMNS)
     
     if strategy_id:
         query = query.filter(BacktestResult.strategy_id == strategy_id)
@@ -408,7 +706,7 @@ async def get_backtest_results(
     backtests = query.order_by(BacktestResult.created_at.desc()).offset(skip).limit(limit).all()
     
     return [
-        BacktestResponse(
+        BacktestResponse.model_construct(
             id=bt.id,
             strategy_id=bt.strategy_id,
             status=bt.status.value,
@@ -426,44 +724,42 @@ async def get_backtest_results(
 
 
 @router.get("/results/{backtest_id}", response_model=BacktestDetailResponse)
-async def get_backtest_detail(
+def get_backtest_detail(
     backtest_id: int,
     db: Session = Depends(get_db)
 ):
     """获取回测详情"""
-    backtest = db.query(BacktestResult).filter(BacktestResult.id == backtest_id).first()
+    backtest = db.get(BacktestResult, backtest_id)
     if not backtest:
         raise HTTPException(status_code=404, detail="回测结果不存在")
     
-    # 从parameters中提取价格数据
-    price_data = None
-    if backtest.parameters:
-        try:
-            if isinstance(backtest.parameters, dict):
-                price_data = backtest.parameters.get('price_data')
-                logger.info(f"从parameters中提取价格数据: {len(price_data) if price_data else 0} 条记录")
-            elif isinstance(backtest.parameters, str):
-                # 如果是字符串，尝试解析JSON
-                import json
-                params_dict = json.loads(backtest.parameters)
-                price_data = params_dict.get('price_data')
-                logger.info(f"从JSON字符串中提取价格数据: {len(price_data) if price_data else 0} 条记录")
-            else:
-                logger.warning(f"parameters类型不是dict或str: {type(backtest.parameters)}")
-                # 尝试转换为字典
-                try:
-                    if hasattr(backtest.parameters, 'get'):
-                        price_data = backtest.parameters.get('price_data')
-                    elif hasattr(backtest.parameters, '__dict__'):
-                        price_data = backtest.parameters.__dict__.get('price_data')
-                except Exception as e:
-                    logger.error(f"转换parameters失败: {e}")
-        except Exception as e:
-            logger.error(f"提取价格数据时出错: {e}", exc_info=True)
+    # 从价格数据表中按时间顺序读取价格数据
+    price_rows = db.query(
+        BacktestPriceData.timestamp, BacktestPriceData.open, BacktestPriceData.high,
+        BacktestPriceData.low, BacktestPriceData.close, BacktestPriceData.volume
+    ).filter(BacktestPriceData.backtest_id == backtest_id).order_by(BacktestPriceData.timestamp).all()
+    if price_rows:
+        price_data = [
+            {
+                'timestamp': row.timestamp,
+                'time': datetime.fromtimestamp(row.timestamp / 1000).isoformat() if row.timestamp else None,
+                'open': row.open,
+                'high': row.high,
+                'low': row.low,
+                'close': row.close,
+                'volume': row.volume,
+            }
+            for row in price_rows
+        ]
+    elif isinstance(backtest.parameters, dict):
+        # 兼容旧版本保存在parameters中的价格数据
+        price_data = backtest.parameters.get('price_data')
+    else:
+        price_data = None
     
-    logger.info(f"返回回测详情，price_data: {'存在' if price_data else '不存在'}, 数量: {len(price_data) if price_data else 0}")
+    logger.info("返回回测详情，price_data: %s, 数量: %d", '存在' if price_data else '不存在', len(price_data) if price_data else 0)
     
-    return BacktestDetailResponse(
+    return BacktestDetailResponse.model_construct(
         id=backtest.id,
         strategy_id=backtest.strategy_id,
         status=backtest.status.value,
@@ -493,15 +789,17 @@ async def get_backtest_detail(
 
 
 @router.delete("/results/{backtest_id}")
-async def delete_backtest_result(
+def delete_backtest_result(
     backtest_id: int,
     db: Session = Depends(get_db)
 ):
     """删除回测结果"""
-    backtest = db.query(BacktestResult).filter(BacktestResult.id == backtest_id).first()
+    backtest = db.get(BacktestResult, backtest_id)
     if not backtest:
         raise HTTPException(status_code=404, detail="回测结果不存在")
     
+    # 先批量删除价格数据，避免级联删除时逐行加载
+    db.query(BacktestPriceData).filter(BacktestPriceData.backtest_id == backtest_id).delete(synchronize_session=False)
     db.delete(backtest)
     db.commit()
     
@@ -1,29 +1,35 @@
 """策略管理API"""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import and_, func, lambda_stmt, select
+from sqlalchemy.orm import Session, load_only
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+import asyncio
 import logging
 
-from ..database import get_db
+from ..database import SessionLocal, get_db
+from .account import _iter_json_array
+from ._config_yaml import YAML_LOADER, parse_config_cached
 from ..models.strategy import Strategy, StrategyRun, StrategyStatus, StrategyType
+from ..models.trade import Trade
 from ..strategy_manager import get_strategy_manager
-from ..exchange import BinanceExchange
+from ..exchange_manager import get_cached_ohlcv, get_exchange
+from ..config import get_settings
 import yaml
-import os
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/strategies", tags=["strategies"])
+router = APIRouter(prefix="/api/strategies", tags=["strategies"], default_response_class=ORJSONResponse)
 
 
 class StrategyCreate(BaseModel):
     """创建策略请求"""
     name: str
     description: Optional[str] = None
-    strategy_type: str = "config"
+    strategy_type: StrategyType = StrategyType.CONFIG
     config_yaml: Optional[str] = None
     code_path: Optional[str] = None
     code_content: Optional[str] = None
@@ -40,6 +46,19 @@ class StrategyUpdate(BaseModel):
     class_name: Optional[str] = None
 
 
+class StrategyListItem(BaseModel):
+    """策略列表项（不含配置YAML和代码内容）"""
+    id: int
+    name: str
+    description: Optional[str]
+    strategy_type: str
+    status: str
+    code_path: Optional[str] = None
+    class_name: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 class StrategyResponse(BaseModel):
     """策略响应"""
     id: int
@@ -54,48 +73,187 @@ class StrategyResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-@router.get("", response_model=List[StrategyResponse])
-async def get_strategies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def _load_config_yaml(config_yaml: str) -> dict:
+    """解析并校验策略YAML配置，解析结果与运行时使用的配置一致"""
+    try:
+        config = yaml.load(config_yaml, Loader=YAML_LOADER)
+    except yaml.YAMLError as e:
+        raise HTTPException(status_code=400, detail=f"YAML格式错误: {e}")
+    if config is None:
+        return {}
+    if not isinstance(config, dict):
+        raise HTTPException(status_code=400, detail="YAML配置的顶层必须是键值对")
+    return config
+
+
+def _strategy_to_dict(strategy: Strategy) -> dict:
+    """策略记录转换为可序列化的字典（字段与StrategyResponse一致）"""
+    return {
+        'id': strategy.id,
+        'name': strategy.name,
+        'description': strategy.description,
+        'strategy_type': strategy.strategy_type.value,
+        'status': strategy.status.value,
+        'config_yaml': strategy.config_yaml,
+        'code_path': strategy.code_path,
+        'code_content': strategy.code_content,
+        'class_name': strategy.class_name,
+        'created_at': strategy.created_at,
+        'updated_at': strategy.updated_at,
+    }
+
+
+# 策略列表接口需要的列（编辑时通过详情接口获取配置YAML和代码内容）
+_STRATEGY_LIST_COLUMNS = (
+    Strategy.id,
+    Strategy.name,
+    Strategy.description,
+    Strategy.strategy_type,
+    Strategy.status,
+    Strategy.code_path,
+    Strategy.class_name,
+    Strategy.created_at,
+    Strategy.updated_at,
+)
+
+
+# response_model仅用于OpenAPI文档，实际直接返回ORJSONResponse，跳过逐行校验
+@router.get("", response_model=List[StrategyListItem], response_class=ORJSONResponse)
+def get_strategies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """获取所有策略列表"""
-    strategies = db.query(Strategy).offset(skip).limit(limit).all()
-    return strategies
+    # 只查询列表需要的列，避免加载 config_yaml / code_content 等大文本字段
+    rows = db.query(*_STRATEGY_LIST_COLUMNS).offset(skip).limit(limit).all()
+    return ORJSONResponse([
+        {
+            'id': row.id,
+            'name': row.name,
+            'description': row.description,
+            'strategy_type': row.strategy_type.value,
+            'status': row.status.value,
+            'code_path': row.code_path,
+            'class_name': row.class_name,
+            'created_at': row.created_at,
+            'updated_at': row.updated_at,
+        }
+        for row in rows
+    ])
 
 
-@router.get("/{strategy_id}", response_model=StrategyResponse)
-async def get_strategy(strategy_id: int, db: Session = Depends(get_db)):
+def _get_position_info(manager, strategy_id: int) -> Optional[dict]:
+    """获取运行中策略的持仓信息（策略未运行、无持仓或获取失败时返回None）"""
+    if strategy_id not in manager.strategies:
+        return None
+    try:
+        strategy_instance = manager.strategies[strategy_id]
+        exchange = strategy_instance.exchange
+        symbol = strategy_instance.symbol
+        
+        position = exchange.get_open_position(symbol)
+        if position:
+            contracts = abs(position.get('contracts', 0))
+            if contracts > 0:
+                return {
+                    'symbol': symbol,
+                    'side': position.get('side', ''),
+                    'contracts': contracts,
+                    'entry_price': position.get('entryPrice', 0),
+                    'current_price': position.get('markPrice') or position.get('lastPrice', 0),
+                    'unrealized_pnl': position.get('unrealizedPnl', 0),
+                    'unrealized_pnl_percent': position.get('unrealizedPnlPercent', 0),
+                }
+    except Exception as e:
+        logger.warning(f"获取策略持仓信息失败: {e}")
+    return None
+
+
+def _get_positions_info(manager, strategy_ids: List[int]) -> List[Optional[dict]]:
+    """依次获取多个运行中策略的持仓信息"""
+    return [_get_position_info(manager, strategy_id) for strategy_id in strategy_ids]
+
+
+def _query_current_run_ids(db: Session) -> Dict[int, int]:
+    """一次查询所有运行中策略的当前运行记录ID（策略ID -> 运行记录ID）"""
+    rows = db.query(StrategyRun.strategy_id, StrategyRun.id).join(
+        Strategy, StrategyRun.strategy_id == Strategy.id
+    ).filter(
+        Strategy.status.in_([StrategyStatus.RUNNING, StrategyStatus.STOPPING]),
+        StrategyRun.status == StrategyStatus.RUNNING
+    ).order_by(StrategyRun.started_at.desc()).all()
+    
+    current_run_ids = {}
+    for strategy_id, run_id in rows:
+        # 按开始时间倒序，每个策略取最新的一条
+        current_run_ids.setdefault(strategy_id, run_id)
+    return current_run_ids
+
+
+@router.get("/status")
+async def get_all_strategy_status(db: Session = Depends(get_db)):
+    """批量获取所有策略状态（包含持仓信息和当前运行记录ID）"""
+    loop = asyncio.get_running_loop()
+    manager = get_strategy_manager()
+    
+    # 数据库查询在线程池中并发执行
+    statuses, current_run_ids = await asyncio.gather(
+        loop.run_in_executor(None, manager.get_all_strategies_status),
+        loop.run_in_executor(None, _query_current_run_ids, db),
+    )
+    
+    # 运行中策略的持仓向交易所查询：同步ccxt实例不是线程安全的，
+    # 同一交易所实例上的查询在一个线程中依次执行，不同实例之间并发
+    ids_by_exchange: Dict[int, List[int]] = {}
+    for status in statuses:
+        strategy_id = status['strategy_id']
+        if strategy_id in manager.strategies:
+            exchange = getattr(manager.strategies[strategy_id], 'exchange', None)
+            ids_by_exchange.setdefault(id(exchange), []).append(strategy_id)
+    groups = list(ids_by_exchange.values())
+    positions = await asyncio.gather(*(
+        loop.run_in_executor(None, _get_positions_info, manager, strategy_ids) for strategy_ids in groups
+    ))
+    position_by_id = {
+        strategy_id: position
+        for strategy_ids, group_positions in zip(groups, positions)
+        for strategy_id, position in zip(strategy_ids, group_positions)
+    }
+    
+    for status in statuses:
+        status['current_run_id'] = current_run_ids.get(status['strategy_id'])
+        status['position'] = position_by_id.get(status['strategy_id'])
+    return statuses
+
+
+@router.get("/{strategy_id}", response_model=StrategyResponse, response_class=ORJSONResponse)
+def get_strategy(strategy_id: int, db: Session = Depends(get_db)):
     """获取单个策略"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    strategy = db.get(Strategy, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
-    return strategy
+    return ORJSONResponse(_strategy_to_dict(strategy))
 
 
-@router.post("", response_model=StrategyResponse)
-async def create_strategy(strategy_data: StrategyCreate, db: Session = Depends(get_db)):
+@router.post("", response_model=StrategyResponse, response_class=ORJSONResponse)
+def create_strategy(strategy_data: StrategyCreate, db: Session = Depends(get_db)):
     """创建新策略"""
     # 验证配置
-    if strategy_data.strategy_type == "config" and not strategy_data.config_yaml:
+    if strategy_data.strategy_type == StrategyType.CONFIG and not strategy_data.config_yaml:
         raise HTTPException(status_code=400, detail="配置型策略必须提供config_yaml")
     
-    if strategy_data.strategy_type == "code" and not strategy_data.code_content and not strategy_data.code_path:
+    if strategy_data.strategy_type == StrategyType.CODE and not strategy_data.code_content and not strategy_data.code_path:
         raise HTTPException(status_code=400, detail="代码型策略必须提供code_content或code_path")
     
-    # 验证YAML格式
-    if strategy_data.config_yaml:
-        try:
-            yaml.safe_load(strategy_data.config_yaml)
-        except yaml.YAMLError as e:
-            raise HTTPException(status_code=400, detail=f"YAML格式错误: {e}")
+    # 验证YAML格式（解析结果一并保存）
+    config_json = _load_config_yaml(strategy_data.config_yaml) if strategy_data.config_yaml else None
     
     strategy = Strategy(
         name=strategy_data.name,
         description=strategy_data.description,
-        strategy_type=StrategyType(strategy_data.strategy_type),
+        strategy_type=strategy_data.strategy_type,
         config_yaml=strategy_data.config_yaml,
+        config_json=config_json,
         code_path=strategy_data.code_path,
         code_content=strategy_data.code_content,
         class_name=strategy_data.class_name,
@@ -103,38 +261,42 @@ async def create_strategy(strategy_data: StrategyCreate, db: Session = Depends(g
     )
     
     db.add(strategy)
+    # flush后主键和默认值已回填到对象上，提交前生成响应，避免提交后属性过期再查询一次
+    db.flush()
+    result = _strategy_to_dict(strategy)
     db.commit()
-    db.refresh(strategy)
     
-    return strategy
+    return ORJSONResponse(result)
 
 
-@router.put("/{strategy_id}", response_model=StrategyResponse)
-async def update_strategy(
+@router.put("/{strategy_id}", response_model=StrategyResponse, response_class=ORJSONResponse)
+def update_strategy(
     strategy_id: int,
     strategy_data: StrategyUpdate,
     db: Session = Depends(get_db)
 ):
     """更新策略"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    strategy = db.get(Strategy, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
     # 检查策略是否在运行
     if strategy.status == StrategyStatus.RUNNING:
         raise HTTPException(status_code=400, detail="运行中的策略无法修改，请先停止")
+    if strategy.status == StrategyStatus.STOPPING:
+        raise HTTPException(status_code=400, detail="策略正在停止，请稍后再试")
     
     # 更新字段
     if strategy_data.name is not None:
         strategy.name = strategy_data.name
     if strategy_data.description is not None:
         strategy.description = strategy_data.description
-    if strategy_data.config_yaml is not None:
-        # 验证YAML格式
-        try:
-            yaml.safe_load(strategy_data.config_yaml)
-        except yaml.YAMLError as e:
-            raise HTTPException(status_code=400, detail=f"YAML格式错误: {e}")
+    # 前端编辑时会带上完整配置，内容未变且已有解析结果时无需重新解析
+    if strategy_data.config_yaml is not None and (
+        strategy_data.config_yaml != strategy.config_yaml or strategy.config_json is None
+    ):
+        # 验证YAML格式（解析结果一并保存）
+        strategy.config_json = _load_config_yaml(strategy_data.config_yaml)
         strategy.config_yaml = strategy_data.config_yaml
     if strategy_data.code_path is not None:
         strategy.code_path = strategy_data.code_path
@@ -143,23 +305,26 @@ async def update_strategy(
     if strategy_data.class_name is not None:
         strategy.class_name = strategy_data.class_name
     
-    strategy.updated_at = datetime.utcnow()
+    # updated_at 由模型的 onupdate 在 flush 时自动设置
+    db.flush()
+    result = _strategy_to_dict(strategy)
     db.commit()
-    db.refresh(strategy)
     
-    return strategy
+    return ORJSONResponse(result)
 
 
 @router.delete("/{strategy_id}")
 async def delete_strategy(strategy_id: int, db: Session = Depends(get_db)):
     """删除策略"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    strategy = db.get(Strategy, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
     # 检查策略是否在运行
     if strategy.status == StrategyStatus.RUNNING:
         raise HTTPException(status_code=400, detail="运行中的策略无法删除，请先停止")
+    if strategy.status == StrategyStatus.STOPPING:
+        raise HTTPException(status_code=400, detail="策略正在停止，请稍后再试")
     
     # 停止策略（如果在运行）
     manager = get_strategy_manager()
@@ -175,12 +340,14 @@ async def delete_strategy(strategy_id: int, db: Session = Depends(get_db)):
 @router.post("/{strategy_id}/start")
 async def start_strategy(strategy_id: int, db: Session = Depends(get_db)):
     """启动策略"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    strategy = db.get(Strategy, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
     if strategy.status == StrategyStatus.RUNNING:
         raise HTTPException(status_code=400, detail="策略已在运行")
+    if strategy.status == StrategyStatus.STOPPING:
+        raise HTTPException(status_code=400, detail="策略正在停止，请稍后再启动")
     
     manager = get_strategy_manager()
     success = await manager.start_strategy(strategy_id)
@@ -191,9 +358,38 @@ async def start_strategy(strategy_id: int, db: Session = Depends(get_db)):
     return {"message": "策略已启动"}
 
 
+async def _stop_strategy_in_background(strategy_id: int, close_positions: bool):
+    """后台停止策略（平仓需要等待交易所成交），失败时把数据库状态修复为已停止"""
+    manager = get_strategy_manager()
+    try:
+        success = await manager.stop_strategy(strategy_id, close_positions=close_positions)
+    except Exception as e:
+        logger.error(f"后台停止策略失败: {e}", exc_info=True)
+        success = False
+    
+    if not success:
+        db = SessionLocal()
+        try:
+            strategy = db.get(Strategy, strategy_id)
+            if strategy and strategy.status == StrategyStatus.STOPPING:
+                strategy.status = StrategyStatus.STOPPED
+                db.commit()
+                logger.warning(f"策略停止失败，但已更新数据库状态: {strategy_id}")
+        except Exception as e:
+            logger.error(f"更新策略状态失败: {e}")
+            db.rollback()
+        finally:
+            db.close()
+    
+    # 推送停止完成（策略实例不在内存中时不会触发策略自身的状态回调）
+    if manager.on_strategy_status_change:
+        manager.on_strategy_status_change(strategy_id, StrategyStatus.STOPPED.value)
+
+
 @router.post("/{strategy_id}/stop")
 async def stop_strategy(
     strategy_id: int, 
+    background_tasks: BackgroundTasks,
     close_positions: bool = True,
     db: Session = Depends(get_db)
 ):
@@ -202,16 +398,30 @@ async def stop_strategy(
     
     Args:
         strategy_id: 策略ID
-        close_positions: 是否在停止前平仓，默认为True
+        close_positions: 是否在停止前平仓，默认为True（平仓在后台执行，接口立即返回）
     """
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    strategy = db.get(Strategy, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
+    if strategy.status == StrategyStatus.STOPPING:
+        return {"message": "策略正在停止"}
+    
     # 如果策略状态不是 RUNNING，直接返回成功（可能已经停止了）
     if strategy.status != StrategyStatus.RUNNING:
         return {"message": "策略未在运行，无需停止"}
     
+    if close_positions:
+        # 平仓要等待交易所成交（可能数秒），先标记为停止中并立即返回，
+        # 停止完成后状态变为 STOPPED，并通过WebSocket推送状态变化
+        strategy.status = StrategyStatus.STOPPING
+        db.commit()
+        manager = get_strategy_manager()
+        if manager.on_strategy_status_change:
+            manager.on_strategy_status_change(strategy_id, StrategyStatus.STOPPING.value)
+        background_tasks.add_task(_stop_strategy_in_background, strategy_id, close_positions)
+        return {"message": "策略正在停止，持仓平仓中"}
+    
     manager = get_strategy_manager()
     success = await manager.stop_strategy(strategy_id, close_positions=close_positions)
     
@@ -226,13 +436,14 @@ async def stop_strategy(
             db.rollback()
         raise HTTPException(status_code=500, detail="停止策略失败，但已尝试修复状态")
     
-    return {"message": "策略已停止" + ("，持仓已平仓" if close_positions else "")}
+    return {"message": "策略已停止"}
 
 
 @router.get("/{strategy_id}/status")
-async def get_strategy_status(strategy_id: int, db: Session = Depends(get_db)):
+def get_strategy_status(strategy_id: int, db: Session = Depends(get_db)):
     """获取策略状态（包含持仓信息和当前运行记录ID）"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    # 只需要状态字段，不加载配置和代码内容
+    strategy = db.get(Strategy, strategy_id, options=[load_only(Strategy.id, Strategy.status)])
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
@@ -242,9 +453,9 @@ async def get_strategy_status(strategy_id: int, db: Session = Depends(get_db)):
     if not status:
         raise HTTPException(status_code=500, detail="获取策略状态失败")
     
-    # 获取当前运行记录ID（如果策略正在运行）
+    # 获取当前运行记录ID（如果策略正在运行或正在停止）
     current_run_id = None
-    if strategy.status == StrategyStatus.RUNNING:
+    if strategy.status in (StrategyStatus.RUNNING, StrategyStatus.STOPPING):
         run = db.query(StrategyRun).filter(
             StrategyRun.strategy_id == strategy_id,
             StrategyRun.status == StrategyStatus.RUNNING
@@ -255,83 +466,63 @@ async def get_strategy_status(strategy_id: int, db: Session = Depends(get_db)):
     status['current_run_id'] = current_run_id
     
     # 获取持仓信息
-    position_info = None
-    if strategy_id in manager.strategies:
-        try:
-            strategy_instance = manager.strategies[strategy_id]
-            exchange = strategy_instance.exchange
-            symbol = strategy_instance.symbol
-            
-            position = exchange.get_open_position(symbol)
-            if position:
-                contracts = abs(position.get('contracts', 0))
-                if contracts > 0:
-                    position_info = {
-                        'symbol': symbol,
-                        'side': position.get('side', ''),
-                        'contracts': contracts,
-                        'entry_price': position.get('entryPrice', 0),
-                        'current_price': position.get('markPrice') or position.get('lastPrice', 0),
-                        'unrealized_pnl': position.get('unrealizedPnl', 0),
-                        'unrealized_pnl_percent': position.get('unrealizedPnlPercent', 0),
-                    }
-        except Exception as e:
-            logger.warning(f"获取策略持仓信息失败: {e}")
-    
-    status['position'] = position_info
+    status['position'] = _get_position_info(manager, strategy_id)
     return status
 
 
+def _run_row_to_dict(row) -> dict:
+    """(运行记录, 策略名称, 总盈亏) 转换为可序列化的字典"""
+    run, strategy_name, total_pnl = row
+    return {
+        "id": run.id,
+        "strategy_id": run.strategy_id,
+        "strategy_name": strategy_name,
+        "status": run.status.value,
+        "start_balance": run.start_balance,
+        "current_balance": run.current_balance,
+        "total_pnl": total_pnl,  # 通过交易记录计算的总盈亏
+        "total_trades": run.total_trades,
+        "win_trades": run.win_trades,
+        "loss_trades": run.loss_trades,
+        "started_at": run.started_at,  # orjson直接序列化datetime，格式与isoformat()一致
+        "stopped_at": run.stopped_at,
+        "error_message": run.error_message,
+    }
+
+
 @router.get("/runs/all")
-async def get_all_strategy_runs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_all_strategy_runs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """获取所有策略的运行记录（历史策略）"""
-    from ..models.trade import Trade
-    from sqlalchemy import func
-    
-    runs = db.query(StrategyRun).join(Strategy).order_by(
+    # 一次聚合查询同时取出策略名称和总盈亏，避免逐条运行记录再查询交易表
+    # 只计算平仓交易的 pnl（因为开仓和加仓交易没有 pnl）
+    # lambda_stmt 按lambda代码缓存构造好的语句，skip/limit 作为绑定参数传入，每次请求不再重新构造和编译
+    stmt = lambda_stmt(lambda: select(
+        StrategyRun, Strategy.name, func.coalesce(func.sum(Trade.pnl), 0.0).label('total_pnl')
+    ).join(
+        Strategy, StrategyRun.strategy_id == Strategy.id
+    ).outerjoin(
+        Trade, and_(Trade.strategy_run_id == StrategyRun.id, Trade.pnl.isnot(None))
+    ).group_by(StrategyRun.id, Strategy.name).order_by(
         StrategyRun.started_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    # 包含策略信息和计算的总盈亏
-    result = []
-    for run in runs:
-        # 计算该运行记录关联的所有交易的盈亏总和
-        # 只计算平仓交易的 pnl（因为开仓和加仓交易没有 pnl）
-        total_pnl = db.query(func.sum(Trade.pnl)).filter(
-            Trade.strategy_run_id == run.id,
-            Trade.pnl.isnot(None)  # 只计算有盈亏的交易（平仓交易）
-        ).scalar() or 0.0
-        
-        run_dict = {
-            "id": run.id,
-            "strategy_id": run.strategy_id,
-            "strategy_name": run.strategy.name if run.strategy else None,
-            "status": run.status.value if isinstance(run.status, StrategyStatus) else str(run.status),
-            "start_balance": run.start_balance,
-            "current_balance": run.current_balance,
-            "total_pnl": total_pnl,  # 通过交易记录计算的总盈亏
-            "total_trades": run.total_trades,
-            "win_trades": run.win_trades,
-            "loss_trades": run.loss_trades,
-            "started_at": run.started_at.isoformat() if run.started_at else None,
-            "stopped_at": run.stopped_at.isoformat() if run.stopped_at else None,
-            "error_message": run.error_message,
-        }
-        result.append(run_dict)
+    ).offset(skip).limit(limit))
+    rows = db.execute(stmt, execution_options={'yield_per': 100})
     
-    return result
+    # 逐批读取并流式输出，不在内存中拼出完整的结果列表
+    return StreamingResponse(_iter_json_array(rows, _run_row_to_dict), media_type="application/json")
 
 
 @router.get("/{strategy_id}/runs")
-async def get_strategy_runs(strategy_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_strategy_runs(strategy_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """获取策略运行记录"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    # 只需确认策略存在，不加载配置和代码内容
+    strategy = db.get(Strategy, strategy_id, options=[load_only(Strategy.id)])
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
-    runs = db.query(StrategyRun).filter(
+    # lambda_stmt 缓存构造好的语句，strategy_id/skip/limit 作为绑定参数传入
+    runs = db.scalars(lambda_stmt(lambda: select(StrategyRun).where(
         StrategyRun.strategy_id == strategy_id
-    ).order_by(StrategyRun.started_at.desc()).offset(skip).limit(limit).all()
+    ).order_by(StrategyRun.started_at.desc()).offset(skip).limit(limit))).all()
     
     return runs
 
@@ -339,7 +530,7 @@ async def get_strategy_runs(strategy_id: int, skip: int = 0, limit: int = 100, d
 @router.post("/{strategy_id}/retrain")
 async def retrain_strategy_model(strategy_id: int, force: bool = False, db: Session = Depends(get_db)):
     """手动触发策略模型重新训练（仅适用于机器学习策略）"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    strategy = db.get(Strategy, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
@@ -375,20 +566,23 @@ async def retrain_strategy_model(strategy_id: int, force: bool = False, db: Sess
 
 
 @router.get("/{strategy_id}/price-history")
-async def get_strategy_price_history(
+def get_strategy_price_history(
     strategy_id: int,
     timeframe: str = '1m',
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
     """获取策略的价格历史数据（用于图表）"""
-    strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+    strategy = db.get(Strategy, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="策略不存在")
     
     # 从配置中获取交易对
     try:
-        config = yaml.safe_load(strategy.config_yaml or '{}')
+        # 优先使用保存时已解析的配置，旧数据才需要解析YAML（按内容缓存）
+        config = strategy.config_json
+        if config is None:
+            config = parse_config_cached(strategy.config_yaml or '')
         symbol = config.get('trading', {}).get('symbol', 'BTC/USDT:USDT')
     except:
         symbol = 'BTC/USDT:USDT'
@@ -400,17 +594,9 @@ async def get_strategy_price_history(
     if manager.exchanges:
         exchange = list(manager.exchanges.values())[0]
     else:
-        # 如果没有策略运行，创建默认交易所实例
-        use_testnet = os.getenv('BINANCE_TESTNET', 'False').lower() == 'true'
-        if use_testnet:
-            api_key = os.getenv('BINANCE_TESTNET_API_KEY') or os.getenv('BINANCE_API_KEY', '')
-            api_secret = os.getenv('BINANCE_TESTNET_SECRET_KEY') or os.getenv('BINANCE_SECRET_KEY', '')
-        else:
-            api_key = os.getenv('BINANCE_API_KEY', '')
-            api_secret = os.getenv('BINANCE_SECRET_KEY', '')
-        
-        if api_key and api_secret:
-            exchange = BinanceExchange(api_key, api_secret, testnet=use_testnet)
+        # 如果没有策略运行，使用单例交易所实例（复用已加载的市场信息和HTTP连接）
+        if get_settings().has_credentials:
+            exchange = get_exchange()
     
     if not exchange:
         # 如果没有交易所实例，返回空数据
@@ -418,7 +604,7 @@ async def get_strategy_price_history(
     
     # 获取K线数据
     try:
-        ohlcv = exchange.get_ohlcv(symbol, timeframe, limit)
+        ohlcv = get_cached_ohlcv(exchange, symbol, timeframe, limit)
         # 转换为前端需要的格式
         result = []
         for candle in ohlcv:
@@ -431,7 +617,7 @@ async def get_strategy_price_history(
                 'close': candle[4],
                 'volume': candle[5],
             })
-        return result
+        return ORJSONResponse(result)
     except Exception as e:
         logger.error(f"获取价格历史失败: {e}", exc_info=True)
         return []
@@ -1,12 +1,13 @@
 """策略模板API"""
 
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse, Response
 from typing import List, Dict, Any
 from pydantic import BaseModel
 
-from ..strategy_templates import get_all_templates, get_template
+from ..strategy_templates import get_all_templates_json, get_template
 
-router = APIRouter(prefix="/api/templates", tags=["templates"])
+router = APIRouter(prefix="/api/templates", tags=["templates"], default_response_class=ORJSONResponse)
 
 
 class TemplateInfo(BaseModel):
@@ -26,11 +27,11 @@ class TemplateDetail(BaseModel):
     config_yaml: str
 
 
+# response_model仅用于OpenAPI文档，实际直接返回预先序列化好的JSON
 @router.get("", response_model=List[TemplateInfo])
 async def get_templates():
     """获取所有策略模板列表"""
-    templates = get_all_templates()
-    return templates
+    return Response(content=get_all_templates_json(), media_type="application/json")
 
 
 @router.get("/{template_id}", response_model=TemplateDetail)
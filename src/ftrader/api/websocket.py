@@ -1,75 +1,166 @@
 """WebSocket API"""
 
-import json
 import asyncio
 import threading
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict, Any, Optional
+from starlette.websockets import WebSocketState
+from typing import List, Dict, Any, Optional, Set
 import logging
 
+import orjson
+
 from ..strategy_manager import get_strategy_manager
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 单个连接发送消息的超时时间（秒），超时视为慢连接并断开
+BROADCAST_SEND_TIMEOUT = 5.0
+
+# 每个连接待发送消息队列的最大长度，积压超过该值视为慢连接并断开
+SEND_QUEUE_SIZE = 1000
+
+# 合并发送的时间窗口（秒）和每帧最多合并的消息数
+BATCH_WINDOW = 0.01
+BATCH_MAX_MESSAGES = 64
+
+
+def _encode_message(message: Dict[str, Any]) -> str:
+    """序列化WebSocket消息（orjson序列化后解码一次，前端按文本帧解析JSON）"""
+    # 回测进度等数值可能是numpy标量（json.dumps按float子类处理，orjson需要显式开启）
+    return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _is_closed(websocket: WebSocket) -> bool:
+    """连接是否已断开（客户端断开或服务端已发送关闭）"""
+    return (websocket.client_state == WebSocketState.DISCONNECTED
+            or websocket.application_state == WebSocketState.DISCONNECTED)
+
 
 class ConnectionManager:
-    """WebSocket连接管理器"""
+    """WebSocket连接管理器
+    
+    每个连接有自己的待发送队列和常驻发送任务，广播只是把消息放入各连接的队列，
+    不为每条消息创建任务，慢连接也不会拖慢其他连接。
+    """
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # 使用集合，连接频繁断开时移除为O(1)
+        self.active_connections: Set[WebSocket] = set()
         self.main_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
     
     def set_main_loop(self, loop: asyncio.AbstractEventLoop):
         """设置主事件循环（用于在同步上下文中调用异步函数）"""
         self.main_loop = loop
     
     async def connect(self, websocket: WebSocket):
-        """接受WebSocket连接"""
+        """接受WebSocket连接，并启动该连接的发送任务"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self._queues[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._writer_loop(websocket, queue))
+        self.active_connections.add(websocket)
         logger.info(f"WebSocket连接已建立，当前连接数: {len(self.active_connections)}")
     
     def disconnect(self, websocket: WebSocket):
-        """断开WebSocket连接"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        """断开WebSocket连接，停止该连接的发送任务"""
+        if websocket not in self.active_connections:
+            return
+        self.active_connections.discard(websocket)
+        self._queues.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        # 发送任务自身出错时也会调用这里，不能取消自己
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
         logger.info(f"WebSocket连接已断开，当前连接数: {len(self.active_connections)}")
     
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        """发送个人消息"""
+    async def _writer_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        """连接的发送任务：按顺序发送队列中的消息，发送失败或超时则断开连接"""
         try:
-            await websocket.send_text(message)
+            while True:
+                batch = await self._collect_batch(queue)
+                # 单条消息保持原格式，多条消息合并为一个JSON数组帧，减少帧数和系统调用
+                frame = batch[0] if len(batch) == 1 else '[' + ','.join(batch) + ']'
+                await asyncio.wait_for(websocket.send_text(frame), timeout=BROADCAST_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"发送WebSocket消息超时（{BROADCAST_SEND_TIMEOUT}秒），断开慢连接")
+        except WebSocketDisconnect as e:
+            logger.debug(f"客户端已断开，停止发送: {e}")
+        except RuntimeError as e:
+            # 连接已关闭后再发送会抛出RuntimeError，按连接状态判断，不解析异常信息
+            if _is_closed(websocket):
+                logger.debug(f"连接已关闭，跳过消息发送: {e}")
+            else:
+                logger.warning(f"发送WebSocket消息失败: {e}")
         except Exception as e:
-            logger.error(f"发送WebSocket消息失败: {e}")
-            self.disconnect(websocket)
+            logger.warning(f"发送WebSocket消息失败: {e}")
+        
+        self.disconnect(websocket)
+        await self._close(websocket)
     
-    async def broadcast(self, message: str):
-        """广播消息给所有连接"""
-        disconnected = []
-        for connection in self.active_connections:
+    @staticmethod
+    async def _collect_batch(queue: asyncio.Queue) -> List[str]:
+        """等待第一条消息，再在时间窗口内收集后续消息"""
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BATCH_WINDOW
+        while len(batch) < BATCH_MAX_MESSAGES:
             try:
-                # 检查连接状态
-                if connection.client_state.name == 'DISCONNECTED':
-                    disconnected.append(connection)
-                    continue
-                await connection.send_text(message)
-            except RuntimeError as e:
-                # 连接已关闭或响应已完成
-                error_msg = str(e)
-                if 'websocket.close' in error_msg or 'response already completed' in error_msg:
-                    logger.debug(f"连接已关闭，跳过消息发送: {e}")
-                else:
-                    logger.warning(f"广播消息失败: {e}")
-                disconnected.append(connection)
-            except Exception as e:
-                logger.warning(f"广播消息失败: {e}")
-                disconnected.append(connection)
-        
-        # 清理断开的连接
-        for conn in disconnected:
-            self.disconnect(conn)
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        """关闭连接，让端点的接收循环退出"""
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+    
+    def _enqueue(self, websocket: WebSocket, message: str):
+        """把消息放入连接的发送队列，队列已满时断开该慢连接"""
+        queue = self._queues.get(websocket)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning(f"WebSocket待发送消息积压超过{SEND_QUEUE_SIZE}条，断开慢连接")
+            self.disconnect(websocket)
+            asyncio.create_task(self._close(websocket))
+    
+    def send_personal_message(self, message: str, websocket: WebSocket):
+        """发送个人消息（与广播共用发送队列，保证同一连接上的消息按顺序发送）"""
+        self._enqueue(websocket, message)
+    
+    def broadcast(self, message: str):
+        """广播消息给所有连接（只放入各连接的发送队列，需在主事件循环中调用）"""
+        for connection in list(self.active_connections):
+            # 已知断开的连接直接移除，不再入队发送
+            if _is_closed(connection):
+                self.disconnect(connection)
+            else:
+                self._enqueue(connection, message)
+    
+    def broadcast_threadsafe(self, message: str):
+        """在其他线程中广播消息（转交给主事件循环执行）"""
+        if self.main_loop and self.main_loop.is_running():
+            self.main_loop.call_soon_threadsafe(self.broadcast, message)
+        else:
+            logger.warning("主事件循环不可用，跳过WebSocket广播")
 
 
 manager = ConnectionManager()
@@ -82,7 +173,7 @@ def broadcast_strategy_status(strategy_id: int, status: str):
         'strategy_id': strategy_id,
         'status': status,
     }
-    asyncio.create_task(manager.broadcast(json.dumps(message)))
+    manager.broadcast(_encode_message(message))
 
 
 def broadcast_trade(strategy_id: int, trade_data: Dict[str, Any]):
@@ -92,7 +183,7 @@ def broadcast_trade(strategy_id: int, trade_data: Dict[str, Any]):
         'strategy_id': strategy_id,
         'data': trade_data,
     }
-    asyncio.create_task(manager.broadcast(json.dumps(message)))
+    manager.broadcast(_encode_message(message))
 
 
 def broadcast_error(strategy_id: int, error_message: str):
@@ -102,7 +193,7 @@ def broadcast_error(strategy_id: int, error_message: str):
         'strategy_id': strategy_id,
         'error': error_message,
     }
-    asyncio.create_task(manager.broadcast(json.dumps(message)))
+    manager.broadcast(_encode_message(message))
 
 
 def broadcast_backtest_progress(backtest_id: int, current: int, total: int, 
@@ -116,27 +207,19 @@ def broadcast_backtest_progress(backtest_id: int, current: int, total: int,
         'percentage': round(percentage, 2),
         'current_balance': round(current_balance, 2),
     }
-    message_str = json.dumps(message)
+    message_str = _encode_message(message)
     
-    # 尝试获取事件循环
     try:
-        # 如果在异步上下文中，直接创建任务
-        loop = asyncio.get_running_loop()
-        asyncio.create_task(manager.broadcast(message_str))
+        running_loop = asyncio.get_running_loop()
     except RuntimeError:
-        # 如果不在异步上下文中（如在后台线程中），使用主事件循环
-        if manager.main_loop and manager.main_loop.is_running():
-            asyncio.run_coroutine_threadsafe(manager.broadcast(message_str), manager.main_loop)
-        else:
-            # 如果主循环不可用，尝试获取当前线程的事件循环
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    asyncio.run_coroutine_threadsafe(manager.broadcast(message_str), loop)
-                else:
-                    loop.run_until_complete(manager.broadcast(message_str))
-            except RuntimeError:
-                logger.warning("无法获取事件循环，跳过回测进度广播")
+        running_loop = None
+    
+    if running_loop is not None and running_loop is manager.main_loop:
+        # 在主事件循环中直接放入发送队列
+        manager.broadcast(message_str)
+    else:
+        # 不在主事件循环中（回测后台线程或回测引擎自己的事件循环），转交给主事件循环
+        manager.broadcast_threadsafe(message_str)
 
 
 @router.websocket("/ws")
@@ -165,7 +248,7 @@ async def websocket_endpoint(websocket: WebSocket):
             'type': 'connected',
             'message': 'WebSocket连接成功',
         }
-        await websocket.send_text(json.dumps(initial_data))
+        manager.send_personal_message(_encode_message(initial_data), websocket)
         
         # 保持连接
         while True:
@@ -173,17 +256,18 @@ async def websocket_endpoint(websocket: WebSocket):
             try:
                 data = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
                 # 可以处理客户端发送的消息
-                message = json.loads(data)
+                message = orjson.loads(data)
                 if message.get('type') == 'ping':
-                    await websocket.send_text(json.dumps({'type': 'pong'}))
+                    manager.send_personal_message(_encode_message({'type': 'pong'}), websocket)
             except asyncio.TimeoutError:
                 # 发送心跳
-                await websocket.send_text(json.dumps({'type': 'heartbeat'}))
+                manager.send_personal_message(_encode_message({'type': 'heartbeat'}), websocket)
             except WebSocketDisconnect:
                 break
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
         logger.error(f"WebSocket错误: {e}", exc_info=True)
+    finally:
         manager.disconnect(websocket)
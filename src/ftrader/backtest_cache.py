@@ -0,0 +1,59 @@
+"""回测结果磁盘缓存模块
+
+相同的 (策略配置, 时间区间, 初始余额, 交易对, 时间周期) 在历史数据上回测结果相同，
+按参数内容哈希缓存完整的回测结果，重复回测时直接复用。
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# 缓存目录（与数据库目录同级）
+CACHE_DIR = Path(__file__).parent.parent.parent / "cache" / "backtest"
+
+# 缓存有效期（秒），策略代码更新后旧结果最多保留这么久
+CACHE_TTL = 7 * 24 * 60 * 60
+
+# 缓存格式版本，回测引擎或结果字段变化时递增，使旧版本的缓存结果失效
+CACHE_VERSION = 1
+
+
+def make_key(params: Dict[str, Any]) -> str:
+    """根据回测参数生成缓存键（规范化JSON的BLAKE2b摘要）"""
+    canonical = orjson.dumps({'version': CACHE_VERSION, 'params': params}, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return hashlib.blake2b(canonical, digest_size=20).hexdigest()
+
+
+def load(key: str) -> Optional[Dict[str, Any]]:
+    """读取缓存的回测结果，未命中、过期或读取失败返回None"""
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > CACHE_TTL:
+            return None
+        return orjson.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"读取回测结果缓存失败 {path}: {e}")
+        return None
+
+
+def save(key: str, results: Dict[str, Any]):
+    """保存回测结果"""
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免并发回测读到写了一半的文件
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix='.tmp', delete=False) as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+        os.replace(f.name, path)
+    except Exception as e:
+        logger.warning(f"写入回测结果缓存失败 {path}: {e}")
@@ -1,11 +1,14 @@
 """回测引擎模块"""
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple, Callable
+from typing import Dict, Iterable, List, Optional, Any, Tuple, Callable
 from decimal import Decimal
 import math
 
+import numpy as np
+
 from .exchange import BinanceExchange
 from .strategies.base import BaseStrategy
 from .strategies.martingale import MartingaleStrategy
@@ -13,21 +16,21 @@ from .risk_manager import RiskManager
 
 logger = logging.getLogger(__name__)
 
+# 回测结果中价格趋势数据的最大点数（超过时等间隔采样，仅用于前端图表展示）
+PRICE_DATA_MAX_POINTS = 10000
+
 
-def expand_ohlcv_to_seconds(ohlcv_data: List[List], timeframe: str = '1m') -> List[List]:
+def expand_ohlcv_to_seconds(ohlcv_data: Iterable[List], timeframe: str = '1m') -> List[List]:
     """
     将K线数据展开为秒级数据，确保回测精确到秒级别
     
     Args:
-        ohlcv_data: 原始K线数据，格式: [[timestamp, open, high, low, close, volume], ...]
+        ohlcv_data: 原始K线数据（列表或逐行生成的迭代器），格式: [[timestamp, open, high, low, close, volume], ...]
         timeframe: 时间周期，如 '1m', '5m', '1h' 等，用于确定每个K线包含多少秒
         
     Returns:
         展开后的秒级数据
     """
-    if not ohlcv_data:
-        return []
-    
     # 解析时间周期（每个K线包含的秒数）
     timeframe_seconds = {
         '1m': 60,
@@ -42,8 +45,10 @@ def expand_ohlcv_to_seconds(ohlcv_data: List[List], timeframe: str = '1m') -> Li
     seconds_per_candle = timeframe_seconds.get(timeframe, 60)
     
     expanded_data = []
+    candle_count = 0
     
     for candle in ohlcv_data:
+        candle_count += 1
         timestamp = candle[0]
         open_price = candle[1]
         high_price = candle[2]
@@ -97,10 +102,24 @@ def expand_ohlcv_to_seconds(ohlcv_data: List[List], timeframe: str = '1m') -> Li
             
             expanded_data.append(expanded_candle)
     
-    logger.info(f"K线数据展开: {len(ohlcv_data)} 条 {timeframe} K线 -> {len(expanded_data)} 条秒级数据点")
+    logger.info(f"K线数据展开: {candle_count} 条 {timeframe} K线 -> {len(expanded_data)} 条秒级数据点")
     return expanded_data
 
 
+class _BacktestEventLoop(asyncio.SelectorEventLoop):
+    """回测用事件循环：模拟交易所只做内存计算，run_in_executor 直接在当前线程执行并返回已完成的Future"""
+    
+    def run_in_executor(self, executor, func, *args):
+        if executor is not None:
+            return super().run_in_executor(executor, func, *args)
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
 class MockExchange:
     """模拟交易所，用于回测"""
     
@@ -121,7 +140,36 @@ class MockExchange:
         }
         self.positions: Dict[str, Dict] = {}  # 持仓信息
         self.orders: List[Dict] = []  # 订单历史
-        self.equity_curve: List[Tuple[int, float]] = []  # 权益曲线 [(timestamp, balance)]
+        # 权益曲线按列存放在预分配的数组中（每根K线一个点，另有每笔成交一个点，容量不足时翻倍）
+        capacity = len(ohlcv_data) + 16
+        self._equity_timestamps = np.empty(capacity, dtype=np.int64)
+        self._equity_balances = np.empty(capacity, dtype=np.float64)
+        self._equity_count = 0
+    
+    def _record_equity(self):
+        """记录当前时间点的权益（数据已遍历完时沿用上一个时间戳，还没有记录过则跳过）"""
+        timestamp = self.get_current_timestamp()
+        if timestamp is None:
+            if self._equity_count == 0:
+                return
+            timestamp = self._equity_timestamps[self._equity_count - 1]
+        if self._equity_count == len(self._equity_timestamps):
+            capacity = len(self._equity_timestamps) * 2
+            self._equity_timestamps = np.resize(self._equity_timestamps, capacity)
+            self._equity_balances = np.resize(self._equity_balances, capacity)
+        self._equity_timestamps[self._equity_count] = timestamp
+        self._equity_balances[self._equity_count] = self.balance['total']
+        self._equity_count += 1
+    
+    def get_equity_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """获取权益曲线的 (时间戳数组, 权益数组)，不复制数据"""
+        return self._equity_timestamps[:self._equity_count], self._equity_balances[:self._equity_count]
+    
+    @property
+    def equity_curve(self) -> List[Tuple[int, float]]:
+        """权益曲线 [(timestamp, balance)]"""
+        timestamps, balances = self.get_equity_arrays()
+        return list(zip(timestamps.tolist(), balances.tolist()))
         
     def get_current_price(self) -> Optional[float]:
         """获取当前价格"""
@@ -264,7 +312,7 @@ class MockExchange:
         self.orders.append(order)
         
         # 更新权益曲线
-        self.equity_curve.append((self.get_current_timestamp(), self.balance['total']))
+        self._record_equity()
         
         return order
     
@@ -404,7 +452,7 @@ class MockExchange:
         del self.positions[symbol]
         
         # 更新权益曲线
-        self.equity_curve.append((self.get_current_timestamp(), self.balance['total']))
+        self._record_equity()
         
         return True
     
@@ -412,9 +460,9 @@ class MockExchange:
         """推进到下一个时间点"""
         if self.current_index < len(self.ohlcv_data) - 1:
             self.current_index += 1
-            # 更新权益曲线
-            balance = self.get_balance()
-            self.equity_curve.append((self.get_current_timestamp(), balance['total']))
+            # 更新权益曲线（get_balance 会刷新包含未实现盈亏的总权益）
+            self.get_balance()
+            self._record_equity()
             return True
         return False
 
@@ -483,9 +531,6 @@ class Backtester:
         """
         logger.info(f"开始回测，数据点: {len(self.ohlcv_data)}, 初始余额: {self.initial_balance}")
         
-        # 初始化策略
-        import asyncio
-        
         # 检查是否已有运行中的事件循环
         try:
             running_loop = asyncio.get_running_loop()
@@ -502,7 +547,8 @@ class Backtester:
                 raise
         
         # 创建新的事件循环
-        loop = asyncio.new_event_loop()
+        # 策略通过 run_in_executor 调用模拟交易所时直接在当前线程执行，省去线程切换和事件循环唤醒
+        loop = _BacktestEventLoop()
         asyncio.set_event_loop(loop)
         
         try:
@@ -522,40 +568,9 @@ class Backtester:
             # 在回测中，每个K线都执行一次策略检查（因为K线数据已经包含了时间信息）
             # 这样可以确保策略能够及时响应价格变化
             total_steps = len(self.ohlcv_data) - 1
-            progress_update_interval = max(1, total_steps // 100)  # 每1%更新一次进度
-            last_progress_update = 0
-            
             logger.info(f"回测循环开始，将处理 {total_steps} 个数据点")
-            
-            while self.mock_exchange.current_index < total_steps:
-                current_index = self.mock_exchange.current_index
-                
-                # 执行策略检查
-                try:
-                    should_continue = loop.run_until_complete(self.strategy.run_once())
-                    if not should_continue:
-                        # 如果策略返回False，检查是否是因为is_active被设置为False
-                        # 如果是，我们仍然继续运行（因为策略可能在平仓后需要重新开仓）
-                        if not self.strategy.is_active:
-                            logger.info("策略已停止，结束回测")
-                            break
-                except Exception as e:
-                    logger.warning(f"策略执行错误: {e}")
-                    # 即使出错也继续运行，避免回测中断
-                
-                # 更新进度（定期更新，避免过于频繁）
-                if self.progress_callback and (current_index - last_progress_update >= progress_update_interval or current_index == total_steps - 1):
-                    percentage = (current_index + 1) / total_steps * 100
-                    current_balance = self.mock_exchange.get_balance()['total']
-                    try:
-                        self.progress_callback(current_index + 1, total_steps, percentage, current_balance)
-                    except Exception as e:
-                        logger.warning(f"进度回调失败: {e}")
-                    last_progress_update = current_index
-                
-                # 推进到下一个K线
-                if not self.mock_exchange.advance():
-                    break
+            # 整个回测循环在一次 run_until_complete 中执行，避免每根K线都启停一次事件循环
+            loop.run_until_complete(self._run_steps(total_steps))
             
             # 停止策略
             loop.run_until_complete(self.strategy.stop())
@@ -605,71 +620,102 @@ class Backtester:
         # 计算回测结果
         return self._calculate_results()
     
+    async def _run_steps(self, total_steps: int):
+        """逐根K线执行策略检查并推进模拟交易所"""
+        progress_update_interval = max(1, total_steps // 100)  # 每1%更新一次进度
+        last_progress_update = 0
+        
+        while self.mock_exchange.current_index < total_steps:
+            current_index = self.mock_exchange.current_index
+            
+            # 执行策略检查
+            try:
+                should_continue = await self.strategy.run_once()
+                if not should_continue:
+                    # 如果策略返回False，检查是否是因为is_active被设置为False
+                    # 如果是，我们仍然继续运行（因为策略可能在平仓后需要重新开仓）
+                    if not self.strategy.is_active:
+                        logger.info("策略已停止，结束回测")
+                        break
+            except Exception as e:
+                logger.warning(f"策略执行错误: {e}")
+                # 即使出错也继续运行，避免回测中断
+            
+            # 更新进度（定期更新，避免过于频繁）
+            if self.progress_callback and (current_index - last_progress_update >= progress_update_interval or current_index == total_steps - 1):
+                percentage = (current_index + 1) / total_steps * 100
+                current_balance = self.mock_exchange.get_balance()['total']
+                try:
+                    self.progress_callback(current_index + 1, total_steps, percentage, current_balance)
+                except Exception as e:
+                    logger.warning(f"进度回调失败: {e}")
+                last_progress_update = current_index
+            
+            # 推进到下一个K线
+            if not self.mock_exchange.advance():
+                break
+    
     def _calculate_results(self) -> Dict[str, Any]:
         """计算回测结果"""
         final_balance = self.mock_exchange.get_balance()['total']
         total_return = ((final_balance - self.initial_balance) / self.initial_balance) * 100
         total_return_amount = final_balance - self.initial_balance
         
-        # 计算交易统计
-        # 安全处理 pnl 值，确保 None 被转换为 0
-        def safe_get_pnl(trade):
-            pnl = trade.get('pnl')
-            return pnl if pnl is not None else 0
-        
-        win_trades = sum(1 for t in self.trades if safe_get_pnl(t) > 0)
-        loss_trades = sum(1 for t in self.trades if safe_get_pnl(t) < 0)
+        # 计算交易统计（盈亏转为数组后向量化统计，None 视为 0）
         total_trades = len(self.trades)
+        pnl = np.fromiter(
+            (t.get('pnl') or 0 for t in self.trades), dtype=np.float64, count=total_trades
+        )
+        win_pnls = pnl[pnl > 0]
+        loss_pnls = -pnl[pnl < 0]
+        win_trades = int(win_pnls.size)
+        loss_trades = int(loss_pnls.size)
         win_rate = (win_trades / total_trades * 100) if total_trades > 0 else 0
         
-        # 统计平仓原因
-        take_profit_closes = sum(1 for t in self.trades 
-                                 if t.get('trade_type') == 'close' 
-                                 and t.get('close_reason') == '止盈')
-        stop_loss_closes = sum(1 for t in self.trades 
-                               if t.get('trade_type') == 'close' 
-                               and t.get('close_reason') == '止损')
-        max_loss_closes = sum(1 for t in self.trades 
-                              if t.get('trade_type') == 'close' 
-                              and t.get('close_reason') == '最大亏损限制')
-        
-        # 计算最大回撤
-        equity_values = [point[1] for point in self.mock_exchange.equity_curve]
+        # 统计平仓原因（一次遍历）
+        take_profit_closes = stop_loss_closes = max_loss_closes = 0
+        for t in self.trades:
+            if t.get('trade_type') != 'close':
+                continue
+            close_reason = t.get('close_reason')
+            if close_reason == '止盈':
+                take_profit_closes += 1
+            elif close_reason == '止损':
+                stop_loss_closes += 1
+            elif close_reason == '最大亏损限制':
+                max_loss_closes += 1
+        
+        # 计算最大回撤（相对历史最高权益，只统计最高权益为正的点）
+        equity_timestamps, equity_values = self.mock_exchange.get_equity_arrays()
         max_drawdown = 0.0
         max_drawdown_amount = 0.0
-        if equity_values:
-            peak = equity_values[0]
-            for value in equity_values:
-                if value is not None and value > peak:
-                    peak = value
-                if value is not None and peak > 0:
-                    drawdown = ((peak - value) / peak) * 100
-                    drawdown_amount = peak - value
-                    if drawdown > max_drawdown:
-                        max_drawdown = drawdown
-                        max_drawdown_amount = drawdown_amount
+        if equity_values.size:
+            peaks = np.maximum.accumulate(equity_values)
+            drawdown_amounts = peaks - equity_values
+            drawdowns = np.divide(
+                drawdown_amounts * 100, peaks, out=np.zeros_like(peaks), where=peaks > 0
+            )
+            worst = int(drawdowns.argmax())
+            if drawdowns[worst] > 0:
+                max_drawdown = float(drawdowns[worst])
+                max_drawdown_amount = float(drawdown_amounts[worst])
         
         # 计算平均盈亏
-        win_pnls = [safe_get_pnl(t) for t in self.trades if safe_get_pnl(t) > 0]
-        loss_pnls = [abs(safe_get_pnl(t)) for t in self.trades if safe_get_pnl(t) < 0]
-        avg_win = sum(win_pnls) / len(win_pnls) if win_pnls else 0
-        avg_loss = sum(loss_pnls) / len(loss_pnls) if loss_pnls else 0
-        profit_factor = (sum(win_pnls) / sum(loss_pnls)) if loss_pnls and sum(loss_pnls) > 0 else 0
+        avg_win = float(win_pnls.mean()) if win_trades else 0
+        avg_loss = float(loss_pnls.mean()) if loss_trades else 0
+        total_loss = float(loss_pnls.sum())
+        profit_factor = (float(win_pnls.sum()) / total_loss) if total_loss > 0 else 0
         
-        # 计算夏普比率（简化版）
+        # 计算夏普比率（简化版，逐点收益率只统计前一点权益为正的情况）
         sharpe_ratio = 0.0
-        if len(equity_values) > 1:
-            returns = []
-            for i in range(1, len(equity_values)):
-                if equity_values[i-1] > 0:
-                    ret = (equity_values[i] - equity_values[i-1]) / equity_values[i-1]
-                    returns.append(ret)
-            if returns:
-                import statistics
-                mean_return = statistics.mean(returns)
-                std_return = statistics.stdev(returns) if len(returns) > 1 else 0
+        if equity_values.size > 1:
+            previous = equity_values[:-1]
+            valid = previous > 0
+            returns = (equity_values[1:][valid] - previous[valid]) / previous[valid]
+            if returns.size > 1:
+                std_return = float(returns.std(ddof=1))
                 if std_return > 0:
-                    sharpe_ratio = (mean_return / std_return) * (252 ** 0.5)  # 年化
+                    sharpe_ratio = (float(returns.mean()) / std_return) * (252 ** 0.5)  # 年化
         
         # 计算平均交易收益率
         avg_trade_return = (total_return / total_trades) if total_trades > 0 else 0
@@ -677,16 +723,18 @@ class Backtester:
         # 构建权益曲线数据
         equity_curve_data = [
             {
-                'timestamp': point[0],
-                'balance': point[1],
-                'time': datetime.fromtimestamp(point[0] / 1000).isoformat() if point[0] else None
+                'timestamp': timestamp,
+                'balance': balance,
+                'time': datetime.fromtimestamp(timestamp / 1000).isoformat() if timestamp else None
             }
-            for point in self.mock_exchange.equity_curve
+            for timestamp, balance in zip(equity_timestamps.tolist(), equity_values.tolist())
         ]
         
         # 构建价格趋势数据（从OHLCV数据中提取，精确到四位小数）
+        # 先对原始K线等间隔采样再构建字典，避免为全部K线创建字典后再丢弃
+        sample_rate = max(1, len(self.ohlcv_data) // PRICE_DATA_MAX_POINTS)
         price_data = []
-        for candle in self.ohlcv_data:
+        for candle in self.ohlcv_data[::sample_rate]:
             timestamp = candle[0]
             price_data.append({
                 'timestamp': timestamp,
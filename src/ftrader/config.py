@@ -2,11 +2,54 @@
 
 import os
 import yaml
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
 from dotenv import load_dotenv
 
 
+@dataclass(frozen=True)
+class Settings:
+    """运行环境配置（从环境变量读取一次，之后只读）"""
+    binance_testnet: bool = False
+    binance_api_key: str = field(default='', repr=False)
+    binance_api_secret: str = field(default='', repr=False)
+    binance_proxy: str = ''
+    backtest_workers: int = 0  # 回测进程数，0 表示使用CPU核数
+    
+    @property
+    def has_credentials(self) -> bool:
+        """是否配置了API密钥"""
+        return bool(self.binance_api_key and self.binance_api_secret)
+    
+    @classmethod
+    def from_env(cls) -> 'Settings':
+        """从环境变量（含.env文件）构建配置，测试网/实盘密钥在此一次性确定"""
+        load_dotenv()
+        testnet = os.getenv('BINANCE_TESTNET', 'False').lower() == 'true'
+        if testnet:
+            # 优先使用测试网API密钥
+            api_key = os.getenv('BINANCE_TESTNET_API_KEY') or os.getenv('BINANCE_API_KEY', '')
+            api_secret = os.getenv('BINANCE_TESTNET_SECRET_KEY') or os.getenv('BINANCE_SECRET_KEY', '')
+        else:
+            api_key = os.getenv('BINANCE_API_KEY', '')
+            api_secret = os.getenv('BINANCE_SECRET_KEY', '')
+        return cls(
+            binance_testnet=testnet,
+            binance_api_key=api_key,
+            binance_api_secret=api_secret,
+            binance_proxy=os.getenv('BINANCE_PROXY', ''),
+            backtest_workers=int(os.getenv('FTRADER_BT_WORKERS') or 0),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """获取运行环境配置单例（首次调用时读取环境变量）"""
+    return Settings.from_env()
+
+
 class Config:
     """配置管理类"""
     
@@ -1,8 +1,10 @@
 """数据库连接和初始化模块"""
 
+import json
 import os
+import orjson
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -14,11 +16,35 @@ DB_PATH = DB_DIR / "ftrader.db"
 # 数据库URL
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+# 连接池大小：同步接口在线程池（默认40个线程）中执行，
+# 连接数需覆盖并发请求，避免默认的5+10个连接成为排队瓶颈。
+# 服务以单进程运行（web_server.py），本地SQLite文件没有服务端连接数上限
+DB_POOL_SIZE = 20
+DB_MAX_OVERFLOW = 20
+
+
+def _json_serializer(value) -> str:
+    """JSON列序列化（orjson，支持NumPy数组和非字符串键）"""
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _json_deserializer(text: str):
+    """JSON列反序列化（旧数据可能含 NaN/Infinity，orjson 无法解析时回退标准库）"""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
 # 创建数据库引擎
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},  # SQLite需要这个参数
-    echo=False  # 设置为True可以查看SQL语句
+    echo=False,  # 设置为True可以查看SQL语句
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    json_serializer=_json_serializer,
+    json_deserializer=_json_deserializer
 )
 
 # 创建会话工厂
@@ -40,4 +66,28 @@ def get_db():
 def init_db():
     """初始化数据库（创建所有表）"""
     Base.metadata.create_all(bind=engine)
+    # create_all不会为已存在的表补建新增列，这里为缺少的可空列执行ALTER TABLE
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"已为表 {table.name} 补建列 {column.name}")
+            except Exception as e:
+                print(f"补建列 {table.name}.{column.name} 失败: {e}")
+    # 持仓同步不再使用 ON CONFLICT，删除旧版本创建的未平仓持仓唯一索引
+    with engine.begin() as conn:
+        conn.execute(text('DROP INDEX IF EXISTS uq_positions_open_strategy_symbol_side'))
+    # create_all不会为已存在的表补建新增索引，这里逐个补建
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                print(f"创建索引 {index.name} 失败: {e}")
     print(f"数据库已初始化: {DB_PATH}")
@@ -6,6 +6,7 @@ import time
 import logging
 from typing import Dict, Optional, List
 from decimal import Decimal, ROUND_DOWN
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +69,12 @@ class BinanceExchange:
         
         self.exchange = exchange_class(exchange_config)
         
+        # 复用同一个HTTP会话的连接池（keep-alive），避免每次请求重新建立TCP/TLS连接；
+        # 同步接口在线程池中并发调用同一实例，适当放大连接池
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.exchange.session.mount('https://', adapter)
+        self.exchange.session.mount('http://', adapter)
+        
         # 如果是测试网，启用Demo Trading模式（币安新的统一测试环境）
         if testnet:
             try:
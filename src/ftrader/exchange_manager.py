@@ -1,18 +1,16 @@
 """交易所实例管理器（单例模式）"""
 
 import os
+import time
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 from threading import Lock
-from dotenv import load_dotenv
 
 from .exchange import BinanceExchange
+from .config import get_settings
 
 logger = logging.getLogger(__name__)
 
-# 确保加载环境变量
-load_dotenv()
-
 
 class ExchangeManager:
     """交易所实例管理器（单例模式）"""
@@ -20,6 +18,13 @@ class ExchangeManager:
     _instance: Optional['ExchangeManager'] = None
     _lock: Lock = Lock()
     
+    # 余额缓存有效期（秒），短时间内的重复刷新共用一次交易所请求
+    BALANCE_CACHE_TTL: float = 2.0
+    
+    # K线缓存有效期（秒），多个页面同时轮询同一图表时共用一次交易所请求，
+    # 有效期远小于一根K线，最新K线的收盘价仍能及时刷新
+    OHLCV_CACHE_TTL: float = 2.0
+    
     def __new__(cls):
         """单例模式实现"""
         if cls._instance is None:
@@ -36,6 +41,13 @@ class ExchangeManager:
         
         self._exchange: Optional[BinanceExchange] = None
         self._config_hash: Optional[str] = None
+        # 余额缓存：id(exchange) -> (获取时间, 余额)
+        self._balance_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        # K线缓存：(id(exchange), 交易对, 时间周期, 数量) -> (获取时间, K线)
+        self._ohlcv_cache: Dict[Tuple[int, str, str, int], Tuple[float, List[List]]] = {}
+        # 每个K线缓存键一把锁：并发请求同一图表时只有一个线程请求交易所，其余等待后复用结果
+        self._ohlcv_key_locks: Dict[Tuple[int, str, str, int], Lock] = {}
+        self._ohlcv_lock = Lock()
         self._initialized = True
     
     def get_exchange(self, 
@@ -55,12 +67,17 @@ class ExchangeManager:
         Returns:
             交易所实例
         """
-        # 从环境变量读取配置（如果未提供）
+        # 从运行环境配置读取（如果未提供）
+        settings = get_settings()
         if testnet is None:
-            testnet = os.getenv('BINANCE_TESTNET', 'False').lower() == 'true'
+            testnet = settings.binance_testnet
         
         if api_key is None or api_secret is None:
-            if testnet:
+            if testnet == settings.binance_testnet:
+                api_key = api_key or settings.binance_api_key
+                api_secret = api_secret or settings.binance_api_secret
+            # 显式指定了与环境不同的网络时，按该网络解析密钥
+            elif testnet:
                 api_key = api_key or os.getenv('BINANCE_TESTNET_API_KEY') or os.getenv('BINANCE_API_KEY', '')
                 api_secret = api_secret or os.getenv('BINANCE_TESTNET_SECRET_KEY') or os.getenv('BINANCE_SECRET_KEY', '')
             else:
@@ -68,7 +85,7 @@ class ExchangeManager:
                 api_secret = api_secret or os.getenv('BINANCE_SECRET_KEY', '')
         
         if proxy is None:
-            proxy = os.getenv('BINANCE_PROXY', '')
+            proxy = settings.binance_proxy
         
         # 生成配置哈希，用于判断是否需要重新创建实例
         config_hash = self._generate_config_hash(api_key, api_secret, testnet, proxy)
@@ -107,11 +124,86 @@ class ExchangeManager:
         config_str = f"{api_key[:8] if api_key else ''}_{api_secret[:8] if api_secret else ''}_{testnet}_{proxy}"
         return hashlib.md5(config_str.encode()).hexdigest()
     
+    def get_cached_balance(self, exchange: Optional[BinanceExchange] = None) -> Optional[Dict[str, Any]]:
+        """
+        获取账户余额（带短时缓存）
+        
+        Args:
+            exchange: 交易所实例（如果为None，使用单例实例）
+        
+        Returns:
+            余额信息，获取失败时返回None（失败结果不缓存）
+        """
+        if exchange is None:
+            exchange = self.get_exchange()
+        
+        key = id(exchange)
+        cached = self._balance_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.BALANCE_CACHE_TTL:
+            return cached[1]
+        
+        balance = exchange.get_balance()
+        if balance is not None:
+            self._balance_cache[key] = (time.monotonic(), balance)
+        return balance
+    
+    def get_cached_ohlcv(self, exchange: BinanceExchange, symbol: str, timeframe: str = '1m',
+                         limit: int = 100) -> List[List]:
+        """
+        获取K线数据（带短时缓存）
+        
+        Args:
+            exchange: 交易所实例
+            symbol: 交易对符号
+            timeframe: 时间周期
+            limit: 返回的K线数量
+        
+        Returns:
+            K线数据列表，获取失败时返回空列表（空结果不缓存）
+        """
+        key = (id(exchange), symbol, timeframe, limit)
+        cached = self._ohlcv_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.OHLCV_CACHE_TTL:
+            return cached[1]
+        
+        with self._ohlcv_lock:
+            key_lock = self._ohlcv_key_locks.setdefault(key, Lock())
+        with key_lock:
+            # 等待期间其他线程可能已经获取并写入缓存
+            cached = self._ohlcv_cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.OHLCV_CACHE_TTL:
+                return cached[1]
+            
+            ohlcv = exchange.get_ohlcv(symbol, timeframe, limit)
+            if ohlcv:
+                self._store_ohlcv(key, ohlcv)
+        return ohlcv
+    
+    def _store_ohlcv(self, key: Tuple[int, str, str, int], ohlcv: List[List]):
+        """写入K线缓存，同时清理过期条目和空闲的键锁（缓存键来自请求参数，不清理会无限增长）"""
+        now = time.monotonic()
+        with self._ohlcv_lock:
+            self._ohlcv_cache = {
+                k: v for k, v in self._ohlcv_cache.items() if now - v[0] < self.OHLCV_CACHE_TTL
+            }
+            self._ohlcv_cache[key] = (now, ohlcv)
+            self._ohlcv_key_locks = {
+                k: lock for k, lock in self._ohlcv_key_locks.items()
+                if k in self._ohlcv_cache or lock.locked()
+            }
+    
+    def invalidate_balance(self):
+        """清空余额缓存（下单或平仓成功后调用）"""
+        self._balance_cache.clear()
+    
     def reset(self):
         """重置实例（用于测试或重新配置）"""
         with self._lock:
             self._exchange = None
             self._config_hash = None
+            self._balance_cache.clear()
+            self._ohlcv_cache.clear()
+            self._ohlcv_key_locks.clear()
 
 
 def get_exchange_manager() -> ExchangeManager:
@@ -143,3 +235,25 @@ def get_exchange(api_key: Optional[str] = None,
     manager = get_exchange_manager()
     return manager.get_exchange(api_key, api_secret, testnet, proxy)
 
+
+def get_cached_balance(exchange: Optional[BinanceExchange] = None) -> Optional[Dict[str, Any]]:
+    """
+    便捷函数：获取账户余额（带短时缓存）
+    
+    Args:
+        exchange: 交易所实例（可选，默认使用单例实例）
+    
+    Returns:
+        余额信息，获取失败时返回None
+    """
+    return get_exchange_manager().get_cached_balance(exchange)
+
+
+def invalidate_balance_cache():
+    """便捷函数：清空余额缓存"""
+    get_exchange_manager().invalidate_balance()
+
+
+def get_cached_ohlcv(exchange: BinanceExchange, symbol: str, timeframe: str = '1m', limit: int = 100) -> List[List]:
+    """便捷函数：获取K线数据（带短时缓存）"""
+    return get_exchange_manager().get_cached_ohlcv(exchange, symbol, timeframe, limit)
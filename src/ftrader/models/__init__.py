@@ -4,7 +4,7 @@ from .strategy import Strategy, StrategyRun
 from .trade import Trade
 from .position import Position
 from .account import AccountSnapshot
-from .backtest import BacktestResult, BacktestStatus
+from .backtest import BacktestResult, BacktestStatus, BacktestPriceData
 
 __all__ = [
     'Strategy',
@@ -14,4 +14,5 @@ __all__ = [
     'AccountSnapshot',
     'BacktestResult',
     'BacktestStatus',
+    'BacktestPriceData',
 ]
@@ -1,7 +1,7 @@
 """回测相关数据模型"""
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, DateTime, ForeignKey, Enum as SQLEnum, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, Text, DateTime, ForeignKey, Index, Enum as SQLEnum, JSON
 from sqlalchemy.orm import relationship
 import enum
 from ..database import Base
@@ -18,6 +18,11 @@ class BacktestStatus(str, enum.Enum):
 class BacktestResult(Base):
     """回测结果模型"""
     __tablename__ = "backtest_results"
+    __table_args__ = (
+        # 回测列表按策略过滤（或不过滤）并按创建时间倒序分页
+        Index('ix_backtest_results_strategy_id_created_at', 'strategy_id', 'created_at'),
+        Index('ix_backtest_results_created_at', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     strategy_id = Column(Integer, ForeignKey("strategies.id"), nullable=False, index=True)
@@ -68,7 +73,31 @@ class BacktestResult(Base):
     
     # 关联关系
     strategy = relationship("Strategy", back_populates="backtest_results")
+    price_points = relationship("BacktestPriceData", back_populates="backtest", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<BacktestResult(id={self.id}, strategy_id={self.strategy_id}, status='{self.status}')>"
 
+
+class BacktestPriceData(Base):
+    """回测价格趋势数据模型（每行一根K线，用于详情页价格图表）"""
+    __tablename__ = "backtest_price_data"
+    __table_args__ = (
+        # 详情页按回测ID读取并按时间排序
+        Index('ix_backtest_price_data_backtest_id_timestamp', 'backtest_id', 'timestamp'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    backtest_id = Column(Integer, ForeignKey("backtest_results.id"), nullable=False)
+    timestamp = Column(BigInteger, nullable=False)  # K线时间戳（毫秒）
+    open = Column(Float, nullable=False)  # 开盘价
+    high = Column(Float, nullable=False)  # 最高价
+    low = Column(Float, nullable=False)  # 最低价
+    close = Column(Float, nullable=False)  # 收盘价
+    volume = Column(Float, nullable=False, default=0.0)  # 成交量
+    
+    # 关联关系
+    backtest = relationship("BacktestResult", back_populates="price_points")
+    
+    def __repr__(self):
+        return f"<BacktestPriceData(backtest_id={self.backtest_id}, timestamp={self.timestamp})>"
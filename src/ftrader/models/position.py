@@ -1,7 +1,7 @@
 """持仓相关数据模型"""
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 import enum
 from ..database import Base
@@ -16,6 +16,10 @@ class PositionSide(str, enum.Enum):
 class Position(Base):
     """持仓记录模型"""
     __tablename__ = "positions"
+    __table_args__ = (
+        # 按是否平仓（及策略）过滤的持仓查询
+        Index('ix_positions_is_closed_strategy_id', 'is_closed', 'strategy_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     strategy_id = Column(Integer, ForeignKey("strategies.id"), nullable=False, index=True)
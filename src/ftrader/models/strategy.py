@@ -1,7 +1,7 @@
 """策略相关数据模型"""
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, DateTime, ForeignKey, Index, Enum as SQLEnum, JSON
 from sqlalchemy.orm import relationship
 import enum
 from ..database import Base
@@ -17,6 +17,7 @@ class StrategyStatus(str, enum.Enum):
     """策略状态"""
     STOPPED = "stopped"
     RUNNING = "running"
+    STOPPING = "stopping"  # 停止中（后台平仓）
     PAUSED = "paused"
     ERROR = "error"
 
@@ -32,6 +33,8 @@ class Strategy(Base):
     
     # 配置型策略的YAML配置
     config_yaml = Column(Text, nullable=True)
+    # 写入时由config_yaml解析得到的配置，读取时无需再解析YAML
+    config_json = Column(JSON, nullable=True)
     
     # 代码型策略的代码路径或代码内容
     code_path = Column(String(500), nullable=True)
@@ -59,6 +62,10 @@ class Strategy(Base):
 class StrategyRun(Base):
     """策略运行记录"""
     __tablename__ = "strategy_runs"
+    __table_args__ = (
+        # 按策略和状态查找最新的运行记录（当前运行记录ID、状态恢复）
+        Index('ix_strategy_runs_strategy_id_status_started_at', 'strategy_id', 'status', 'started_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     strategy_id = Column(Integer, ForeignKey("strategies.id"), nullable=False, index=True)
@@ -1,7 +1,7 @@
 """交易相关数据模型"""
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Enum as SQLEnum, text
 from sqlalchemy.orm import relationship
 import enum
 from ..database import Base
@@ -23,6 +23,18 @@ class TradeSide(str, enum.Enum):
 class Trade(Base):
     """交易记录模型"""
     __tablename__ = "trades"
+    __table_args__ = (
+        # 交易历史按策略/运行记录过滤并按执行时间倒序分页
+        Index('ix_trades_strategy_id_executed_at', 'strategy_id', 'executed_at'),
+        Index('ix_trades_strategy_run_id_executed_at', 'strategy_run_id', 'executed_at'),
+        # 按运行记录汇总平仓盈亏（部分索引只包含有盈亏的平仓交易，SUM直接在索引上完成）
+        Index(
+            'ix_trades_strategy_run_id_pnl',
+            'strategy_run_id', 'pnl',
+            sqlite_where=text('pnl IS NOT NULL'),
+            postgresql_where=text('pnl IS NOT NULL'),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     strategy_id = Column(Integer, ForeignKey("strategies.id"), nullable=False, index=True)
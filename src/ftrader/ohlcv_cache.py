@@ -0,0 +1,59 @@
+"""历史K线磁盘缓存模块
+
+按 (交易对, 时间周期, UTC日期) 分文件保存已结束交易日的K线，
+历史K线不会再变化，因此缓存无需失效处理。
+"""
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 缓存目录（与数据库目录同级）
+CACHE_DIR = Path(__file__).parent.parent.parent / "cache" / "ohlcv"
+
+# 一天的毫秒数
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def day_starts(start_timestamp: int, end_timestamp: int) -> List[int]:
+    """返回覆盖 [start_timestamp, end_timestamp] 的每个UTC日的起始时间戳（毫秒）"""
+    first_day = start_timestamp - start_timestamp % DAY_MS
+    return list(range(first_day, end_timestamp + 1, DAY_MS))
+
+
+def _cache_path(symbol: str, timeframe: str, day_start: int) -> Path:
+    """缓存文件路径：{CACHE_DIR}/{symbol}/{timeframe}/{yyyymmdd}.npy"""
+    safe_symbol = symbol.replace('/', '_').replace(':', '_')
+    day = np.datetime64(day_start, 'ms').astype('datetime64[D]').astype(str).replace('-', '')
+    return CACHE_DIR / safe_symbol / timeframe / f"{day}.npy"
+
+
+def load_day(symbol: str, timeframe: str, day_start: int) -> Optional[np.ndarray]:
+    """读取某日的K线缓存，未缓存或读取失败返回None"""
+    path = _cache_path(symbol, timeframe, day_start)
+    if not path.exists():
+        return None
+    try:
+        return np.load(path)
+    except Exception as e:
+        logger.warning(f"读取K线缓存失败 {path}: {e}")
+        return None
+
+
+def save_day(symbol: str, timeframe: str, day_start: int, candles: np.ndarray):
+    """保存某日的K线缓存（形状为 (N, 6) 的 float64 数组）"""
+    path = _cache_path(symbol, timeframe, day_start)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免并发回测读到写了一半的文件
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as f:
+            np.save(f, np.ascontiguousarray(candles, dtype=np.float64))
+        os.replace(f.name, path)
+    except Exception as e:
+        logger.warning(f"写入K线缓存失败 {path}: {e}")
@@ -1,6 +1,5 @@
 """策略管理器模块"""
 
-import os
 import logging
 import asyncio
 import yaml
@@ -16,7 +15,7 @@ from .models.account import AccountSnapshot
 from .exchange import BinanceExchange
 from .exchange_manager import get_exchange
 from .risk_manager import RiskManager
-from .config import Config
+from .config import Config, get_settings
 from .strategies.base import BaseStrategy
 from .strategies.martingale import MartingaleStrategy
 from .strategies.random_forest import RandomForestStrategy
@@ -112,7 +111,7 @@ class StrategyManager:
         Returns:
             策略实例
         """
-        use_testnet = os.getenv('BINANCE_TESTNET', 'False').lower() == 'true'
+        use_testnet = get_settings().binance_testnet
         exchange = self._create_exchange(strategy.id, use_testnet)
         risk_manager = self._create_risk_manager(strategy.id, exchange, config_dict)
         
@@ -167,7 +166,7 @@ class StrategyManager:
         """策略状态变化回调"""
         db = SessionLocal()
         try:
-            strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+            strategy = db.get(Strategy, strategy_id)
             if strategy:
                 strategy.status = StrategyStatus(status)
                 db.commit()
@@ -369,7 +368,7 @@ class StrategyManager:
         """
         db = SessionLocal()
         try:
-            strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+            strategy = db.get(Strategy, strategy_id)
             if not strategy:
                 logger.error(f"策略不存在: {strategy_id}")
                 return False
@@ -524,10 +523,10 @@ class StrategyManager:
         # 这样可以修复状态不同步的问题
         db = SessionLocal()
         try:
-            strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+            strategy = db.get(Strategy, strategy_id)
             if strategy:
-                # 如果数据库状态是 RUNNING，更新为 STOPPED
-                if strategy.status == StrategyStatus.RUNNING:
+                # 如果数据库状态是 RUNNING（或后台停止中的 STOPPING），更新为 STOPPED
+                if strategy.status in (StrategyStatus.RUNNING, StrategyStatus.STOPPING):
                     strategy.status = StrategyStatus.STOPPED
                     logger.info(f"更新策略数据库状态为已停止: {strategy_id}")
                 else:
@@ -600,7 +599,7 @@ class StrategyManager:
         # 从数据库获取
         db = SessionLocal()
         try:
-            strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
+            strategy = db.get(Strategy, strategy_id)
             if strategy:
                 return {
                     'strategy_id': strategy.id,
@@ -622,12 +621,21 @@ class StrategyManager:
         """
         db = SessionLocal()
         try:
-            strategies = db.query(Strategy).all()
+            # 一次查询取出所有策略的状态字段，未运行的策略直接由查询结果构造状态，
+            # 不再逐个策略打开会话查询
+            rows = db.query(Strategy.id, Strategy.name, Strategy.status).all()
             result = []
-            for strategy in strategies:
-                status = self.get_strategy_status(strategy.id)
-                if status:
-                    result.append(status)
+            for row in rows:
+                if row.id in self.strategies:
+                    result.append(self.strategies[row.id].get_status())
+                else:
+                    result.append({
+                        'strategy_id': row.id,
+                        'name': row.name,
+                        'status': row.status.value,
+                        'is_active': False,
+                        'is_running': False,
+                    })
             return result
         finally:
             db.close()
@@ -635,13 +643,13 @@ class StrategyManager:
     def recover_strategy_states(self):
         """
         恢复策略状态（服务启动时调用）
-        将数据库中状态为 RUNNING 但实际未运行的策略状态重置为 STOPPED
+        将数据库中状态为 RUNNING（或停止过程中服务退出而残留 STOPPING）但实际未运行的策略状态重置为 STOPPED
         """
         db = SessionLocal()
         try:
-            # 查找所有状态为 RUNNING 的策略
+            # 查找所有状态为 RUNNING / STOPPING 的策略
             running_strategies = db.query(Strategy).filter(
-                Strategy.status == StrategyStatus.RUNNING
+                Strategy.status.in_([StrategyStatus.RUNNING, StrategyStatus.STOPPING])
             ).all()
             
             if not running_strategies:
@@ -654,7 +662,7 @@ class StrategyManager:
                 # 检查策略是否真的在运行（在内存中）
                 if strategy.id not in self.strategies:
                     # 策略不在运行中，需要恢复状态
-                    logger.info(f"恢复策略 {strategy.id} ({strategy.name}) 的状态：RUNNING -> STOPPED")
+                    logger.info(f"恢复策略 {strategy.id} ({strategy.name}) 的状态：{strategy.status.name} -> STOPPED")
                     strategy.status = StrategyStatus.STOPPED
                     
                     # 更新运行记录
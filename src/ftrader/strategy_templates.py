@@ -1,7 +1,10 @@
 """策略模板模块"""
 
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
+import orjson
+
 
 class StrategyTemplate:
     """策略模板"""
@@ -21,8 +24,14 @@ TEMPLATES: List[StrategyTemplate] = []
 def register_template(template: StrategyTemplate):
     """注册策略模板"""
     TEMPLATES.append(template)
+    # 模板列表变化，清空查询缓存
+    get_template.cache_clear()
+    get_all_templates.cache_clear()
+    get_all_templates_json.cache_clear()
 
 
+# 模板ID来自请求路径，限制缓存大小避免任意ID撑大缓存
+@lru_cache(maxsize=128)
 def get_template(template_id: str) -> Optional[StrategyTemplate]:
     """获取策略模板"""
     for template in TEMPLATES:
@@ -31,8 +40,9 @@ def get_template(template_id: str) -> Optional[StrategyTemplate]:
     return None
 
 
+@lru_cache(maxsize=None)
 def get_all_templates() -> List[Dict[str, Any]]:
-    """获取所有策略模板"""
+    """获取所有策略模板（结果被缓存共享，调用方不要修改）"""
     return [
         {
             'id': t.id,
@@ -44,6 +54,12 @@ def get_all_templates() -> List[Dict[str, Any]]:
     ]
 
 
+@lru_cache(maxsize=None)
+def get_all_templates_json() -> bytes:
+    """获取所有策略模板的JSON序列化结果（模板是内置静态配置，只序列化一次）"""
+    return orjson.dumps(get_all_templates())
+
+
 # 注册默认模板
 
 # 马丁格尔策略模板
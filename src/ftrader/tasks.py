@@ -13,6 +13,9 @@ from .strategy_manager import get_strategy_manager
 
 logger = logging.getLogger(__name__)
 
+# 账户快照与持仓更新的间隔（秒）
+SNAPSHOT_INTERVAL = 60
+
 
 class BackgroundTasks:
     """后台任务管理器"""
@@ -47,12 +50,12 @@ class BackgroundTasks:
             try:
                 await self._save_account_snapshot()
                 await self._update_positions()  # 更新持仓信息
-                await asyncio.sleep(60)  # 每分钟保存一次快照和更新持仓
+                await asyncio.sleep(SNAPSHOT_INTERVAL)  # 每分钟保存一次快照和更新持仓
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"后台任务执行失败: {e}", exc_info=True)
-                await asyncio.sleep(60)
+                await asyncio.sleep(SNAPSHOT_INTERVAL)
     
     async def _save_account_snapshot(self):
         """保存账户快照"""
@@ -106,6 +109,15 @@ class BackgroundTasks:
                 db.add(snapshot)
                 db.commit()
                 logger.debug(f"账户快照已保存: balance={balance['total']:.2f} USDT")
+                
+                # 刷新快照接口缓存，避免每次请求重复扫描快照表
+                # 扫描快照表和序列化耗时较长，在线程池中执行，避免阻塞事件循环
+                try:
+                    from .api.account import refresh_snapshot_cache
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, refresh_snapshot_cache, db)
+                except Exception as e:
+                    logger.warning(f"刷新快照缓存失败: {e}")
             else:
                 logger.warning("余额为None，跳过保存快照")
             
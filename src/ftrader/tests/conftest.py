@@ -4,3 +4,21 @@
 from . import _pytest_mock_setup  # noqa: F401
 
 # 现在可以安全导入其他模块
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ftrader.database import Base
+import ftrader.models  # noqa: F401  注册所有模型表
+
+
+@pytest.fixture
+def db_session():
+    """内存SQLite数据库会话（已创建所有表，需要引擎时用 db_session.get_bind()）"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
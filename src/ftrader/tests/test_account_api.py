@@ -1,27 +1,45 @@
 """账户API单元测试"""
 
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import orjson
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch
+from fastapi.responses import StreamingResponse
 from fastapi.testclient import TestClient
-from httpx import AsyncClient
-from fastapi import FastAPI, HTTPException
-import os
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
 
-from ftrader.api.account import router, get_balance
-from ftrader.exchange import BinanceExchange
+from ftrader.api import account as account_api
+from ftrader.api.account import (
+    router, get_balance, get_account_snapshots, refresh_snapshot_cache, _iter_json_array
+)
+from ftrader.models import Strategy
+from ftrader.models.account import AccountSnapshot
+from ftrader.models.position import Position, PositionSide
+from ftrader.tasks import BackgroundTasks, SNAPSHOT_INTERVAL
 from ftrader.strategy_manager import StrategyManager
+from ftrader.config import Settings
+from ftrader.exchange import BinanceExchange
+from ftrader.exchange_manager import ExchangeManager
+
+
+@pytest.fixture(autouse=True)
+def reset_exchange_manager():
+    """每个测试前后重置交易所单例及余额缓存"""
+    ExchangeManager().reset()
+    yield
+    ExchangeManager().reset()
 
 
 class TestGetBalance:
     """测试获取余额接口"""
     
-    @pytest.fixture
-    def mock_strategy_manager(self):
-        """创建模拟的策略管理器"""
-        manager = Mock(spec=StrategyManager)
-        manager.exchanges = {}
-        return manager
-    
     @pytest.fixture
     def mock_exchange(self):
         """创建模拟的交易所实例"""
@@ -33,21 +51,13 @@ class TestGetBalance:
         }
         return exchange
     
-    @pytest.mark.asyncio
-    @patch('ftrader.api.account.get_strategy_manager')
-    async def test_get_balance_with_existing_exchange(
-        self, 
-        mock_get_manager, 
-        mock_strategy_manager, 
-        mock_exchange
-    ):
-        """测试当策略管理器中有交易所实例时获取余额"""
-        # 设置模拟对象
-        mock_strategy_manager.exchanges = {1: mock_exchange}
-        mock_get_manager.return_value = mock_strategy_manager
+    @patch('ftrader.exchange_manager.ExchangeManager.get_exchange')
+    def test_get_balance_with_existing_exchange(self, mock_get_exchange, mock_exchange):
+        """测试使用单例交易所实例获取余额"""
+        mock_get_exchange.return_value = mock_exchange
         
         # 调用接口
-        result = await get_balance()
+        result = get_balance()
         
         # 验证结果
         assert result == {
@@ -58,29 +68,24 @@ class TestGetBalance:
         # 验证调用了交易所的 get_balance 方法
         mock_exchange.get_balance.assert_called_once()
     
-    @pytest.mark.asyncio
-    @patch('ftrader.api.account.get_strategy_manager')
-    @patch.dict(os.environ, {
-        'BINANCE_API_KEY': 'test_api_key',
-        'BINANCE_SECRET_KEY': 'test_secret_key',
-        'BINANCE_TESTNET': 'False'
-    })
-    @patch('ftrader.api.account.BinanceExchange')
-    async def test_get_balance_without_exchange_creates_new(
+    @patch('ftrader.exchange_manager.get_settings')
+    @patch('ftrader.exchange_manager.BinanceExchange')
+    def test_get_balance_without_exchange_creates_new(
         self,
         mock_binance_exchange_class,
-        mock_get_manager,
-        mock_strategy_manager,
+        mock_get_settings,
         mock_exchange
     ):
-        """测试当策略管理器中没有交易所实例时创建新的交易所"""
-        # 设置模拟对象
-        mock_strategy_manager.exchanges = {}
-        mock_get_manager.return_value = mock_strategy_manager
+        """测试没有交易所实例时按环境配置创建新的交易所"""
+        mock_get_settings.return_value = Settings(
+            binance_testnet=False,
+            binance_api_key='test_api_key',
+            binance_api_secret='test_secret_key',
+        )
         mock_binance_exchange_class.return_value = mock_exchange
         
         # 调用接口
-        result = await get_balance()
+        result = get_balance()
         
         # 验证结果
         assert result == {
@@ -90,35 +95,31 @@ class TestGetBalance:
         }
         # 验证创建了新的交易所实例
         mock_binance_exchange_class.assert_called_once_with(
-            'test_api_key',
-            'test_secret_key',
-            testnet=False
+            api_key='test_api_key',
+            api_secret='test_secret_key',
+            testnet=False,
+            proxy=''
         )
         mock_exchange.get_balance.assert_called_once()
     
-    @pytest.mark.asyncio
-    @patch('ftrader.api.account.get_strategy_manager')
-    @patch.dict(os.environ, {
-        'BINANCE_TESTNET_API_KEY': 'test_testnet_key',
-        'BINANCE_TESTNET_SECRET_KEY': 'test_testnet_secret',
-        'BINANCE_TESTNET': 'True'
-    })
-    @patch('ftrader.api.account.BinanceExchange')
-    async def test_get_balance_with_testnet(
+    @patch('ftrader.exchange_manager.get_settings')
+    @patch('ftrader.exchange_manager.BinanceExchange')
+    def test_get_balance_with_testnet(
         self,
         mock_binance_exchange_class,
-        mock_get_manager,
-        mock_strategy_manager,
+        mock_get_settings,
         mock_exchange
     ):
         """测试使用测试网模式获取余额"""
-        # 设置模拟对象
-        mock_strategy_manager.exchanges = {}
-        mock_get_manager.return_value = mock_strategy_manager
+        mock_get_settings.return_value = Settings(
+            binance_testnet=True,
+            binance_api_key='test_testnet_key',
+            binance_api_secret='test_testnet_secret',
+        )
         mock_binance_exchange_class.return_value = mock_exchange
         
         # 调用接口
-        result = await get_balance()
+        result = get_balance()
         
         # 验证结果
         assert result == {
@@ -128,49 +129,34 @@ class TestGetBalance:
         }
         # 验证使用测试网配置创建交易所
         mock_binance_exchange_class.assert_called_once_with(
-            'test_testnet_key',
-            'test_testnet_secret',
-            testnet=True
+            api_key='test_testnet_key',
+            api_secret='test_testnet_secret',
+            testnet=True,
+            proxy=''
         )
     
-    @pytest.mark.asyncio
-    @patch('ftrader.api.account.get_strategy_manager')
-    @patch.dict(os.environ, {
-        'BINANCE_TESTNET': 'False'
-    }, clear=True)
-    async def test_get_balance_without_api_keys_raises_exception(
-        self,
-        mock_get_manager,
-        mock_strategy_manager
-    ):
-        """测试当没有API密钥时抛出异常"""
-        # 设置模拟对象
-        mock_strategy_manager.exchanges = {}
-        mock_get_manager.return_value = mock_strategy_manager
+    @patch('ftrader.exchange_manager.ExchangeManager.get_exchange')
+    def test_get_balance_exchange_unavailable_returns_default(self, mock_get_exchange):
+        """测试无法获取交易所实例时返回默认值"""
+        mock_get_exchange.side_effect = Exception("未配置API密钥")
         
-        # 验证抛出异常
-        with pytest.raises(HTTPException) as exc_info:
-            await get_balance()
+        result = get_balance()
         
-        assert exc_info.value.status_code == 500
-        assert "未配置API密钥" in exc_info.value.detail
+        assert result == {
+            'free': 0.0,
+            'used': 0.0,
+            'total': 0.0
+        }
     
-    @pytest.mark.asyncio
-    @patch('ftrader.api.account.get_strategy_manager')
-    async def test_get_balance_exchange_error_returns_default(
-        self,
-        mock_get_manager,
-        mock_strategy_manager,
-        mock_exchange
-    ):
+    @patch('ftrader.exchange_manager.ExchangeManager.get_exchange')
+    def test_get_balance_exchange_error_returns_default(self, mock_get_exchange, mock_exchange):
         """测试当交易所获取余额失败时返回默认值"""
         # 设置模拟对象，让 get_balance 抛出异常
-        mock_strategy_manager.exchanges = {1: mock_exchange}
-        mock_get_manager.return_value = mock_strategy_manager
+        mock_get_exchange.return_value = mock_exchange
         mock_exchange.get_balance.side_effect = Exception("网络错误")
         
         # 调用接口
-        result = await get_balance()
+        result = get_balance()
         
         # 验证返回默认值（account.py 中的异常处理会捕获异常并返回默认值）
         assert result == {
@@ -181,14 +167,8 @@ class TestGetBalance:
         # 验证调用了 get_balance 方法
         mock_exchange.get_balance.assert_called_once()
     
-    @pytest.mark.asyncio
-    @patch('ftrader.api.account.get_strategy_manager')
-    async def test_get_balance_different_balance_values(
-        self,
-        mock_get_manager,
-        mock_strategy_manager,
-        mock_exchange
-    ):
+    @patch('ftrader.exchange_manager.ExchangeManager.get_exchange')
+    def test_get_balance_different_balance_values(self, mock_get_exchange, mock_exchange):
         """测试不同的余额值"""
         # 设置不同的余额值
         mock_exchange.get_balance.return_value = {
@@ -196,11 +176,10 @@ class TestGetBalance:
             'used': 1000.25,
             'total': 6000.75
         }
-        mock_strategy_manager.exchanges = {1: mock_exchange}
-        mock_get_manager.return_value = mock_strategy_manager
+        mock_get_exchange.return_value = mock_exchange
         
         # 调用接口
-        result = await get_balance()
+        result = get_balance()
         
         # 验证结果
         assert result == {
@@ -225,13 +204,6 @@ class TestGetBalanceIntegration:
         """创建测试客户端"""
         return TestClient(app)
     
-    @pytest.fixture
-    def mock_strategy_manager(self):
-        """创建模拟的策略管理器"""
-        manager = Mock(spec=StrategyManager)
-        manager.exchanges = {}
-        return manager
-    
     @pytest.fixture
     def mock_exchange(self):
         """创建模拟的交易所实例"""
@@ -243,22 +215,10 @@ class TestGetBalanceIntegration:
         }
         return exchange
     
-    @patch('ftrader.api.account.get_strategy_manager')
-    def test_get_balance_endpoint_success(
-        self,
-        mock_get_manager,
-        client,
-        mock_strategy_manager,
-        mock_exchange
-    ):
+    @patch('ftrader.exchange_manager.ExchangeManager.get_exchange')
+    def test_get_balance_endpoint_success(self, mock_get_exchange, client, mock_exchange):
         """测试获取余额端点成功响应"""
-        mock_strategy_manager.exchanges = {1: mock_exchange}
-        mock_get_manager.return_value = mock_strategy_manager
-        mock_exchange.get_balance.return_value = {
-            'free': 1000.0,
-            'used': 200.0,
-            'total': 1200.0
-        }
+        mock_get_exchange.return_value = mock_exchange
         
         # 发送请求
         response = client.get("/api/account/balance")
@@ -272,25 +232,168 @@ class TestGetBalanceIntegration:
             'used': 200.0
         }
     
-    @patch('ftrader.api.account.get_strategy_manager')
-    @patch.dict(os.environ, {
-        'BINANCE_TESTNET': 'False'
-    }, clear=True)
-    def test_get_balance_endpoint_no_api_keys(
-        self,
-        mock_get_manager,
-        client,
-        mock_strategy_manager
-    ):
-        """测试获取余额端点没有API密钥时的错误响应"""
-        mock_strategy_manager.exchanges = {}
-        mock_get_manager.return_value = mock_strategy_manager
+    @patch('ftrader.exchange_manager.ExchangeManager.get_exchange')
+    def test_get_balance_endpoint_exchange_unavailable(self, mock_get_exchange, client):
+        """测试无法获取交易所实例时端点返回默认余额"""
+        mock_get_exchange.side_effect = Exception("未配置API密钥")
         
         # 发送请求
         response = client.get("/api/account/balance")
         
         # 验证响应
-        assert response.status_code == 500
-        data = response.json()
-        assert "未配置API密钥" in data['detail']
+        assert response.status_code == 200
+        assert response.json() == {'total': 0.0, 'free': 0.0, 'used': 0.0}
+    
+    def test_positions_debug_not_shadowed_by_strategy_route(self, app):
+        """测试 /positions/debug 不会被 /positions/{strategy_id} 匹配"""
+        paths = [route.path for route in app.routes]
+        assert paths.index('/api/account/positions/debug') < paths.index('/api/account/positions/{strategy_id}')
+
+
+async def _read_body(response) -> bytes:
+    """读取流式响应的完整内容"""
+    return b''.join([chunk async for chunk in response.body_iterator])
+
+
+class TestSnapshotCache:
+    """测试账户快照缓存"""
+    
+    @pytest.fixture
+    def db(self, db_session):
+        """内存数据库，包含一条最近的快照"""
+        db_session.add(AccountSnapshot(total_balance=100.0, free_balance=100.0, used_balance=0.0,
+                                       snapshot_at=datetime.utcnow() - timedelta(minutes=5)))
+        db_session.commit()
+        account_api._snapshot_cache.clear()
+        yield db_session
+        account_api._snapshot_cache.clear()
+    
+    def test_fresh_cache_served_without_query(self, db):
+        """刷新后的缓存在有效期内直接返回，不再查询数据库"""
+        refresh_snapshot_cache(db)
+        db.add(AccountSnapshot(total_balance=200.0, free_balance=200.0, used_balance=0.0, snapshot_at=datetime.utcnow()))
+        db.commit()
+        
+        response = get_account_snapshots(hours=24, db=db)
+        
+        assert [item['balance'] for item in orjson.loads(response.body)] == [100.0]
+    
+    def test_stale_cache_falls_back_to_query(self, db):
+        """缓存超过有效期（后台任务停止）时回退到实时查询"""
+        refresh_snapshot_cache(db)
+        db.add(AccountSnapshot(total_balance=200.0, free_balance=200.0, used_balance=0.0, snapshot_at=datetime.utcnow()))
+        db.commit()
+        
+        stale = account_api.time.monotonic() + 2 * SNAPSHOT_INTERVAL + 1
+        with patch('ftrader.api.account.time.monotonic', return_value=stale):
+            response = get_account_snapshots(hours=24, db=db)
+        
+        assert isinstance(response, StreamingResponse)
+        assert [item['balance'] for item in orjson.loads(asyncio.run(_read_body(response)))] == [100.0, 200.0]
+    
+    def test_snapshot_task_refreshes_cache_off_event_loop(self, db):
+        """保存快照后在线程池中刷新缓存，不阻塞事件循环"""
+        exchange = Mock()
+        exchange.get_balance.return_value = {'total': 150.0, 'free': 150.0, 'used': 0.0}
+        refresh_threads = []
+        
+        def refresh(session):
+            refresh_threads.append(threading.current_thread())
+            refresh_snapshot_cache(session)
+        
+        with patch('ftrader.exchange_manager.get_exchange', return_value=exchange), \
+                patch('ftrader.tasks.SessionLocal', return_value=db), \
+                patch('ftrader.api.account.refresh_snapshot_cache', side_effect=refresh):
+            asyncio.run(BackgroundTasks()._save_account_snapshot())
+        
+        assert refresh_threads and refresh_threads[0] is not threading.main_thread()
+        assert [item['balance'] for item in orjson.loads(account_api._snapshot_cache[24][1])] == [100.0, 150.0]
+
+
+class TestSyncExchangePositions:
+    """测试数据库没有持仓时从交易所批量同步"""
+    
+    @pytest.fixture
+    def db(self, db_session):
+        """内存数据库，包含一个用于存放交易所持仓的策略"""
+        db_session.add(Strategy(id=1, name='交易所持仓'))
+        db_session.commit()
+        return db_session
+    
+    def test_positions_inserted_with_price_fallbacks(self, db):
+        """交易所持仓一次写入，未返回开仓价和名义价值时用当前价格兜底"""
+        exchange = Mock()
+        exchange.get_all_open_positions.return_value = {
+            'BTC/USDT:USDT': {'contracts': 2.0, 'side': 'long', 'entryPrice': 100.0, 'markPrice': 110.0,
+                              'notional': 220.0, 'leverage': 5},
+            'ETH/USDT:USDT': {'contracts': 2.0, 'side': 'short', 'entryPrice': 0, 'markPrice': 120.0,
+                              'notional': 0, 'leverage': 3},
+            'SOL/USDT:USDT': {'contracts': 0, 'side': 'long'},
+        }
+        with patch.object(account_api, 'get_exchange', return_value=exchange):
+            response = account_api.get_positions(db)
+        
+        positions = db.query(Position).order_by(Position.id).all()
+        assert [(p.symbol, p.side, p.entry_price, p.notional_value) for p in positions] == [
+            ('BTC/USDT:USDT', PositionSide.LONG, 100.0, 220.0),
+            ('ETH/USDT:USDT', PositionSide.SHORT, 120.0, 240.0),
+        ]
+        assert len(orjson.loads(response.body)) == 2
+    
+    def test_no_count_query_at_info_level(self, db):
+        """默认INFO日志级别下查询持仓不执行COUNT统计"""
+        db.add(Position(strategy_id=1, symbol='BTC/USDT:USDT', side=PositionSide.LONG, entry_price=100.0,
+                        contracts=1.0, notional_value=100.0, leverage=1))
+        db.commit()
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+        
+        with patch.object(account_api.logger, 'isEnabledFor', side_effect=lambda level: level >= logging.INFO):
+            response = account_api.get_positions(db)
+        
+        assert len(orjson.loads(response.body)) == 1
+        assert not any('count(' in statement.lower() for statement in statements)
 
+
+class TestStatisticsCache:
+    """测试统计缓存失效"""
+    
+    def test_strategy_trade_invalidates_statistics_cache(self, db_session):
+        """策略交易回调写入交易记录后统计缓存被清空"""
+        db_session.add(Strategy(id=1, name='test'))
+        db_session.commit()
+        session_factory = sessionmaker(bind=db_session.get_bind())
+        
+        trade_data = {
+            'trade_type': 'open', 'side': 'long', 'symbol': 'BTC/USDT:USDT', 'price': 100.0,
+            'amount': 200.0, 'timestamp': '2024-01-01T00:00:00Z',
+        }
+        with patch.object(account_api, '_stats_cache', {'ts': time.monotonic(), 'val': (0, 0, 0, 0.0, 0)}), \
+             patch('ftrader.strategy_manager.SessionLocal', session_factory):
+            StrategyManager()._strategy_trade_callback(1, trade_data)
+            
+            assert account_api._stats_cache['val'] is None
+
+
+class TestIterJsonArray:
+    """测试查询结果流式序列化"""
+    
+    def test_streams_json_array(self):
+        """逐行输出的分块拼接后为完整的JSON数组"""
+        chunks = list(_iter_json_array([1, 2, 3], lambda row: {'id': row}))
+        
+        assert orjson.loads(b''.join(chunks)) == [{'id': 1}, {'id': 2}, {'id': 3}]
+        assert list(_iter_json_array([], lambda row: row)) == [b'[', b']']
+    
+    def test_error_mid_stream_is_raised(self):
+        """输出中途出错时继续抛出异常，不闭合数组"""
+        def rows():
+            yield 1
+            raise RuntimeError("数据库连接断开")
+        
+        chunks = []
+        with pytest.raises(RuntimeError):
+            for chunk in _iter_json_array(rows(), lambda row: {'id': row}):
+                chunks.append(chunk)
+        
+        assert chunks == [b'[', b'{"id":1}']
@@ -0,0 +1,398 @@
+"""回测API单元测试"""
+
+import asyncio
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock, patch
+from pydantic import ValidationError
+
+from ftrader import ohlcv_cache
+from ftrader.models import Strategy, BacktestResult, BacktestPriceData
+from ftrader.api import backtest as backtest_api
+from ftrader.api.backtest import BacktestRequest, _resolve_strategy_class
+from ftrader.strategies.martingale import MartingaleStrategy
+from ftrader.strategies.random_forest import RandomForestStrategy
+from ftrader.strategies.llm_strategy import LLMStrategy
+
+
+class TestBacktestRequest:
+    """测试回测请求校验"""
+    
+    def test_parses_iso_dates_with_z_suffix(self):
+        """支持末尾带Z的ISO日期"""
+        request = BacktestRequest(strategy_id=1, start_date='2024-01-01T00:00:00Z', end_date='2024-01-02T00:00:00Z')
+        assert request.start_date.utcoffset().total_seconds() == 0
+        assert request.start_date < request.end_date
+    
+    @pytest.mark.parametrize("start_date, end_date", [
+        ('2024-01-02', '2024-01-01'),
+        ('2024-01-01', '2024-01-01'),
+        ('2024-01-01T00:00:00Z', '2024-01-02T00:00:00'),
+        ('not-a-date', '2024-01-02'),
+    ])
+    def test_rejects_invalid_range(self, start_date, end_date):
+        """开始日期不早于结束日期、时区不一致或格式错误时校验失败"""
+        with pytest.raises(ValidationError):
+            BacktestRequest(strategy_id=1, start_date=start_date, end_date=end_date)
+
+
+class TestResolveStrategyClass:
+    """测试策略类型识别"""
+    
+    @pytest.mark.parametrize("config, expected", [
+        ({'llm': {}, 'martingale': {}}, LLMStrategy),
+        ({'ml': {}}, RandomForestStrategy),
+        ({'random_forest': {}}, RandomForestStrategy),
+        ({'martingale': {}}, MartingaleStrategy),
+        ({'trading': {'llm': {}}}, LLMStrategy),
+        ({'trading': {'ml': {}}}, RandomForestStrategy),
+        ({'trading': {'symbol': 'BTC/USDT:USDT'}}, MartingaleStrategy),
+        ({}, MartingaleStrategy),
+    ])
+    def test_resolve(self, config, expected):
+        """按优先级识别顶层及trading字段下的策略标识"""
+        assert _resolve_strategy_class(config) is expected
+
+
+class TestRunBacktestConfig:
+    """测试回测启动时读取策略配置"""
+    
+    def _run(self, strategy):
+        db = Mock()
+        db.get.return_value = strategy
+        background_tasks = Mock()
+        request = BacktestRequest(strategy_id=1, start_date='2024-01-01', end_date='2024-01-02')
+        backtest_api.run_backtest(request, background_tasks, db)
+        return background_tasks.add_task.call_args.args
+    
+    def test_uses_parsed_config_without_yaml(self):
+        """已保存解析结果时不再解析YAML"""
+        strategy = Strategy(id=1, config_json={'trading': {'symbol': 'ETH/USDT:USDT'}}, config_yaml='invalid: [')
+        with patch.object(backtest_api, 'parse_config_cached') as mock_parse:
+            args = self._run(strategy)
+        
+        mock_parse.assert_not_called()
+        assert args[6] == 'ETH/USDT:USDT'
+        assert args[8] == {'trading': {'symbol': 'ETH/USDT:USDT'}}
+    
+    def test_falls_back_to_yaml_for_old_records(self):
+        """旧记录没有解析结果时解析YAML"""
+        strategy = Strategy(id=1, config_yaml='trading:\n  symbol: ETH/USDT:USDT\n')
+        args = self._run(strategy)
+        
+        assert args[6] == 'ETH/USDT:USDT'
+
+
+class TestRunBacktestExecutor:
+    """测试回测计算的进程池提交与回退"""
+    
+    @pytest.fixture
+    def phases(self):
+        """模拟回测各阶段（数据库更新、获取K线、执行回测）"""
+        with patch.object(backtest_api, '_mark_backtest_running', return_value=True), \
+             patch.object(backtest_api, '_fetch_ohlcv_data', return_value=([[0, 1, 1, 1, 1, 1]], '1m', True)), \
+             patch.object(backtest_api, '_execute_backtest', return_value={'final_balance': 1.0}), \
+             patch.object(backtest_api, '_save_backtest_results') as mock_save, \
+             patch.object(backtest_api, '_mark_backtest_failed') as mock_failed, \
+             patch.object(backtest_api, '_is_result_cacheable', return_value=False), \
+             patch.object(backtest_api, 'SessionLocal'):
+            yield mock_save, mock_failed
+    
+    def _run(self):
+        asyncio.run(backtest_api._run_backtest(
+            1, 1, None, None, 10000.0, 'BTC/USDT:USDT', '1m', {}
+        ))
+    
+    def test_runs_in_process_when_pool_unavailable(self, phases):
+        """无法创建进程池时在当前进程中运行"""
+        mock_save, mock_failed = phases
+        with patch.object(backtest_api, '_get_backtest_pool', return_value=None):
+            self._run()
+        
+        mock_save.assert_called_once()
+        assert mock_save.call_args.args[1] == {'final_balance': 1.0}
+        mock_failed.assert_not_called()
+    
+    def test_runs_with_own_session_and_closes_it(self, phases):
+        """后台任务使用独立的数据库会话，结束后关闭"""
+        mock_save, _ = phases
+        with patch.object(backtest_api, '_get_backtest_pool', return_value=None), \
+             patch.object(backtest_api, 'SessionLocal') as mock_session_local:
+            self._run()
+        
+        session = mock_session_local.return_value
+        assert mock_save.call_args.args[2] is session
+        session.close.assert_called_once()
+    
+    def test_broken_pool_discarded_and_marked_failed(self, phases):
+        """进程池损坏时丢弃进程池，回测标记为失败而不在当前进程中重试"""
+        mock_save, mock_failed = phases
+        pool = Mock()
+        pool.submit.side_effect = BrokenProcessPool("worker died")
+        with patch.object(backtest_api, '_get_backtest_pool', return_value=pool), \
+             patch.object(backtest_api, '_discard_backtest_pool') as mock_discard, \
+             patch.object(backtest_api, '_BACKTEST_EXECUTOR') as mock_executor:
+            self._run()
+        
+        mock_discard.assert_called_once()
+        mock_executor.submit.assert_not_called()
+        mock_save.assert_not_called()
+        mock_failed.assert_called_once()
+        assert isinstance(mock_failed.call_args.args[1], BrokenProcessPool)
+    
+    def test_shutdown_backtest_pool(self):
+        """应用关闭时关闭进程池并清空引用"""
+        pool = Mock()
+        with patch.object(backtest_api, '_backtest_pool', pool):
+            backtest_api.shutdown_backtest_pool()
+            
+            assert backtest_api._backtest_pool is None
+        pool.shutdown.assert_called_once_with(wait=True, cancel_futures=True)
+
+
+class TestExecuteBacktest:
+    """测试回测执行（模拟粒度与进度推送）"""
+    
+    @pytest.mark.parametrize("simulate_tick_level, expected_len", [(False, 2), (True, 120)])
+    def test_tick_level_expansion_is_opt_in(self, simulate_tick_level, expected_len):
+        """默认直接使用原始K线，开启秒级模拟时才展开为秒级数据"""
+        candles = np.array([[0, 1.0, 2.0, 0.5, 1.5, 60.0], [60000, 1.5, 2.0, 1.0, 1.2, 60.0]])
+        with patch.object(backtest_api, 'Backtester') as mock_backtester:
+            backtest_api._execute_backtest(1, {}, candles, '1m', 10000.0, simulate_tick_level)
+        
+        ohlcv_data = mock_backtester.call_args.kwargs['ohlcv_data']
+        assert len(ohlcv_data) == expected_len
+        assert isinstance(ohlcv_data[0][0], int)
+    
+    def test_progress_throttled_but_completion_always_sent(self):
+        """短时间内的进度更新被丢弃，完成进度始终推送"""
+        with patch.object(backtest_api, 'Backtester') as mock_backtester, \
+             patch.object(backtest_api, 'broadcast_backtest_progress') as mock_broadcast:
+            backtest_api._execute_backtest(1, {}, np.ones((1, 6)), '1m', 10000.0)
+            progress_callback = mock_backtester.call_args.kwargs['progress_callback']
+            for current in range(1, 101):
+                progress_callback(current, 100, float(current), 10000.0)
+        
+        sent = [call.args[1] for call in mock_broadcast.call_args_list]
+        assert sent[0] == 1
+        assert sent[-1] == 100
+        assert len(sent) < 100
+
+
+class TestBacktestResultCache:
+    """测试回测结果缓存"""
+    
+    def test_cache_hit_skips_fetch_and_compute(self):
+        """命中缓存时不获取K线也不执行回测"""
+        cached = {'final_balance': 2.0}
+        with patch.object(backtest_api, '_mark_backtest_running', return_value=True), \
+             patch.object(backtest_api, '_is_result_cacheable', return_value=True), \
+             patch.object(backtest_api.backtest_cache, 'load', return_value=cached), \
+             patch.object(backtest_api, 'broadcast_backtest_progress'), \
+             patch.object(backtest_api, '_fetch_ohlcv_data') as mock_fetch, \
+             patch.object(backtest_api, '_execute_backtest') as mock_execute, \
+             patch.object(backtest_api, '_save_backtest_results') as mock_save, \
+             patch.object(backtest_api, 'SessionLocal'):
+            asyncio.run(backtest_api._run_backtest(
+                1, 1, None, None, 10000.0, 'BTC/USDT:USDT', '1m', {}
+            ))
+        
+        mock_fetch.assert_not_called()
+        mock_execute.assert_not_called()
+        assert mock_save.call_args.args[1] == cached
+    
+    def test_incomplete_data_not_cached(self):
+        """历史数据有缺口时回测结果不写入缓存"""
+        with patch.object(backtest_api, '_mark_backtest_running', return_value=True), \
+             patch.object(backtest_api, '_is_result_cacheable', return_value=True), \
+             patch.object(backtest_api.backtest_cache, 'load', return_value=None), \
+             patch.object(backtest_api.backtest_cache, 'save') as mock_cache_save, \
+             patch.object(backtest_api, '_fetch_ohlcv_data', return_value=([[0, 1, 1, 1, 1, 1]], '1m', False)), \
+             patch.object(backtest_api, '_get_backtest_pool', return_value=None), \
+             patch.object(backtest_api, '_execute_backtest', return_value={'final_balance': 1.0}), \
+             patch.object(backtest_api, '_save_backtest_results') as mock_save, \
+             patch.object(backtest_api, 'SessionLocal'):
+            asyncio.run(backtest_api._run_backtest(
+                1, 1, None, None, 10000.0, 'BTC/USDT:USDT', '1m', {}
+            ))
+        
+        mock_cache_save.assert_not_called()
+        assert mock_save.call_args.args[1] == {'final_balance': 1.0}
+    
+    def test_cache_key_includes_version(self):
+        """缓存版本变化后相同参数生成不同的缓存键"""
+        params = {'symbol': 'BTC/USDT:USDT'}
+        key = backtest_api.backtest_cache.make_key(params)
+        with patch.object(backtest_api.backtest_cache, 'CACHE_VERSION', backtest_api.backtest_cache.CACHE_VERSION + 1):
+            assert backtest_api.backtest_cache.make_key(params) != key
+    
+    def test_naive_end_date_treated_as_utc(self):
+        """未带时区的结束时间按UTC判断是否已结束"""
+        now = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+        with patch.object(backtest_api.time, 'time', return_value=now):
+            assert backtest_api._is_result_cacheable(datetime(2024, 1, 1, 11, 0), {})
+            assert not backtest_api._is_result_cacheable(datetime(2024, 1, 1, 13, 0), {})
+
+
+class TestPriceDataStorage:
+    """测试价格数据独立表存储"""
+    
+    @pytest.fixture
+    def db(self, db_session):
+        """内存数据库，包含一个策略和一条回测记录"""
+        db_session.add(Strategy(id=1, name='test'))
+        db_session.add(BacktestResult(
+            id=1, strategy_id=1, start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 2),
+            symbol='BTC/USDT:USDT', parameters={'trading': {'symbol': 'BTC/USDT:USDT'}}
+        ))
+        db_session.commit()
+        return db_session
+    
+    def _results(self, price_data):
+        results = {name: 0 for name in backtest_api._RESULT_FIELDS}
+        results.update(equity_curve=[], trades=[], price_data=price_data)
+        return results
+    
+    def test_price_data_saved_to_table_and_read_in_order(self, db):
+        """价格数据写入独立表，parameters保持为策略配置，详情按时间顺序返回"""
+        price_data = [
+            {'timestamp': 1704067260000, 'open': 2.0, 'high': 3.0, 'low': 1.0, 'close': 2.5, 'volume': 5.0},
+            {'timestamp': 1704067200000, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 4.0},
+        ]
+        backtest_api._save_backtest_results(1, self._results(price_data), db)
+        
+        assert db.query(BacktestPriceData).count() == 2
+        assert db.query(BacktestResult.parameters).scalar() == {'trading': {'symbol': 'BTC/USDT:USDT'}}
+        detail = backtest_api.get_backtest_detail(1, db)
+        assert [point['timestamp'] for point in detail.price_data] == [1704067200000, 1704067260000]
+        assert detail.price_data[0]['close'] == 1.5
+    
+    def test_delete_removes_price_data(self, db):
+        """删除回测结果时同时删除价格数据"""
+        price_data = [{'timestamp': 1704067200000, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 4.0}]
+        backtest_api._save_backtest_results(1, self._results(price_data), db)
+        
+        backtest_api.delete_backtest_result(1, db)
+        
+        assert db.query(BacktestPriceData).count() == 0
+
+
+class TestFetchOHLCVData:
+    """测试历史K线获取与磁盘缓存"""
+    
+    DAY = 1704067200000  # 2024-01-01 00:00:00 UTC
+    
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path, monkeypatch):
+        """K线缓存写入临时目录"""
+        monkeypatch.setattr(ohlcv_cache, 'CACHE_DIR', tmp_path)
+    
+    @pytest.fixture
+    def exchange(self):
+        """按since分页返回连续两天1分钟K线的模拟交易所"""
+        candles = [[self.DAY + i * 60000, 1.0, 1.0, 1.0, 1.0, 1.0] for i in range(2 * 1440)]
+        exchange = Mock()
+        exchange.exchange.fetch_ohlcv.side_effect = (
+            lambda symbol, timeframe, since=None, limit=1000: [c for c in candles if c[0] >= since][:limit]
+        )
+        with patch.object(backtest_api, 'get_exchange', return_value=exchange), \
+             patch.object(backtest_api, '_clone_ccxt_client', return_value=exchange.exchange):
+            yield exchange
+    
+    def _fetch(self):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 1, 2, 23, 59, tzinfo=timezone.utc)
+        return backtest_api._fetch_ohlcv_data('BTC/USDT:USDT', '1m', start, end)
+    
+    def test_contiguous_days_fetched_in_shared_windows(self, exchange):
+        """连续缺失的日期合并切分窗口，第二次从缓存读取"""
+        candles, fetch_timeframe, complete = self._fetch()
+        
+        assert fetch_timeframe == '1m'
+        assert complete
+        assert candles.shape == (2 * 1440, 6)
+        # 2880 根K线只需 3 次1分钟请求（按天切分需要 4 次），另有 1 次日线探测
+        timeframes = [c.args[1] for c in exchange.exchange.fetch_ohlcv.call_args_list]
+        assert timeframes.count('1m') == 3
+        assert timeframes.count('1d') == 1
+        
+        exchange.exchange.fetch_ohlcv.reset_mock()
+        assert np.array_equal(self._fetch()[0], candles)
+        exchange.exchange.fetch_ohlcv.assert_not_called()
+    
+    def test_days_overlapping_failed_window_not_cached(self, exchange):
+        """与失败窗口重叠的日期不写入缓存"""
+        fetch = exchange.exchange.fetch_ohlcv.side_effect
+        
+        def flaky(symbol, timeframe, since=None, limit=1000):
+            if since == self.DAY + 2000 * 60000:
+                raise Exception("网络错误")
+            return fetch(symbol, timeframe, since=since, limit=limit)
+        
+        exchange.exchange.fetch_ohlcv.side_effect = flaky
+        _, _, complete = self._fetch()
+        
+        assert not complete
+        assert ohlcv_cache.load_day('BTC/USDT:USDT', '1m', self.DAY) is not None
+        assert ohlcv_cache.load_day('BTC/USDT:USDT', '1m', self.DAY + ohlcv_cache.DAY_MS) is None
+    
+    def test_days_before_listing_skipped(self, exchange):
+        """交易对在回测区间内才上市时，不请求上市前的日期"""
+        fetch = exchange.exchange.fetch_ohlcv.side_effect
+        listing = self.DAY + ohlcv_cache.DAY_MS
+        exchange.exchange.fetch_ohlcv.side_effect = (
+            lambda symbol, timeframe, since=None, limit=1000:
+                fetch(symbol, timeframe, since=max(since, listing), limit=limit)
+        )
+        
+        candles, _, _ = self._fetch()
+        
+        assert candles[0, 0] == listing
+        sinces = [c.kwargs['since'] for c in exchange.exchange.fetch_ohlcv.call_args_list if c.args[1] == '1m']
+        assert min(sinces) >= listing
+    
+    def test_short_window_refetched_from_last_candle(self, exchange):
+        """交易所返回的数据未到窗口末尾时从最后一根K线之后继续请求"""
+        fetch = exchange.exchange.fetch_ohlcv.side_effect
+        exchange.exchange.fetch_ohlcv.side_effect = (
+            lambda symbol, timeframe, since=None, limit=1000: fetch(symbol, timeframe, since=since, limit=min(limit, 500))
+        )
+        
+        candles, _, complete = self._fetch()
+        
+        assert complete
+        assert candles.shape == (2 * 1440, 6)
+        assert ohlcv_cache.load_day('BTC/USDT:USDT', '1m', self.DAY + ohlcv_cache.DAY_MS) is not None
+    
+    def test_truncated_day_not_cached(self, exchange):
+        """数据在窗口末尾之前中断时视为不完整，当日不写入缓存"""
+        fetch = exchange.exchange.fetch_ohlcv.side_effect
+        cutoff = self.DAY + 2500 * 60000
+        exchange.exchange.fetch_ohlcv.side_effect = (
+            lambda symbol, timeframe, since=None, limit=1000:
+                [c for c in fetch(symbol, timeframe, since=since, limit=limit) if c[0] < cutoff]
+        )
+        
+        candles, _, complete = self._fetch()
+        
+        assert not complete
+        assert candles[-1, 0] == cutoff - 60000
+        assert ohlcv_cache.load_day('BTC/USDT:USDT', '1m', self.DAY) is not None
+        assert ohlcv_cache.load_day('BTC/USDT:USDT', '1m', self.DAY + ohlcv_cache.DAY_MS) is None
+    
+    def test_each_fetch_thread_uses_own_client(self, exchange):
+        """每个获取线程使用独立的ccxt实例"""
+        threads = set()
+        
+        def clone(source):
+            threads.add(threading.get_ident())
+            return source
+        
+        with patch.object(backtest_api, '_clone_ccxt_client', side_effect=clone) as mock_clone:
+            self._fetch()
+        
+        assert mock_clone.call_count == len(threads)
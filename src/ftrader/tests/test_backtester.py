@@ -0,0 +1,84 @@
+"""回测引擎单元测试"""
+
+import pytest
+
+from ftrader.backtester import Backtester, MockExchange
+
+
+class TestCalculateResults:
+    """测试回测结果统计"""
+    
+    def _backtester(self, trades, equity):
+        """构造只包含统计所需状态的回测引擎"""
+        backtester = Backtester.__new__(Backtester)
+        backtester.initial_balance = 100.0
+        backtester.trades = trades
+        backtester.ohlcv_data = []
+        exchange = MockExchange([[1704067200000 + i * 60000, v, v, v, v, 0.0] for i, v in enumerate(equity)], 100.0)
+        for i, value in enumerate(equity):
+            exchange.current_index = i
+            exchange.balance = {'total': value, 'free': value, 'used': 0.0}
+            exchange._record_equity()
+        backtester.mock_exchange = exchange
+        return backtester
+    
+    def test_trade_and_equity_statistics(self):
+        """盈亏统计、平仓原因、最大回撤和夏普比率"""
+        trades = [
+            {'trade_type': 'open', 'pnl': None},
+            {'trade_type': 'close', 'close_reason': '止盈', 'pnl': 30.0},
+            {'trade_type': 'close', 'close_reason': '止损', 'pnl': -10.0},
+            {'trade_type': 'close', 'close_reason': '止盈', 'pnl': 10.0},
+        ]
+        results = self._backtester(trades, [100.0, 120.0, 90.0, 110.0])._calculate_results()
+        
+        assert (results['total_trades'], results['win_trades'], results['loss_trades']) == (4, 2, 1)
+        assert results['avg_win'] == 20.0 and results['avg_loss'] == 10.0
+        assert results['profit_factor'] == 4.0
+        assert (results['take_profit_closes'], results['stop_loss_closes'], results['max_loss_closes']) == (2, 1, 0)
+        assert results['max_drawdown'] == pytest.approx(25.0)
+        assert results['max_drawdown_amount'] == pytest.approx(30.0)
+        returns = [0.2, -0.25, 20 / 90]
+        mean = sum(returns) / 3
+        std = (sum((r - mean) ** 2 for r in returns) / 2) ** 0.5
+        assert results['sharpe_ratio'] == pytest.approx(mean / std * 252 ** 0.5)
+        assert all(type(results[key]) in (int, float) for key in ('max_drawdown', 'sharpe_ratio', 'avg_win'))
+    
+    def test_empty_backtest(self):
+        """没有交易和权益数据时统计为0"""
+        results = self._backtester([], [])._calculate_results()
+        
+        assert results['win_rate'] == 0 and results['profit_factor'] == 0
+        assert results['max_drawdown'] == 0.0 and results['sharpe_ratio'] == 0.0
+
+
+class TestMockExchangeEquityCurve:
+    """测试模拟交易所的权益曲线记录"""
+    
+    def test_records_grow_beyond_initial_capacity(self):
+        """每根K线和每笔成交都记录权益，超过预分配容量时自动扩容"""
+        exchange = MockExchange([[1704067200000 + i * 60000, 100.0, 100.0, 100.0, 100.0, 1.0] for i in range(3)], 1000.0)
+        for _ in range(40):
+            exchange._record_equity()
+        while exchange.advance():
+            pass
+        
+        timestamps, balances = exchange.get_equity_arrays()
+        assert len(timestamps) == len(balances) == 42
+        assert timestamps[-1] == 1704067200000 + 2 * 60000
+        assert exchange.equity_curve[0] == (1704067200000, 1000.0)
+    
+    def test_record_after_data_exhausted_reuses_last_timestamp(self):
+        """数据遍历完后记录权益沿用上一个时间戳，没有任何记录时跳过"""
+        exchange = MockExchange([[1704067200000, 100.0, 100.0, 100.0, 100.0, 1.0]], 1000.0)
+        exchange.current_index = 1
+        exchange._record_equity()
+        assert len(exchange.get_equity_arrays()[0]) == 0
+        
+        exchange.current_index = 0
+        exchange._record_equity()
+        exchange.current_index = 1
+        exchange.balance = {'total': 990.0, 'free': 990.0, 'used': 0.0}
+        exchange._record_equity()
+        
+        assert exchange.equity_curve == [(1704067200000, 1000.0), (1704067200000, 990.0)]
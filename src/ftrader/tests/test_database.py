@@ -0,0 +1,30 @@
+"""数据库初始化单元测试"""
+
+from unittest.mock import patch
+
+from sqlalchemy import inspect, text
+
+from ftrader import database
+from ftrader.database import init_db
+from ftrader.models.position import Position
+
+
+class TestInitDb:
+    """测试旧数据库补建索引"""
+    
+    def test_missing_indexes_created_and_old_unique_index_dropped(self, db_session):
+        """补建已有表缺少的索引，删除旧版本的未平仓持仓唯一索引"""
+        engine = db_session.get_bind()
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_positions_is_closed_strategy_id"))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX uq_positions_open_strategy_symbol_side "
+                "ON positions (strategy_id, symbol, side) WHERE is_closed = 0"
+            ))
+        
+        with patch.object(database, 'engine', engine):
+            init_db()
+        
+        indexes = {index['name'] for index in inspect(engine).get_indexes(Position.__tablename__)}
+        assert 'ix_positions_is_closed_strategy_id' in indexes
+        assert 'uq_positions_open_strategy_symbol_side' not in indexes
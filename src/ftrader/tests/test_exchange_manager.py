@@ -0,0 +1,117 @@
+"""交易所管理器单元测试"""
+
+import threading
+import pytest
+from unittest.mock import Mock, patch
+
+# conftest.py 已经处理了 mock 设置，现在可以安全导入
+from ftrader.exchange_manager import ExchangeManager
+
+
+class TestExchangeDataCache:
+    """测试余额和K线缓存"""
+
+    @pytest.fixture
+    def manager(self):
+        """创建干净的管理器单例"""
+        manager = ExchangeManager()
+        manager.reset()
+        yield manager
+        manager.reset()
+
+    @pytest.fixture
+    def mock_exchange(self):
+        """创建模拟交易所"""
+        exchange = Mock()
+        exchange.get_balance.return_value = {'total': 100.0, 'free': 80.0, 'used': 20.0}
+        return exchange
+
+    def test_balance_cached_within_ttl(self, manager, mock_exchange):
+        """TTL内重复获取只请求一次交易所"""
+        first = manager.get_cached_balance(mock_exchange)
+        second = manager.get_cached_balance(mock_exchange)
+
+        assert first == second == {'total': 100.0, 'free': 80.0, 'used': 20.0}
+        mock_exchange.get_balance.assert_called_once()
+
+    def test_balance_refetched_after_ttl(self, manager, mock_exchange):
+        """超过TTL后重新请求交易所"""
+        with patch('ftrader.exchange_manager.time.monotonic', side_effect=[0.0, 10.0, 10.0]):
+            manager.get_cached_balance(mock_exchange)
+            manager.get_cached_balance(mock_exchange)
+
+        assert mock_exchange.get_balance.call_count == 2
+
+    def test_invalidate_clears_cache(self, manager, mock_exchange):
+        """下单后清空缓存"""
+        manager.get_cached_balance(mock_exchange)
+        manager.invalidate_balance()
+        manager.get_cached_balance(mock_exchange)
+
+        assert mock_exchange.get_balance.call_count == 2
+
+    def test_failed_balance_not_cached(self, manager, mock_exchange):
+        """获取失败的结果不缓存"""
+        mock_exchange.get_balance.return_value = None
+
+        assert manager.get_cached_balance(mock_exchange) is None
+        assert manager.get_cached_balance(mock_exchange) is None
+        assert mock_exchange.get_balance.call_count == 2
+
+    def test_ohlcv_cached_within_ttl(self, manager, mock_exchange):
+        """TTL内同一图表的重复请求只请求一次交易所，不同周期分别缓存"""
+        mock_exchange.get_ohlcv.return_value = [[1704067200000, 1.0, 2.0, 0.5, 1.5, 10.0]]
+
+        first = manager.get_cached_ohlcv(mock_exchange, 'BTC/USDT:USDT', '1m', 100)
+        second = manager.get_cached_ohlcv(mock_exchange, 'BTC/USDT:USDT', '1m', 100)
+        manager.get_cached_ohlcv(mock_exchange, 'BTC/USDT:USDT', '5m', 100)
+
+        assert first == second == [[1704067200000, 1.0, 2.0, 0.5, 1.5, 10.0]]
+        assert mock_exchange.get_ohlcv.call_count == 2
+
+    def test_empty_ohlcv_not_cached(self, manager, mock_exchange):
+        """获取失败返回的空K线不缓存"""
+        mock_exchange.get_ohlcv.return_value = []
+
+        manager.get_cached_ohlcv(mock_exchange, 'BTC/USDT:USDT')
+        manager.get_cached_ohlcv(mock_exchange, 'BTC/USDT:USDT')
+
+        assert mock_exchange.get_ohlcv.call_count == 2
+
+    def test_expired_ohlcv_pruned_on_insert(self, manager, mock_exchange):
+        """写入新的K线缓存时清理过期条目"""
+        mock_exchange.get_ohlcv.return_value = [[1704067200000, 1.0, 2.0, 0.5, 1.5, 10.0]]
+        with patch('ftrader.exchange_manager.time.monotonic', return_value=0.0):
+            manager.get_cached_ohlcv(mock_exchange, 'BTC/USDT:USDT', '1m', 100)
+        with patch('ftrader.exchange_manager.time.monotonic', return_value=10.0):
+            manager.get_cached_ohlcv(mock_exchange, 'ETH/USDT:USDT', '1m', 100)
+
+        assert [key[1] for key in manager._ohlcv_cache] == ['ETH/USDT:USDT']
+        assert list(manager._ohlcv_key_locks) == list(manager._ohlcv_cache)
+
+    def test_concurrent_ohlcv_requests_share_one_fetch(self, manager, mock_exchange):
+        """并发请求同一图表时只请求一次交易所"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(symbol, timeframe, limit):
+            started.set()
+            release.wait(5)
+            return [[1704067200000, 1.0, 2.0, 0.5, 1.5, 10.0]]
+
+        mock_exchange.get_ohlcv.side_effect = slow_fetch
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(manager.get_cached_ohlcv(mock_exchange, 'BTC/USDT:USDT')))
+            for _ in range(4)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(results) == 4
+        mock_exchange.get_ohlcv.assert_called_once()
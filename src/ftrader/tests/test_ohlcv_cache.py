@@ -0,0 +1,38 @@
+"""K线磁盘缓存单元测试"""
+
+import numpy as np
+import pytest
+
+from ftrader import ohlcv_cache
+from ftrader.ohlcv_cache import DAY_MS, day_starts, load_day, save_day
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """缓存写入临时目录"""
+    monkeypatch.setattr(ohlcv_cache, 'CACHE_DIR', tmp_path)
+    return tmp_path
+
+
+class TestOHLCVCache:
+    """测试K线缓存"""
+    
+    def test_day_starts_cover_range(self):
+        """区间内每个UTC日都返回其零点时间戳"""
+        day = 1704067200000  # 2024-01-01 00:00:00 UTC
+        assert day_starts(day + 1000, day + DAY_MS + 1000) == [day, day + DAY_MS]
+        assert day_starts(day, day) == [day]
+    
+    def test_save_and_load_roundtrip(self, cache_dir):
+        """保存后按交易对/周期/日期读取"""
+        day = 1704067200000
+        candles = np.array([[day, 1.0, 2.0, 0.5, 1.5, 10.0]], dtype=np.float64)
+        
+        save_day('BTC/USDT:USDT', '1m', day, candles)
+        
+        assert (cache_dir / 'BTC_USDT_USDT' / '1m' / '20240101.npy').exists()
+        assert np.array_equal(load_day('BTC/USDT:USDT', '1m', day), candles)
+    
+    def test_load_missing_day_returns_none(self):
+        """未缓存的日期返回None"""
+        assert load_day('BTC/USDT:USDT', '1m', 1704067200000) is None
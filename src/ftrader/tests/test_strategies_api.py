@@ -0,0 +1,253 @@
+"""策略API单元测试"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from ftrader.models import Strategy, StrategyRun, Trade
+from ftrader.models.strategy import StrategyStatus, StrategyType
+from ftrader.models.trade import TradeSide, TradeType
+from ftrader.api.strategies import (
+    StrategyResponse, StrategyUpdate, _load_config_yaml, _strategy_to_dict,
+    _stop_strategy_in_background, get_all_strategy_runs, get_all_strategy_status, get_strategies,
+    get_strategy_runs, stop_strategy, update_strategy
+)
+from ftrader.api._config_yaml import parse_config_cached
+
+
+async def _read_body(response) -> bytes:
+    """读取流式响应的完整内容"""
+    return b''.join([chunk async for chunk in response.body_iterator])
+
+
+class TestLoadConfigYaml:
+    """测试策略YAML配置解析与校验"""
+    
+    def test_returns_parsed_mapping(self):
+        """返回解析后的配置字典"""
+        assert _load_config_yaml("trading:\n  symbol: BTC/USDT:USDT\n") == {'trading': {'symbol': 'BTC/USDT:USDT'}}
+    
+    def test_empty_document_returns_empty_dict(self):
+        """只有注释的配置解析为空字典"""
+        assert _load_config_yaml("# 暂无配置\n") == {}
+    
+    @pytest.mark.parametrize("config_yaml", ["trading: [", "just a string", "- a\n- b\n"])
+    def test_invalid_config_rejected(self, config_yaml):
+        """YAML语法错误或顶层不是键值对时返回400"""
+        with pytest.raises(HTTPException) as exc_info:
+            _load_config_yaml(config_yaml)
+        assert exc_info.value.status_code == 400
+    
+    def test_cached_parse_reused_for_same_text(self):
+        """相同YAML文本只解析一次"""
+        parse_config_cached.cache_clear()
+        first = parse_config_cached("trading:\n  symbol: ETH/USDT:USDT\n")
+        second = parse_config_cached("trading:\n  symbol: ETH/USDT:USDT\n")
+        
+        assert first is second
+        assert first == {'trading': {'symbol': 'ETH/USDT:USDT'}}
+        assert parse_config_cached.cache_info().hits == 1
+
+
+class TestStrategyToDict:
+    """测试策略记录直接序列化"""
+    
+    def test_matches_response_model(self):
+        """直接序列化的结果与StrategyResponse校验后的输出一致"""
+        strategy = Strategy(
+            id=1, name='s1', description=None, strategy_type=StrategyType.CONFIG, status=StrategyStatus.RUNNING,
+            config_yaml='trading: {}\n', created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 2, 3, 4, 5, 6)
+        )
+        
+        expected = StrategyResponse.model_validate(strategy).model_dump(mode='json')
+        assert orjson.loads(orjson.dumps(_strategy_to_dict(strategy))) == expected
+
+
+class TestGetStrategies:
+    """测试策略列表"""
+    
+    def test_list_skips_config_and_code(self, db_session):
+        """列表只查询并返回列表需要的列，不含配置YAML和代码内容"""
+        db = db_session
+        db.add(Strategy(id=1, name='s1', config_yaml='trading: {}\n', code_content='x' * 1000))
+        db.commit()
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+        
+        items = orjson.loads(get_strategies(db=db).body)
+        
+        assert [item['name'] for item in items] == ['s1']
+        assert items[0]['status'] == 'stopped'
+        assert 'config_yaml' not in items[0] and 'code_content' not in items[0]
+        assert 'code_content' not in statements[0]
+
+
+class TestUpdateStrategy:
+    """测试更新策略"""
+    
+    @pytest.fixture
+    def db(self, db_session):
+        """内存数据库，包含一个已保存解析结果的策略"""
+        db_session.add(Strategy(id=1, name='s1', config_yaml='trading: {}\n', config_json={'trading': {}}))
+        db_session.commit()
+        return db_session
+    
+    def test_unchanged_yaml_not_reparsed(self, db):
+        """配置内容未变时不重新解析YAML"""
+        with patch('ftrader.api.strategies._load_config_yaml') as load_config:
+            update_strategy(1, StrategyUpdate(name='s2', config_yaml='trading: {}\n'), db)
+        
+        load_config.assert_not_called()
+        assert db.get(Strategy, 1).name == 's2'
+    
+    def test_changed_yaml_parsed_and_saved(self, db):
+        """配置内容变化时重新解析并保存解析结果"""
+        update_strategy(1, StrategyUpdate(config_yaml='trading:\n  leverage: 5\n'), db)
+        
+        assert db.get(Strategy, 1).config_json == {'trading': {'leverage': 5}}
+
+
+class TestGetAllStrategyRuns:
+    """测试历史运行记录列表"""
+    
+    @pytest.fixture
+    def db(self, db_session):
+        """内存数据库，包含两个策略、三条运行记录及其交易"""
+        session = db_session
+        session.add_all([Strategy(id=1, name='s1'), Strategy(id=2, name='s2')])
+        for run_id, strategy_id in [(1, 1), (2, 2), (3, 1)]:
+            session.add(StrategyRun(id=run_id, strategy_id=strategy_id, started_at=datetime(2024, 1, run_id)))
+        for run_id, pnl in [(1, None), (1, 5.0), (1, -2.0), (2, None)]:
+            session.add(Trade(
+                strategy_id=1 if run_id == 1 else 2, strategy_run_id=run_id,
+                trade_type=TradeType.OPEN if pnl is None else TradeType.CLOSE, side=TradeSide.LONG,
+                symbol='BTC/USDT:USDT', price=1.0, amount=1.0, pnl=pnl
+            ))
+        session.commit()
+        return session
+    
+    def test_pnl_aggregated_in_single_query(self, db):
+        """一次查询返回按开始时间倒序的运行记录、策略名称和平仓盈亏之和"""
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+        
+        response = get_all_strategy_runs(db=db)
+        
+        runs = orjson.loads(asyncio.run(_read_body(response)))
+        assert [(run['id'], run['strategy_name'], run['total_pnl']) for run in runs] == [
+            (3, 's1', 0.0), (2, 's2', 0.0), (1, 's1', 3.0)
+        ]
+        assert len(statements) == 1
+    
+    def test_strategy_runs_bind_new_parameters(self, db):
+        """缓存的查询语句每次使用新的策略ID和分页参数"""
+        assert [run.id for run in get_strategy_runs(1, db=db)] == [3, 1]
+        assert [run.id for run in get_strategy_runs(1, skip=1, limit=1, db=db)] == [1]
+        assert [run.id for run in get_strategy_runs(2, db=db)] == [2]
+
+
+class TestGetAllStrategyStatus:
+    """测试批量获取策略状态"""
+    
+    def test_statuses_with_current_run_and_position(self, db_session):
+        """一次返回所有策略的状态、当前运行记录ID和运行中策略的持仓"""
+        db = db_session
+        db.add_all([
+            Strategy(id=1, name='s1', status=StrategyStatus.RUNNING),
+            Strategy(id=2, name='s2', status=StrategyStatus.STOPPED),
+        ])
+        db.add_all([
+            StrategyRun(id=1, strategy_id=1, status=StrategyStatus.STOPPED, started_at=datetime(2024, 1, 3)),
+            StrategyRun(id=2, strategy_id=1, status=StrategyStatus.RUNNING, started_at=datetime(2024, 1, 2)),
+            StrategyRun(id=3, strategy_id=2, status=StrategyStatus.RUNNING, started_at=datetime(2024, 1, 1)),
+        ])
+        db.commit()
+        
+        instance = Mock(symbol='BTC/USDT:USDT')
+        instance.exchange.get_open_position.return_value = {'side': 'long', 'contracts': 2.0, 'entryPrice': 100.0}
+        manager = Mock(strategies={1: instance})
+        manager.get_all_strategies_status.return_value = [
+            {'strategy_id': 1, 'name': 's1', 'is_running': True},
+            {'strategy_id': 2, 'name': 's2', 'status': 'stopped', 'is_running': False},
+        ]
+        
+        with patch('ftrader.api.strategies.get_strategy_manager', return_value=manager):
+            statuses = asyncio.run(get_all_strategy_status(db=db))
+        
+        assert [(status['strategy_id'], status['current_run_id']) for status in statuses] == [(1, 2), (2, None)]
+        assert statuses[0]['position']['contracts'] == 2.0
+        assert statuses[1]['position'] is None
+        instance.exchange.get_open_position.assert_called_once_with('BTC/USDT:USDT')
+    
+    def test_shared_exchange_queried_sequentially_in_one_thread(self, db_session):
+        """共用同一交易所实例的策略在同一线程中依次查询持仓，不并发调用同一实例"""
+        calls = []
+        active = []
+        
+        def get_open_position(symbol):
+            active.append(symbol)
+            calls.append((symbol, threading.get_ident(), len(active)))
+            time.sleep(0.01)
+            active.remove(symbol)
+            return None
+        
+        shared = Mock(get_open_position=Mock(side_effect=get_open_position))
+        manager = Mock(strategies={
+            1: Mock(symbol='BTC/USDT:USDT', exchange=shared),
+            2: Mock(symbol='ETH/USDT:USDT', exchange=shared),
+        })
+        manager.get_all_strategies_status.return_value = [
+            {'strategy_id': 1, 'is_running': True}, {'strategy_id': 2, 'is_running': True},
+        ]
+        
+        with patch('ftrader.api.strategies.get_strategy_manager', return_value=manager):
+            asyncio.run(get_all_strategy_status(db=db_session))
+        
+        assert [symbol for symbol, _, _ in calls] == ['BTC/USDT:USDT', 'ETH/USDT:USDT']
+        assert calls[0][1] == calls[1][1]
+        assert all(concurrent == 1 for _, _, concurrent in calls)
+
+
+class TestStopStrategy:
+    """测试停止策略"""
+    
+    @pytest.fixture
+    def db(self, db_session):
+        """内存数据库，包含一个运行中的策略"""
+        db_session.add(Strategy(id=1, name='s1', status=StrategyStatus.RUNNING))
+        db_session.commit()
+        return db_session
+    
+    def test_close_positions_runs_in_background(self, db):
+        """平仓停止时标记为停止中并立即返回，停止在后台任务中执行"""
+        background_tasks = Mock()
+        manager = Mock(stop_strategy=AsyncMock(return_value=True))
+        
+        with patch('ftrader.api.strategies.get_strategy_manager', return_value=manager):
+            result = asyncio.run(stop_strategy(1, background_tasks, close_positions=True, db=db))
+        
+        assert result == {"message": "策略正在停止，持仓平仓中"}
+        assert db.get(Strategy, 1).status == StrategyStatus.STOPPING
+        manager.stop_strategy.assert_not_called()
+        background_tasks.add_task.assert_called_once_with(_stop_strategy_in_background, 1, True)
+    
+    def test_background_failure_marks_stopped(self, db):
+        """后台停止失败时把停止中的状态修复为已停止"""
+        db.get(Strategy, 1).status = StrategyStatus.STOPPING
+        db.commit()
+        manager = Mock(stop_strategy=AsyncMock(return_value=False))
+        
+        with patch('ftrader.api.strategies.get_strategy_manager', return_value=manager), \
+                patch('ftrader.api.strategies.SessionLocal', return_value=db):
+            asyncio.run(_stop_strategy_in_background(1, True))
+        
+        db.expire_all()
+        assert db.get(Strategy, 1).status == StrategyStatus.STOPPED
+        manager.on_strategy_status_change.assert_called_once_with(1, 'stopped')
@@ -160,6 +160,7 @@ risk:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=mock_strategy)
+        mock_db_session.get = Mock(return_value=mock_strategy)
         
         run_query = Mock()
         run_query.filter = Mock(return_value=run_query)
@@ -239,6 +240,7 @@ risk:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=mock_strategy)
+        mock_db_session.get = Mock(return_value=mock_strategy)
         
         run_query = Mock()
         run_query.filter = Mock(return_value=run_query)
@@ -294,6 +296,7 @@ risk:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=mock_strategy)
+        mock_db_session.get = Mock(return_value=mock_strategy)
         
         run_query = Mock()
         run_query.filter = Mock(return_value=run_query)
@@ -467,6 +470,7 @@ risk:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=mock_strategy)
+        mock_db_session.get = Mock(return_value=mock_strategy)
         
         mock_db_session.query = Mock(return_value=strategy_query)
         mock_db_session.add = Mock()
@@ -549,6 +553,7 @@ risk:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=mock_strategy)
+        mock_db_session.get = Mock(return_value=mock_strategy)
         
         mock_db_session.query = Mock(return_value=strategy_query)
         mock_db_session.add = Mock()
@@ -948,6 +953,7 @@ class TestStrategyManagerStopStrategyEdgeCases:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=mock_strategy)
+        mock_db_session.get = Mock(return_value=mock_strategy)
         
         run_query = Mock()
         run_query.filter = Mock(return_value=run_query)
@@ -1038,6 +1044,7 @@ class TestStrategyManagerStopStrategyEdgeCases:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=mock_strategy)
+        mock_db_session.get = Mock(return_value=mock_strategy)
         
         run_query = Mock()
         run_query.filter = Mock(return_value=run_query)
@@ -1119,6 +1126,7 @@ class TestStrategyManagerEdgeCases:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=Mock(status=StrategyStatus.RUNNING))
+        mock_db_session.get = Mock(return_value=Mock(status=StrategyStatus.RUNNING))
         
         run_query = Mock()
         run_query.filter = Mock(return_value=run_query)
@@ -1179,6 +1187,7 @@ class TestStrategyManagerEdgeCases:
         strategy_query = Mock()
         strategy_query.filter = Mock(return_value=strategy_query)
         strategy_query.first = Mock(return_value=strategy)
+        mock_db_session.get = Mock(return_value=strategy)
         
         mock_db_session.query = Mock(return_value=strategy_query)
         mock_db_session.add = Mock()
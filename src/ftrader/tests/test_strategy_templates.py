@@ -0,0 +1,31 @@
+"""策略模板单元测试"""
+
+import orjson
+
+from ftrader.strategy_templates import (
+    StrategyTemplate, TEMPLATES, get_all_templates, get_all_templates_json, get_template, register_template
+)
+
+
+class TestStrategyTemplates:
+    """测试模板查询缓存"""
+    
+    def test_json_matches_template_list(self):
+        """预序列化的JSON与模板列表一致，且只序列化一次"""
+        assert orjson.loads(get_all_templates_json()) == get_all_templates()
+        assert get_all_templates_json() is get_all_templates_json()
+    
+    def test_register_clears_cache(self):
+        """注册新模板后查询结果包含新模板"""
+        get_template('custom_test')
+        get_all_templates_json()
+        template = StrategyTemplate(id='custom_test', name='测试', description='测试模板', config_yaml='')
+        register_template(template)
+        try:
+            assert get_template('custom_test') is template
+            assert 'custom_test' in [t['id'] for t in orjson.loads(get_all_templates_json())]
+        finally:
+            TEMPLATES.remove(template)
+            get_template.cache_clear()
+            get_all_templates.cache_clear()
+            get_all_templates_json.cache_clear()
@@ -0,0 +1,132 @@
+"""WebSocket API单元测试"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import numpy as np
+import orjson
+
+from starlette.websockets import WebSocketState
+
+from ftrader.api.websocket import ConnectionManager, _encode_message, broadcast_backtest_progress, broadcast_trade
+
+
+class TestWebSocketMessages:
+    """测试WebSocket消息序列化与广播"""
+    
+    def test_encode_message_handles_numpy_and_unicode(self):
+        """numpy标量按数值输出，中文不转义"""
+        text = _encode_message({'type': 'backtest_progress', 'percentage': np.float64(12.5), 'message': '完成'})
+        
+        assert isinstance(text, str)
+        assert orjson.loads(text) == {'type': 'backtest_progress', 'percentage': 12.5, 'message': '完成'}
+        assert '完成' in text
+    
+    def test_broadcast_trade_sends_text_to_all_connections(self):
+        """交易事件序列化一次，由各连接的发送任务以文本帧发送（单条消息不包装成数组）"""
+        connections = [Mock(accept=AsyncMock(), send_text=AsyncMock()), Mock(accept=AsyncMock(), send_text=AsyncMock())]
+        manager = ConnectionManager()
+        
+        async def run():
+            for connection in connections:
+                await manager.connect(connection)
+            with patch('ftrader.api.websocket.manager', manager):
+                broadcast_trade(1, {'side': 'long', 'price': 100.0})
+            await asyncio.sleep(0.05)
+        
+        asyncio.run(run())
+        
+        payloads = [connection.send_text.await_args.args[0] for connection in connections]
+        assert payloads[0] is payloads[1]
+        assert orjson.loads(payloads[0]) == {'type': 'trade', 'strategy_id': 1, 'data': {'side': 'long', 'price': 100.0}}
+    
+    def test_slow_connection_does_not_block_others(self):
+        """慢连接超时后被断开并关闭，其他连接收到按顺序合并的消息"""
+        async def hang(message):
+            await asyncio.sleep(10)
+        
+        fast = Mock(accept=AsyncMock(), send_text=AsyncMock(), close=AsyncMock())
+        slow = Mock(accept=AsyncMock(), send_text=AsyncMock(side_effect=hang), close=AsyncMock())
+        failed = Mock(accept=AsyncMock(), send_text=AsyncMock(side_effect=RuntimeError('websocket.close already sent')),
+                      close=AsyncMock())
+        manager = ConnectionManager()
+        
+        async def run():
+            for connection in (slow, fast, failed):
+                await manager.connect(connection)
+            manager.broadcast('{"n":1}')
+            manager.broadcast('{"n":2}')
+            await asyncio.sleep(0.1)
+        
+        with patch('ftrader.api.websocket.BROADCAST_SEND_TIMEOUT', 0.05):
+            asyncio.run(run())
+        
+        fast.send_text.assert_awaited_once_with('[{"n":1},{"n":2}]')
+        assert manager.active_connections == {fast}
+        slow.close.assert_awaited_once()
+        failed.close.assert_awaited_once()
+    
+    def test_full_queue_disconnects_connection(self):
+        """待发送消息积压超过上限时断开连接"""
+        connection = Mock(accept=AsyncMock(), send_text=AsyncMock(), close=AsyncMock())
+        manager = ConnectionManager()
+        
+        async def run():
+            await manager.connect(connection)
+            # 不让出事件循环，发送任务来不及取走消息
+            for i in range(3):
+                manager.broadcast(str(i))
+            await asyncio.sleep(0)
+        
+        with patch('ftrader.api.websocket.SEND_QUEUE_SIZE', 2):
+            asyncio.run(run())
+        
+        assert manager.active_connections == set()
+        connection.close.assert_awaited_once()
+    
+    def test_disconnected_connection_skipped(self):
+        """已断开的连接在广播时直接移除，不再发送"""
+        connection = Mock(accept=AsyncMock(), send_text=AsyncMock(), close=AsyncMock())
+        manager = ConnectionManager()
+        
+        async def run():
+            await manager.connect(connection)
+            connection.client_state = WebSocketState.DISCONNECTED
+            manager.broadcast('{"n":1}')
+            await asyncio.sleep(0.05)
+        
+        asyncio.run(run())
+        
+        assert manager.active_connections == set()
+        connection.send_text.assert_not_awaited()
+    
+    def test_backtest_progress_from_other_loop_goes_through_main_loop(self):
+        """回测引擎在工作线程自己的事件循环中推送进度时，转交主事件循环，不直接操作发送队列"""
+        manager = Mock()
+        manager.main_loop = asyncio.new_event_loop()
+        
+        async def progress():
+            broadcast_backtest_progress(1, 1, 2, 50.0, 10000.0)
+        
+        try:
+            with patch('ftrader.api.websocket.manager', manager):
+                asyncio.run(progress())
+        finally:
+            manager.main_loop.close()
+        
+        manager.broadcast.assert_not_called()
+        manager.broadcast_threadsafe.assert_called_once()
+    
+    def test_backtest_progress_on_main_loop_broadcasts_directly(self):
+        """在主事件循环中推送进度时直接放入发送队列"""
+        manager = Mock()
+        
+        async def progress():
+            manager.main_loop = asyncio.get_running_loop()
+            broadcast_backtest_progress(1, 2, 2, 100.0, 10000.0)
+        
+        with patch('ftrader.api.websocket.manager', manager):
+            asyncio.run(progress())
+        
+        manager.broadcast.assert_called_once()
+        manager.broadcast_threadsafe.assert_not_called()
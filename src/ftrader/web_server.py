@@ -4,10 +4,11 @@ import logging
 import sys
 import asyncio
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
+from sqlalchemy.exc import SQLAlchemyError
 import os
 
 from .database import init_db
@@ -69,7 +70,8 @@ def setup_logging(log_level: str = "INFO"):
 app = FastAPI(
     title="FTrader API",
     description="多策略交易系统API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,  # orjson序列化更快，并原生支持datetime/枚举
 )
 
 # 配置CORS
@@ -81,6 +83,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(SQLAlchemyError)
+async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
+    """数据库异常统一处理：记录日志并返回503，便于客户端重试"""
+    logger.error(f"数据库错误 {request.method} {request.url.path}: {exc}", exc_info=exc)
+    return JSONResponse(status_code=503, content={"detail": "数据库暂时不可用"})
+
+
 # 注册路由
 app.include_router(strategies.router)
 app.include_router(account.router)
@@ -152,6 +162,9 @@ async def shutdown_event():
     # 停止后台任务
     background_tasks = get_background_tasks()
     await background_tasks.stop()
+    
+    # 关闭回测进程池，避免遗留子进程
+    await asyncio.get_running_loop().run_in_executor(None, backtest.shutdown_backtest_pool)
 
 
 if __name__ == "__main__":